@@ -7,4 +7,146 @@ QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 COLLECTION_NAME = os.getenv("COLLECTION_NAME", "veritium-v1")
 
-HF_API_KEY = os.getenv("HF_API_KEY")
\ No newline at end of file
+HF_API_KEY = os.getenv("HF_API_KEY")
+
+# Embedding micro-batching: concurrent get_embedding() calls are collected for
+# up to EMBED_BATCH_WINDOW_MS (or EMBED_MAX_BATCH_SIZE texts) and encoded in a
+# single forward pass. A window of 0 disables coalescing.
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))
+
+# Bulk ingestion: points are buffered and upserted UPSERT_BATCH_SIZE at a time.
+# UPSERT_PARALLEL > 1 uploads batches from several worker processes.
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "128"))
+UPSERT_WAIT = os.getenv("UPSERT_WAIT", "true").lower() in ("1", "true", "yes")
+UPSERT_PARALLEL = int(os.getenv("UPSERT_PARALLEL", "1"))
+
+# Crawling: per-host connection cap and token-bucket politeness (requests/sec, burst size).
+CRAWL_CONCURRENCY_PER_HOST = int(os.getenv("CRAWL_CONCURRENCY_PER_HOST", "4"))
+CRAWL_RATE_PER_HOST = float(os.getenv("CRAWL_RATE_PER_HOST", "3"))
+CRAWL_BURST = int(os.getenv("CRAWL_BURST", "3"))
+
+# ingest_all pipeline: parser processes, bounded queue size between stages, rows per embedding batch.
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(os.cpu_count() or 2)))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "32"))
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+
+# On-disk conditional-GET cache for scrapers and RSS feeds. Empty dir disables it.
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".cache/http")
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# SQLite file recording crawl progress, so backfills can be resumed with --resume.
+CRAWL_STATE_PATH = os.getenv("CRAWL_STATE_PATH", ".cache/crawl_state.sqlite3")
+
+# Query embedding cache: in-memory LRU of EMBED_CACHE_SIZE vectors (0 disables),
+# backed by an optional SQLite file that survives restarts. The file keeps the
+# EMBED_CACHE_DISK_SIZE most recently written vectors (~1.6 KB each).
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "10000"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "")
+EMBED_CACHE_DISK_SIZE = int(os.getenv("EMBED_CACHE_DISK_SIZE", "200000"))
+
+# /factcheck result cache. Entries are keyed by claim + evidence IDs and expire after
+# FACTCHECK_CACHE_TTL seconds. FACTCHECK_CACHE_SIMILARITY (e.g. 0.97) also serves
+# near-identical claims with the same evidence; 0 means exact matches only.
+FACTCHECK_CACHE_SIZE = int(os.getenv("FACTCHECK_CACHE_SIZE", "1000"))
+FACTCHECK_CACHE_TTL = float(os.getenv("FACTCHECK_CACHE_TTL", "3600"))
+FACTCHECK_CACHE_SIMILARITY = float(os.getenv("FACTCHECK_CACHE_SIMILARITY", "0"))
+
+# Threads used to run the model for async callers when coalescing is disabled.
+EMBED_EXECUTOR_WORKERS = int(os.getenv("EMBED_EXECUTOR_WORKERS", "2"))
+
+# Batch endpoints: max claims per request and concurrent LLM calls per batch
+BATCH_MAX_CLAIMS = int(os.getenv("BATCH_MAX_CLAIMS", "500"))
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+
+# Embedding inference backend: torch, onnx, openvino or int8 (torch dynamic quantization).
+# EMBEDDING_MODEL_FILE picks a specific exported file, e.g. onnx/model_qint8_avx512.onnx
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_MODEL_FILE = os.getenv("EMBEDDING_MODEL_FILE", "")
+
+# Load and warm up the embedding model in the background when the API starts
+# (otherwise the first request loads it)
+EMBED_WARMUP = os.getenv("EMBED_WARMUP", "true").lower() == "true"
+
+# Embedding server: when set, API workers send texts to the process serving on this
+# Unix socket instead of loading their own copy of the model
+EMBED_SERVER_SOCKET = os.getenv("EMBED_SERVER_SOCKET", "")
+# torch intra-op threads for the process that runs the model (0 = torch default)
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))
+
+# Collection tuning, applied when a collection is created (see app/migrate_collection.py
+# to re-tune an existing one). QDRANT_QUANTIZATION is "none" or "int8".
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+QDRANT_ON_DISK_VECTORS = os.getenv("QDRANT_ON_DISK_VECTORS", "false").lower() == "true"
+QDRANT_ON_DISK_PAYLOAD = os.getenv("QDRANT_ON_DISK_PAYLOAD", "false").lower() == "true"
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none")
+QDRANT_QUANTILE = float(os.getenv("QDRANT_QUANTILE", "0.99"))
+# Search-time knobs: ef (0 = Qdrant default) and int8 rescoring with oversampling
+QDRANT_SEARCH_EF = int(os.getenv("QDRANT_SEARCH_EF", "0"))
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "true").lower() == "true"
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+
+# Hybrid retrieval: a hashed BM25 sparse vector ("bm25") next to the dense one, fused
+# with RRF. Needs a collection created (or migrated) with HYBRID_SEARCH=true.
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "false").lower() == "true"
+# Candidates each channel contributes before fusion, per requested result
+HYBRID_PREFETCH_FACTOR = int(os.getenv("HYBRID_PREFETCH_FACTOR", "4"))
+
+# Optional cross-encoder rerank of the retrieved evidence before it goes to the LLM.
+# RERANK_CANDIDATES are retrieved, the best RERANK_TOP_N are kept; reranking is skipped
+# when the top hit's dense (cosine) similarity leads the others by at least RERANK_SKIP_MARGIN.
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "3"))
+RERANK_SKIP_MARGIN = float(os.getenv("RERANK_SKIP_MARGIN", "0.15"))
+
+# Vector store backend: "qdrant" or "local" (memory-mapped NumPy store at LOCAL_STORE_PATH,
+# for offline development, tests and read-only replicas). LOCAL_STORE_ANN_LISTS > 0 turns on
+# an IVF index with that many clusters, searching the LOCAL_STORE_ANN_PROBE nearest ones.
+VECTOR_STORE = os.getenv("VECTOR_STORE", "qdrant")
+LOCAL_STORE_PATH = os.getenv("LOCAL_STORE_PATH", ".cache/local_store")
+LOCAL_STORE_ANN_LISTS = int(os.getenv("LOCAL_STORE_ANN_LISTS", "0"))
+LOCAL_STORE_ANN_PROBE = int(os.getenv("LOCAL_STORE_ANN_PROBE", "8"))
+
+# Generation backend: "huggingface" (remote Inference API) or "mock" (deterministic local
+# stand-in for offline and load testing, answering after LLM_MOCK_LATENCY seconds)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "huggingface")
+LLM_MOCK_LATENCY = float(os.getenv("LLM_MOCK_LATENCY", "0"))
+# Calls in flight at once, and how long a call may wait for a slot before failing
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "2"))
+# Deadline per call (all attempts), second attempt after LLM_HEDGE_AFTER seconds without
+# an answer (0 = only retry on errors), and attempts per call
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+LLM_HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "2"))
+# Circuit breaker: open after this many consecutive failures, probe again after the reset time
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+# Ask the LLM backend for schema-constrained JSON (falls back to plain decoding if the
+# provider rejects it), and re-query this many times when the answer cannot be parsed
+LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
+LLM_PARSE_RETRIES = int(os.getenv("LLM_PARSE_RETRIES", "1"))
+
+# Evidence retrieved per /factcheck claim when reranking is off
+FACTCHECK_TOP_K = int(os.getenv("FACTCHECK_TOP_K", "1"))
+# Prompt assembly: evidence at least PROMPT_DEDUP_SIMILARITY cosine-similar to an item already
+# chosen is dropped, the rest is ordered by MMR (relevance weight PROMPT_MMR_LAMBDA) and cut to
+# PROMPT_EVIDENCE_TOKENS, at most PROMPT_ITEM_TOKENS per item, counted with PROMPT_TOKENIZER.
+# The Mixtral tokenizer is gated on the Hub and needs HF_API_KEY; without a key a public
+# LLaMA tokenizer (same 32k SentencePiece family, close enough for budgeting) is used
+PROMPT_DEDUP_SIMILARITY = float(os.getenv("PROMPT_DEDUP_SIMILARITY", "0.95"))
+PROMPT_MMR_LAMBDA = float(os.getenv("PROMPT_MMR_LAMBDA", "0.7"))
+PROMPT_EVIDENCE_TOKENS = int(os.getenv("PROMPT_EVIDENCE_TOKENS", "1500"))
+PROMPT_ITEM_TOKENS = int(os.getenv("PROMPT_ITEM_TOKENS", "300"))
+PROMPT_TOKENIZER = os.getenv(
+    "PROMPT_TOKENIZER",
+    "mistralai/Mixtral-8x7B-Instruct-v0.1" if HF_API_KEY else "hf-internal-testing/llama-tokenizer"
+)
+
+# Port for the Prometheus endpoint of the ingestion pipeline while it runs (0 = off);
+# the API serves its metrics on /metrics
+INGEST_METRICS_PORT = int(os.getenv("INGEST_METRICS_PORT", "0"))
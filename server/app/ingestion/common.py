@@ -0,0 +1,84 @@
+# server/app/ingestion/common.py
+
+import argparse
+import asyncio
+from app.services.embedding_service import get_embeddings
+from app.services.db_service import ClaimWriter, filter_new_claims
+from app.ingestion.crawl_state import CrawlState, Checkpoint
+from app.ingestion.crawler import Crawler, crawl_listing
+from app.services import metrics
+
+def embed_claims(rows):
+    """
+    Embed a batch of scraped rows in one forward pass.
+    Each row is a dict with "claim", "verdict", "source_url" and "date".
+    Rows without a claim, or already stored with the same content hash, are dropped.
+    Returns (rows, embeddings) for the rows that remain.
+    """
+    rows = [r for r in rows if r.get("claim")]
+    if rows:
+        rows = filter_new_claims(rows)
+    if not rows:
+        return [], []
+
+    with metrics.INGEST_EMBED_SECONDS.time():
+        embeddings = get_embeddings([r["claim"] for r in rows])
+    metrics.INGEST_EMBEDDED.inc(len(rows))
+    return rows, embeddings
+
+def write_claims(rows, embeddings, writer):
+    for row, embedding in zip(rows, embeddings):
+        writer.add(row["claim"], row["verdict"], row["source_url"], row["date"], embedding)
+    return len(rows)
+
+def store_claims(rows, writer):
+    """
+    Embed a page worth of scraped rows in one batch and queue them on a ClaimWriter.
+    Returns the number of rows queued.
+    """
+    rows, embeddings = embed_claims(rows)
+    return write_claims(rows, embeddings, writer)
+
+async def crawl_source(source, base_url, parse_page, max_pages=50, resume=False):
+    """
+    Crawl one paginated listing into Qdrant.
+    `base_url` is the listing URL with a {} placeholder for the page number and
+    `parse_page(html)` turns a page into rows (see crawl_listing).
+    """
+    state = CrawlState()
+    checkpoint = Checkpoint(state, source)
+    start_page = state.next_page(source) if resume else 1
+    if start_page > 1:
+        print(f"Resuming {source} from page {start_page}")
+
+    async with Crawler() as crawler:
+        def commit():
+            # Pages are checkpointed, and their validators cached, once their
+            # points have been flushed to Qdrant; a failed run refetches them
+            pages, _ = checkpoint.commit()
+            crawler.save_cache(base_url.format(page) for page in pages)
+
+        def discard():
+            # The failed flush may have lost points of any page done since the last commit
+            pages, _ = checkpoint.discard()
+            crawler.discard_cache(base_url.format(page) for page in pages)
+
+        with ClaimWriter(on_flush=commit, on_error=discard) as writer:
+            async for page, rows in crawl_listing(
+                crawler, base_url, max_pages - start_page + 1, parse_page, start_page=start_page,
+                save=False, is_done=lambda page: state.page_done(source, page),
+            ):
+                print(f"Scraped {source} page {page}...")
+                await asyncio.to_thread(store_claims, rows, writer)
+                checkpoint.done(page)
+    state.close()
+
+def cli_args(description, max_pages=50):
+    """Command-line options shared by the scrapers."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--max-pages", type=int, default=max_pages, help="last listing page to crawl")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="skip pages already finished according to the crawl state store"
+    )
+    return parser.parse_args()
@@ -0,0 +1,159 @@
+# server/app/ingestion/crawl_state.py
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from app.config import CRAWL_STATE_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    source TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    done_at TEXT NOT NULL,
+    PRIMARY KEY (source, page)
+);
+CREATE TABLE IF NOT EXISTS urls (
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    done_at TEXT NOT NULL,
+    PRIMARY KEY (source, url)
+);
+CREATE TABLE IF NOT EXISTS failures (
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    last_at TEXT NOT NULL,
+    PRIMARY KEY (source, url)
+);
+"""
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class CrawlState:
+    """
+    Persistent crawl progress per source: finished listing pages, finished
+    article URLs and failed URLs. Safe to use from worker threads.
+    """
+
+    def __init__(self, path=CRAWL_STATE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def next_page(self, source, first_page=1):
+        """First page at or after `first_page` that has not been finished yet."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page FROM pages WHERE source = ? AND page >= ? ORDER BY page",
+                (source, first_page)
+            ).fetchall()
+        page = first_page
+        for (done,) in rows:
+            if done != page:
+                break
+            page += 1
+        return page
+
+    def page_done(self, source, page):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM pages WHERE source = ? AND page = ?", (source, page)
+            ).fetchone() is not None
+
+    def mark_pages(self, source, pages):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (source, page, done_at) VALUES (?, ?, ?)",
+                [(source, page, _now()) for page in pages]
+            )
+
+    def visited(self, source, urls):
+        """Subset of `urls` already finished for this source."""
+        urls = list(urls)
+        found = set()
+        with self._lock:
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(u for (u,) in self._conn.execute(
+                    f"SELECT url FROM urls WHERE source = ? AND url IN ({placeholders})",
+                    (source, *chunk)
+                ))
+        return found
+
+    def mark_urls(self, source, urls):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO urls (source, url, done_at) VALUES (?, ?, ?)",
+                [(source, url, _now()) for url in urls]
+            )
+            self._conn.executemany(
+                "DELETE FROM failures WHERE source = ? AND url = ?",
+                [(source, url) for url in urls]
+            )
+
+    def record_failure(self, source, url, error):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO failures (source, url, error, attempts, last_at) VALUES (?, ?, ?, 1, ?)
+                ON CONFLICT (source, url) DO UPDATE SET
+                    error = excluded.error, attempts = attempts + 1, last_at = excluded.last_at
+                """,
+                (source, url, str(error), _now())
+            )
+
+    def failures(self, source, max_attempts=None):
+        """Failed URLs for a source as (url, error, attempts), optionally only those tried fewer than max_attempts times."""
+        query = "SELECT url, error, attempts FROM failures WHERE source = ?"
+        params = [source]
+        if max_attempts is not None:
+            query += " AND attempts < ?"
+            params.append(max_attempts)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY last_at", params).fetchall()
+
+
+class Checkpoint:
+    """
+    Collects finished pages/URLs and writes them to the state store only once
+    their points are safely in Qdrant. Pass `commit` as ClaimWriter(on_flush=...).
+    """
+
+    def __init__(self, state, source):
+        self.state = state
+        self.source = source
+        self.pages = []
+        self.urls = []
+
+    def done(self, page=None, urls=()):
+        if page is not None:
+            self.pages.append(page)
+        self.urls.extend(urls)
+
+    def discard(self):
+        """Forget the collected pages and URLs (their points were not stored); returns them as (pages, urls)."""
+        pages, self.pages = self.pages, []
+        urls, self.urls = self.urls, []
+        return pages, urls
+
+    def commit(self):
+        """Write the collected pages and URLs; returns them as (pages, urls)."""
+        pages, self.pages = self.pages, []
+        urls, self.urls = self.urls, []
+        if pages:
+            self.state.mark_pages(self.source, pages)
+        if urls:
+            self.state.mark_urls(self.source, urls)
+        return pages, urls
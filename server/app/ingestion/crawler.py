@@ -0,0 +1,236 @@
+# server/app/ingestion/crawler.py
+
+import asyncio
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+import httpx
+from app.config import CRAWL_CONCURRENCY_PER_HOST, CRAWL_RATE_PER_HOST, CRAWL_BURST
+from app.ingestion.http_cache import default_cache
+
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/138.0.0.0 Safari/537.36"
+    )
+}
+REQUEST_TIMEOUT = 15
+MAX_RETRIES = 3
+
+# Returned by fetch_text() when the server answers 304 for a cached URL
+NOT_MODIFIED = object()
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Crawler:
+    """
+    Shared async HTTP engine for the scrapers.
+    One pooled httpx.AsyncClient, a concurrency cap and a token bucket per host,
+    and retries with backoff on 429/5xx and network errors. Requests are made
+    conditional on the on-disk HttpCache unless `cache` is None/False.
+    Fetches made with save=False keep their validators in memory until
+    save_cache() is called, i.e. once the caller has stored what it parsed.
+
+        async with Crawler() as crawler:
+            html = await crawler.fetch_text(url)
+    """
+
+    def __init__(
+        self,
+        concurrency_per_host: int = CRAWL_CONCURRENCY_PER_HOST,
+        rate_per_host: float = CRAWL_RATE_PER_HOST,
+        burst: int = CRAWL_BURST,
+        timeout: float = REQUEST_TIMEOUT,
+        max_retries: int = MAX_RETRIES,
+        headers: dict = HEADERS,
+        transport=None,
+        cache=True,
+    ):
+        self.concurrency_per_host = concurrency_per_host
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.headers = headers
+        self.transport = transport
+        self.cache = default_cache() if cache is True else (cache or None)
+        self.client = None
+        self._hosts = {}
+        # url -> (body, etag, last_modified) waiting for save_cache()
+        self._unsaved = {}
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            transport=self.transport,
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=self.concurrency_per_host * 8,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.client.aclose()
+
+    def _host(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = (
+                asyncio.Semaphore(self.concurrency_per_host),
+                TokenBucket(self.rate_per_host, self.burst),
+            )
+        return self._hosts[host]
+
+    async def _get(self, url, headers=None):
+        semaphore, bucket = self._host(url)
+        async with semaphore:
+            await bucket.acquire()
+            return await self.client.get(url, headers=headers)
+
+    async def fetch(self, url, headers=None):
+        """GET with retries. Returns the response (possibly a 4xx) or None if every attempt failed."""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                resp = await self._get(url, headers=headers)
+                if resp.status_code < 400:
+                    return resp
+                # 4xx other than 429: likely permanent for this URL
+                if resp.status_code < 500 and resp.status_code != 429:
+                    print(f"[WARN] {resp.status_code} for {url}")
+                    return resp
+                # 5xx or 429: retry, honouring Retry-After when the server sends one
+                backoff = 0.5 * attempt
+                retry_after = resp.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    backoff = max(backoff, float(retry_after))
+                print(f"[WARN] {resp.status_code} for {url}, retrying in {backoff:.1f}s...")
+                await asyncio.sleep(backoff)
+            except httpx.HTTPError as e:
+                backoff = 0.75 * attempt
+                print(f"[WARN] Request error on {url}: {e} (retry {attempt}/{self.max_retries})")
+                await asyncio.sleep(backoff)
+        return None
+
+    async def fetch_text(self, url, skip_unchanged=True, save=True, revalidate=True):
+        """
+        Body of a successful response, or None.
+        If the cached copy is still current the result is NOT_MODIFIED, or the
+        cached body when `skip_unchanged` is False.
+        With `save` False the response is only cached by a later save_cache(url).
+        With `revalidate` False the request is sent without validators.
+        """
+        headers = self.cache.conditional_headers(url) if self.cache and revalidate else None
+        resp = await self.fetch(url, headers=headers)
+        if resp is None:
+            return None
+
+        if resp.status_code == 304 and self.cache:
+            if skip_unchanged:
+                return NOT_MODIFIED
+            body = self.cache.body(url)
+            if body is not None:
+                return body.decode("utf-8")
+            # Cached body is gone; ask again without validators
+            resp = await self.fetch(url)
+            if resp is None:
+                return None
+
+        if resp.status_code != 200:
+            return None
+        if self.cache:
+            entry = (resp.text.encode("utf-8"), resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+            if save:
+                await asyncio.to_thread(self.cache.store, url, *entry)
+            else:
+                self._unsaved[url] = entry
+        return resp.text
+
+    async def fetch_all(self, urls, skip_unchanged=True, save=True):
+        """Fetch many URLs concurrently; results are in input order."""
+        return await asyncio.gather(*(self.fetch_text(url, skip_unchanged, save) for url in urls))
+
+    def save_cache(self, urls):
+        """Cache responses fetched with save=False. Blocking; call it from the writer's on_flush."""
+        for url in urls:
+            entry = self._unsaved.pop(url, None)
+            if entry and self.cache:
+                self.cache.store(url, *entry)
+
+    def discard_cache(self, urls):
+        """Forget validators held for save_cache(), e.g. when storing the pages failed."""
+        for url in urls:
+            self._unsaved.pop(url, None)
+
+
+async def crawl_listing(
+    crawler, url_template, max_pages, parse_page, start_page=1, prefetch=None, save=True, is_done=None
+):
+    """
+    Walk a paginated listing, yielding (page, rows) in page order.
+
+    Up to `prefetch` pages are downloaded ahead of the one being processed.
+    `parse_page(html)` returns a list of rows, or None when the page has no
+    articles, which ends the crawl. With `save` False pages must be cached with
+    crawler.save_cache() once stored.
+
+    Pages unchanged since the last crawl yield no rows if `is_done(page)` says they
+    were finished; otherwise they are fetched again without validators and parsed.
+    """
+    prefetch = prefetch or crawler.concurrency_per_host
+    pages = iter(range(start_page, start_page + max_pages))
+    pending = deque()
+
+    def schedule():
+        while len(pending) < prefetch:
+            page = next(pages, None)
+            if page is None:
+                return
+            task = asyncio.create_task(crawler.fetch_text(url_template.format(page), save=save))
+            pending.append((page, task))
+
+    schedule()
+    try:
+        while pending:
+            page, task = pending.popleft()
+            html = await task
+            schedule()
+
+            if html is NOT_MODIFIED:
+                if is_done and is_done(page):
+                    yield page, []
+                    continue
+                # Cached but never stored (e.g. an earlier run failed): parse it again
+                html = await crawler.fetch_text(url_template.format(page), save=save, revalidate=False)
+            rows = parse_page(html) if html is not None else None
+            if rows is None:
+                break
+            yield page, rows
+    finally:
+        for _, task in pending:
+            task.cancel()
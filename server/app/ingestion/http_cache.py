@@ -0,0 +1,119 @@
+# server/app/ingestion/http_cache.py
+
+import hashlib
+import json
+import os
+import threading
+
+from app.config import HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES
+
+
+class HttpCache:
+    """
+    On-disk cache of response bodies and their validators (ETag / Last-Modified).
+
+    Each URL is stored as <sha256>.body plus <sha256>.json. File mtimes double as
+    last-access times, and the oldest entries are evicted once the directory
+    grows past `max_bytes`.
+    """
+
+    def __init__(self, directory=HTTP_CACHE_DIR, max_bytes=HTTP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Running estimate of the directory size, so stores only rescan when over budget
+        self._size = sum(
+            os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)
+        )
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + ".body", base + ".json"
+
+    def lookup(self, url):
+        """Stored metadata for `url` ({"url", "etag", "last_modified"}) or None."""
+        _, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(meta_path)
+        return meta
+
+    def body(self, url):
+        body_path, _ = self._paths(url)
+        try:
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        os.utime(body_path)
+        return body
+
+    def conditional_headers(self, url):
+        meta = self.lookup(url)
+        if not meta:
+            return {}
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Remember a response. Without validators there is nothing to revalidate, so it is skipped."""
+        if not etag and not last_modified:
+            return
+        body_path, meta_path = self._paths(url)
+        # Overwriting an entry replaces its old files rather than adding to them
+        replaced = 0
+        for path in (body_path, meta_path):
+            try:
+                replaced += os.path.getsize(path)
+            except OSError:
+                pass
+        with open(body_path, "wb") as f:
+            f.write(body or b"")
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified}, f)
+
+        with self._lock:
+            self._size += len(body or b"") + os.path.getsize(meta_path) - replaced
+            over_budget = self._size > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        with self._lock:
+            # key -> [last access, size]; body and metadata are evicted together
+            entries = {}
+            total = 0
+            for name in os.listdir(self.directory):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entry = entries.setdefault(name.split(".")[0], [0.0, 0])
+                entry[0] = max(entry[0], st.st_mtime)
+                entry[1] += st.st_size
+                total += st.st_size
+
+            for key, (_, size) in sorted(entries.items(), key=lambda kv: kv[1][0]):
+                if total <= self.max_bytes:
+                    break
+                for ext in (".json", ".body"):
+                    try:
+                        os.remove(os.path.join(self.directory, key + ext))
+                    except OSError:
+                        pass
+                total -= size
+            self._size = total
+
+
+def default_cache():
+    """The shared cache from config, or None when HTTP_CACHE_DIR is empty."""
+    return HttpCache() if HTTP_CACHE_DIR else None
@@ -1,34 +1,295 @@
 # server/app/ingestion/ingest_all.py
 
-from app.ingestion.scrape_snope import scrape_snopes
-from app.ingestion.scrape_boomlive import scrape_boomlive
-from app.ingestion.scrape_altnews import scrape_altnews
-from app.ingestion.scrape_politifact import scrape_politifact
-from app.ingestion.scrape_factcheck_org import scrape_factcheck_org
-from app.ingestion.scrape_afp import scrape_afp
-
-def ingest_all():
-    print("Starting ingestion from all sources...\n")
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config import INGEST_PARSE_WORKERS, INGEST_QUEUE_SIZE, INGEST_EMBED_BATCH, INGEST_METRICS_PORT
+from app.services import metrics
+from app.services.db_service import ClaimWriter
+from app.ingestion.common import embed_claims, write_claims, cli_args
+from app.ingestion.crawl_state import CrawlState
+from app.ingestion.crawler import Crawler, NOT_MODIFIED
+from app.ingestion import (
+    scrape_snope, scrape_boomlive, scrape_altnews,
+    scrape_politifact, scrape_factcheck_org, scrape_afp,
+)
+
+# (name, listing URL template, listing page parser)
+SOURCES = [
+    (module.SOURCE, module.BASE_URL, module.parse_page)
+    for module in (
+        scrape_snope, scrape_boomlive, scrape_altnews,
+        scrape_politifact, scrape_factcheck_org, scrape_afp,
+    )
+]
+
+# End-of-stream marker passed between stages
+DONE = None
+
+
+class StageStats:
+    """Items handled by one pipeline stage and the time it spent working on them."""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+
+    def record(self, items, seconds):
+        self.items += items
+        self.busy += seconds
+
+
+async def _fetch_source(crawler, source, max_pages, html_queue, stopped, stats, state, resume):
+    """Download listing pages for one source a window at a time until the parser reports the end."""
+    name, url_template, parse_page = source
+    window = crawler.concurrency_per_host
+    page = state.next_page(name) if resume else 1
+    if page > 1:
+        print(f"[{name}] Resuming from page {page}")
+    while page <= max_pages and name not in stopped:
+        pages = list(range(page, min(page + window, max_pages + 1)))
+        started = time.monotonic()
+        # Validators are cached by the write stage once the page is in Qdrant
+        htmls = await crawler.fetch_all([url_template.format(p) for p in pages], save=False)
+        stats.record(len(pages), time.monotonic() - started)
+
+        for p, html in zip(pages, htmls):
+            if html is NOT_MODIFIED:
+                if state.page_done(name, p):
+                    # Same as last crawl: nothing to parse or embed
+                    metrics.INGEST_PAGES.labels(source=name, result="not_modified").inc()
+                    continue
+                # Cached but never stored (e.g. an earlier run failed): parse it again
+                html = await crawler.fetch_text(url_template.format(p), save=False, revalidate=False)
+            if html is None:
+                print(f"[{name}] Could not load page {p}, stopping.")
+                metrics.INGEST_PAGES.labels(source=name, result="failed").inc()
+                stopped.add(name)
+                break
+            metrics.INGEST_PAGES.labels(source=name, result="fetched").inc()
+            # Blocks while the parsers are behind
+            await html_queue.put((name, p, parse_page, html))
+        page += window
+
+async def _parse_worker(pool, html_queue, row_queue, stopped, stats):
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await html_queue.get()
+        if item is DONE:
+            break
+        name, page, parse_page, html = item
+
+        started = time.monotonic()
+        try:
+            rows = await loop.run_in_executor(pool, parse_page, html)
+        except Exception as e:
+            print(f"[{name}] Parsing page {page} failed: {e}")
+            metrics.ERRORS.labels(stage="ingest_parse").inc()
+            continue
+        stats.record(1, time.monotonic() - started)
+
+        if rows is None:
+            stopped.add(name)
+            continue
+        print(f"[{name}] Page {page}: {len(rows)} articles")
+        await row_queue.put((name, page, rows))
+
+def _page_entries(item):
+    """(page key, row, is last row of the page) tuples; an empty page still gets one marker entry."""
+    name, page, rows = item
+    if not rows:
+        return [((name, page), None, True)]
+    return [((name, page), row, i == len(rows) - 1) for i, row in enumerate(rows)]
 
-    print("1. Snopes")
-    scrape_snopes(max_pages=50)
-    
-    print("2. BoomLive")
-    scrape_boomlive(max_pages=50)
-    
-    print("3. AltNews")
-    scrape_altnews(max_pages=50)
-    
-    print("4. PolitiFact")
-    scrape_politifact(max_pages=50)
-    
-    print("5. FactCheck.org")
-    scrape_factcheck_org(max_pages=50)
-    
-    print("6. AFP Fact Check")
-    scrape_afp(max_pages=50)
+async def _embed_stage(row_queue, write_queue, stats):
+    """
+    Single consumer that merges pages into INGEST_EMBED_BATCH-sized encode calls.
+    Each batch is passed on with the pages it has rows from and the pages it
+    completes, for checkpointing. A page with rows in a failed batch is never
+    reported as completed.
+    """
+    pending = []
+    failed = set()
+    finished = False
+    while not finished:
+        item = await row_queue.get()
+        if item is DONE:
+            finished = True
+        else:
+            pending.extend(_page_entries(item))
 
+        # Take whatever else is already waiting, up to a full batch
+        while not finished and len(pending) < INGEST_EMBED_BATCH and not row_queue.empty():
+            item = row_queue.get_nowait()
+            if item is DONE:
+                finished = True
+            else:
+                pending.extend(_page_entries(item))
+
+        while pending:
+            batch, pending = pending[:INGEST_EMBED_BATCH], pending[INGEST_EMBED_BATCH:]
+            started = time.monotonic()
+            try:
+                rows, embeddings = await asyncio.to_thread(
+                    embed_claims, [row for _, row, _ in batch if row is not None]
+                )
+            except Exception as e:
+                print(f"[ERR] Embedding failed for {len(batch)} rows: {e}")
+                metrics.ERRORS.labels(stage="ingest_embed").inc()
+                failed.update(key for key, _, last in batch if not last)
+                failed.difference_update(key for key, _, last in batch if last)
+                continue
+            completed = [key for key, _, last in batch if last and key not in failed]
+            failed.difference_update(key for key, _, last in batch if last)
+            stats.record(len(rows), time.monotonic() - started)
+            if rows or completed:
+                pages = {key for key, _, _ in batch}
+                await write_queue.put((rows, embeddings, pages, completed))
+
+    await write_queue.put(DONE)
+
+def _write_and_checkpoint(rows, embeddings, completed, writer, state, crawler, templates):
+    write_claims(rows, embeddings, writer)
+    if completed:
+        # Pages only count as finished once their points are in Qdrant
+        writer.flush()
+        for name, page in completed:
+            state.mark_pages(name, [page])
+        crawler.save_cache(templates[name].format(page) for name, page in completed)
+
+async def _write_stage(write_queue, writer, state, stats, crawler, templates):
+    """
+    Writes embedded rows and checkpoints completed pages. A page with rows
+    buffered when a write failed is never checkpointed, even once its last
+    rows are written.
+    """
+    # Pages with rows in the writer's buffer since its last flush
+    buffered = set()
+    failed = set()
+    while True:
+        item = await write_queue.get()
+        if item is DONE:
+            break
+        rows, embeddings, pages, completed = item
+        buffered.update(pages)
+        done = [key for key in completed if key not in failed]
+        started = time.monotonic()
+        try:
+            await asyncio.to_thread(
+                _write_and_checkpoint, rows, embeddings, done, writer, state, crawler, templates
+            )
+        except Exception as e:
+            print(f"[ERR] Qdrant insert failed: {e}")
+            metrics.ERRORS.labels(stage="ingest_upsert").inc()
+            failed.update(buffered)
+            buffered.clear()
+            continue
+        if done:
+            # _write_and_checkpoint flushed the writer
+            buffered.clear()
+        failed.difference_update(completed)
+        stats.record(len(rows), time.monotonic() - started)
+
+    started = time.monotonic()
+    try:
+        await asyncio.to_thread(writer.close)
+    except Exception as e:
+        print(f"[ERR] Qdrant insert failed: {e}")
+    stats.record(0, time.monotonic() - started)
+
+async def _monitor_queues(queues, depths, interval=0.2):
+    while True:
+        for name, queue in queues.items():
+            depths[name].append(queue.qsize())
+        await asyncio.sleep(interval)
+
+def _summarize(stats, queues, depths, elapsed):
+    summary = {"elapsed": elapsed, "stages": {}, "queues": {}}
+    for s in stats.values():
+        summary["stages"][s.name] = {
+            "items": s.items,
+            "busy_seconds": s.busy,
+            "items_per_busy_second": s.items / s.busy if s.busy else 0.0,
+            "items_per_second": s.items / elapsed if elapsed else 0.0,
+        }
+    for name, queue in queues.items():
+        samples = depths[name] or [0]
+        summary["queues"][name] = {
+            "capacity": queue.maxsize,
+            "avg_depth": sum(samples) / len(samples),
+            "max_depth": max(samples),
+        }
+    return summary
+
+def print_summary(summary):
+    print(f"\n[SUMMARY] Pipeline finished in {summary['elapsed']:.1f}s")
+    print(f"{'stage':<8}{'items':>8}{'busy s':>10}{'items/busy s':>14}{'items/s':>10}")
+    for name, s in summary["stages"].items():
+        print(f"{name:<8}{s['items']:>8}{s['busy_seconds']:>10.1f}"
+              f"{s['items_per_busy_second']:>14.1f}{s['items_per_second']:>10.1f}")
+    # A queue that sits near capacity feeds a stage that is the bottleneck
+    print(f"{'queue':<8}{'avg depth':>10}{'max depth':>10}{'capacity':>10}")
+    for name, q in summary["queues"].items():
+        print(f"{name:<8}{q['avg_depth']:>10.1f}{q['max_depth']:>10}{q['capacity']:>10}")
+
+async def run_pipeline(max_pages=50, sources=SOURCES, parse_workers=INGEST_PARSE_WORKERS, resume=False):
+    """
+    fetch (all sources concurrently) -> parse (process pool) -> embed (one batching
+    consumer) -> upsert (bulk writer), with bounded queues between the stages.
+    With `resume`, each source starts at its first unfinished page.
+    Returns a per-stage throughput and queue depth summary.
+    """
+    queues = {
+        "html": asyncio.Queue(INGEST_QUEUE_SIZE),
+        "rows": asyncio.Queue(INGEST_QUEUE_SIZE),
+        "write": asyncio.Queue(INGEST_QUEUE_SIZE),
+    }
+    stats = {name: StageStats(name) for name in ("fetch", "parse", "embed", "upsert")}
+    depths = {name: [] for name in queues}
+    stopped = set()
+    state = CrawlState()
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+        async with Crawler() as crawler:
+            writer = ClaimWriter()
+            monitor = asyncio.create_task(_monitor_queues(queues, depths))
+            parsers = [
+                asyncio.create_task(_parse_worker(pool, queues["html"], queues["rows"], stopped, stats["parse"]))
+                for _ in range(parse_workers)
+            ]
+            embedder = asyncio.create_task(_embed_stage(queues["rows"], queues["write"], stats["embed"]))
+            templates = {name: url_template for name, url_template, _ in sources}
+            upserter = asyncio.create_task(
+                _write_stage(queues["write"], writer, state, stats["upsert"], crawler, templates)
+            )
+
+            await asyncio.gather(*(
+                _fetch_source(crawler, source, max_pages, queues["html"], stopped, stats["fetch"], state, resume)
+                for source in sources
+            ))
+            for _ in parsers:
+                await queues["html"].put(DONE)
+            await asyncio.gather(*parsers)
+            await queues["rows"].put(DONE)
+            await embedder
+            await upserter
+            monitor.cancel()
+
+    state.close()
+    return _summarize(stats, queues, depths, time.monotonic() - started)
+
+def ingest_all(max_pages=50, resume=False):
+    print("Starting ingestion from all sources...\n")
+    if INGEST_METRICS_PORT:
+        metrics.start_metrics_server(INGEST_METRICS_PORT)
+    summary = asyncio.run(run_pipeline(max_pages=max_pages, resume=resume))
+    print_summary(summary)
     print("\nIngestion completed!")
+    return summary
 
 if __name__ == "__main__":
-    ingest_all()
+    args = cli_args("Ingest fact-checks from every source into Qdrant.")
+    ingest_all(max_pages=args.max_pages, resume=args.resume)
@@ -2,9 +2,9 @@
 
 import feedparser
 import re
-from datetime import datetime
-from app.services.embedding_service import get_embedding
-from app.services.db_service import insert_claim
+from app.services.db_service import ClaimWriter
+from app.ingestion.common import store_claims
+from app.ingestion.http_cache import default_cache
 
 SOURCES = [
     {"name": "Snopes", "url": "https://www.snopes.com/feed/"},
@@ -36,25 +36,50 @@ def extract_verdict(title, summary):
     return "Unverified"
 
 def ingest_rss():
-    for source in SOURCES:
-        print(f"📡 Fetching from {source['name']}...")
-        feed = feedparser.parse(source["url"])
+    cache = default_cache()
+    with ClaimWriter() as writer:
+        for source in SOURCES:
+            print(f"📡 Fetching from {source['name']}...")
+            # Conditional GET: feedparser sends If-None-Match / If-Modified-Since
+            validators = (cache.lookup(source["url"]) if cache else None) or {}
+            feed = feedparser.parse(
+                source["url"],
+                etag=validators.get("etag"),
+                modified=validators.get("last_modified")
+            )
+            if feed.get("status") == 304:
+                print(f"⏭️  {source['name']} not modified since last poll")
+                continue
 
-        for entry in feed.entries:
-            claim_text = clean_html(entry.get("title", ""))
-            summary = clean_html(entry.get("summary", ""))
-            link = entry.get("link", "")
-            date_published = entry.get("published", datetime.utcnow().isoformat())
+            rows = []
+            for entry in feed.entries:
+                claim_text = clean_html(entry.get("title", ""))
+                summary = clean_html(entry.get("summary", ""))
+                link = entry.get("link", "")
+                # No "now" fallback: the date is part of the content hash, so it must be
+                # the same on every poll or the entry would be re-embedded each time
+                date_published = entry.get("published") or entry.get("updated")
 
-            verdict = extract_verdict(claim_text, summary)
+                verdict = extract_verdict(claim_text, summary)
 
-            if not claim_text.strip():
-                continue
+                if not claim_text.strip():
+                    continue
 
-            embedding = get_embedding(claim_text)
-            insert_claim(claim_text, verdict, link, date_published)
+                rows.append({
+                    "claim": claim_text,
+                    "verdict": verdict,
+                    "source_url": link,
+                    "date": date_published,
+                })
 
-            print(f"✅ Inserted: {claim_text[:70]}... [{verdict}]")
+            # Duplicates and unchanged entries are dropped by store_claims
+            queued = store_claims(rows, writer)
+            # Remember the validators only once the entries are in Qdrant, so a
+            # failed run polls the whole feed again instead of getting a 304
+            writer.flush()
+            if cache:
+                cache.store(source["url"], b"", feed.get("etag"), feed.get("modified"))
+            print(f"✅ {source['name']}: {queued} new or changed of {len(rows)} entries")
 
 if __name__ == "__main__":
     ingest_rss()
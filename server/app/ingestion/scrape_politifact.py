@@ -1,37 +1,48 @@
 # server/app/ingestion/scrape_politifact.py
 
-import requests
+import asyncio
 from bs4 import BeautifulSoup
-from app.services.embedding_service import get_embedding
-from app.services.db_service import insert_claim
+from app.ingestion.common import crawl_source, cli_args
 
+SOURCE = "PolitiFact"
 BASE_URL = "https://www.politifact.com/factchecks/list/?page={}"
 
-def scrape_politifact(max_pages=50):
-    for page in range(1, max_pages + 1):
-        print(f"Scraping PolitiFact page {page}...")
-        resp = requests.get(BASE_URL.format(page))
-        soup = BeautifulSoup(resp.text, "html.parser")
-
-        articles = soup.select("li.o-listicle__item")
-        if not articles:
-            break
-
-        for article in articles:
-            title_tag = article.select_one("div.m-statement__quote")
-            claim_text = title_tag.text.strip() if title_tag else None
-            link_tag = article.select_one("a.m-statement__quote__link")
-            link = "https://www.politifact.com" + link_tag["href"] if link_tag else None
-            verdict_tag = article.select_one("div.m-statement__meter span")  # adjust if needed
-            verdict = verdict_tag.text.strip() if verdict_tag else "Unverified"
-            date_tag = article.select_one("footer.m-statement__footer time")
-            date_published = date_tag["datetime"] if date_tag else None
-
-            if not claim_text:
-                continue
-
-            embedding = get_embedding(claim_text)
-            insert_claim(claim_text, verdict, link, date_published, embedding)
+def parse_page(html):
+    """Rows for every article on one listing page, or None when the page has no articles."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    articles = soup.select("li.o-listicle__item")
+    if not articles:
+        return None
+
+    rows = []
+    for article in articles:
+        title_tag = article.select_one("div.m-statement__quote")
+        claim_text = title_tag.text.strip() if title_tag else None
+        link_tag = article.select_one("a.m-statement__quote__link")
+        link = "https://www.politifact.com" + link_tag["href"] if link_tag else None
+        verdict_tag = article.select_one("div.m-statement__meter span")  # adjust if needed
+        verdict = verdict_tag.text.strip() if verdict_tag else "Unverified"
+        date_tag = article.select_one("footer.m-statement__footer time")
+        date_published = date_tag["datetime"] if date_tag else None
+
+        if not claim_text:
+            continue
+
+        rows.append({
+            "claim": claim_text,
+            "verdict": verdict,
+            "source_url": link,
+            "date": date_published,
+        })
+    return rows
+
+async def crawl_politifact(max_pages=50, resume=False):
+    await crawl_source(SOURCE, BASE_URL, parse_page, max_pages, resume)
+
+def scrape_politifact(max_pages=50, resume=False):
+    asyncio.run(crawl_politifact(max_pages, resume))
 
 if __name__ == "__main__":
-    scrape_politifact(max_pages=50)
+    args = cli_args("Scrape PolitiFact fact-checks into Qdrant.", max_pages=50)
+    scrape_politifact(max_pages=args.max_pages, resume=args.resume)
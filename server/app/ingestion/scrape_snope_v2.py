@@ -1,51 +1,24 @@
 # server/app/ingestion/scrape_snope_v2.py
 
-import time
-import math
-import requests
+import argparse
+import asyncio
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-from app.services.embedding_service import get_embedding
-from app.services.db_service import insert_claim
+from app.services.db_service import ClaimWriter, stored_urls
+from app.ingestion.common import store_claims
+from app.ingestion.crawl_state import CrawlState, Checkpoint
+from app.ingestion.crawler import Crawler, NOT_MODIFIED
 
+SOURCE = "Snopes archive"
 BASE_ARCHIVE = "https://www.snopes.com/fact-check/?pagenum={}"
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/138.0.0.0 Safari/537.36"
-    )
-}
-REQUEST_TIMEOUT = 15
-SLEEP_BETWEEN_REQUESTS = 0.35  # be polite
-MAX_RETRIES = 3
-
-def _fetch(url):
-    """GET with basic retries."""
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            resp = requests.get(url, headers=HEADERS, timeout=REQUEST_TIMEOUT)
-            if resp.status_code == 200:
-                return resp
-            # 4xx other than 429: likely permanent for this URL
-            if 400 <= resp.status_code < 500 and resp.status_code != 429:
-                print(f"[WARN] {resp.status_code} for {url}")
-                return resp
-            # 5xx or 429: retry
-            backoff = 0.5 * attempt
-            print(f"[WARN] {resp.status_code} for {url}, retrying in {backoff:.1f}s...")
-            time.sleep(backoff)
-        except requests.RequestException as e:
-            backoff = 0.75 * attempt
-            print(f"[WARN] Request error on {url}: {e} (retry {attempt}/{MAX_RETRIES})")
-            time.sleep(backoff)
-    return None
+# Failed articles are retried on --resume until they have failed this often
+MAX_ARTICLE_ATTEMPTS = 3
 
-def _soup(url):
-    resp = _fetch(url)
-    if not resp:
-        return None
-    return BeautifulSoup(resp.text, "html.parser")
+async def _soup(crawler, url, skip_unchanged=True, revalidate=True):
+    # Cached by crawler.save_cache() once the page or article is in Qdrant
+    html = await crawler.fetch_text(url, skip_unchanged, save=False, revalidate=revalidate)
+    if html is None or html is NOT_MODIFIED:
+        return html
+    return BeautifulSoup(html, "html.parser")
 
 def _extract_archive_links(soup: BeautifulSoup):
     """
@@ -121,10 +94,10 @@ def _parse_claim_text(soup: BeautifulSoup):
 
     return None
 
-def scrape_article(url: str):
-    s = _soup(url)
-    if not s:
-        return None
+async def scrape_article(crawler, url: str, revalidate: bool = True):
+    s = await _soup(crawler, url, revalidate=revalidate)
+    if s is None or s is NOT_MODIFIED:
+        return s
 
     claim = _parse_claim_text(s)
     verdict = _parse_verdict(s)
@@ -137,71 +110,157 @@ def scrape_article(url: str):
         "date": date_iso,
     }
 
-def scrape_snopes(start_page: int = 1, max_pages: int | None = None):
-    page = start_page
+async def _scrape_articles(crawler, urls, state):
+    """
+    Fetch and parse articles concurrently; the crawler's per-host limits keep it polite.
+    Returns (rows, finished_urls). Failures are recorded in the crawl state.
+    """
+    results = await asyncio.gather(*(scrape_article(crawler, url) for url in urls))
+
+    # Unchanged articles only count as finished if an earlier run stored them
+    unchanged = [url for url, data in zip(urls, results) if data is NOT_MODIFIED]
+    stored = state.visited(SOURCE, unchanged)
+    refetch = [url for url in unchanged if url not in stored]
+    if refetch:
+        refetched = dict(zip(refetch, await asyncio.gather(
+            *(scrape_article(crawler, url, revalidate=False) for url in refetch)
+        )))
+        results = [refetched.get(url, data) for url, data in zip(urls, results)]
+
+    rows = []
+    finished = []
+    for idx, (url, data) in enumerate(zip(urls, results), start=1):
+        print(f"  [{idx:02d}/{len(urls)}] Article → {url}")
+        if data is NOT_MODIFIED:
+            print("    [SKIP] Not modified since last crawl.")
+            finished.append(url)
+            continue
+        if not data:
+            print("    [SKIP] Failed to scrape article.")
+            state.record_failure(SOURCE, url, "fetch failed")
+            continue
+
+        if not data["claim"]:
+            print("    [SKIP] No claim (H1) found.")
+            state.record_failure(SOURCE, url, "no claim (H1) found")
+            continue
+
+        rows.append(data)
+        finished.append(url)
+        print(f"    [OK] Parsed → verdict='{data['verdict']}' date='{data['date']}'")
+    return rows, finished
+
+async def crawl_snopes(
+    start_page: int = 1,
+    max_pages: int | None = None,
+    refetch_existing: bool = False,
+    resume: bool = False,
+):
+    state = CrawlState()
+    checkpoint = Checkpoint(state, SOURCE)
     total_inserted = 0
     seen_urls = set()
-
-    while True:
-        if max_pages is not None and page >= start_page + max_pages:
-            print(f"[DONE] Reached max_pages at page {page}.")
-            break
-
-        archive_url = BASE_ARCHIVE.format(page)
-        print(f"\n=== Scraping Snopes archive page {page}: {archive_url}")
-        soup = _soup(archive_url)
-        if not soup:
-            print("[STOP] Could not load archive page.")
-            break
-
-        links = _extract_archive_links(soup)
-        if not links:
-            print("[STOP] No article links found on this page. Assuming end of archive.")
-            break
-
-        print(f"Found {len(links)} article links.")
-
-        for idx, url in enumerate(links, start=1):
-            if url in seen_urls:
-                continue
-            seen_urls.add(url)
-
-            print(f"  [{idx:02d}/{len(links)}] Article → {url}")
-            data = scrape_article(url)
-            time.sleep(SLEEP_BETWEEN_REQUESTS)
-
-            if not data:
-                print("    [SKIP] Failed to scrape article.")
-                continue
-
-            claim = data["claim"]
-            verdict = data["verdict"]
-            source_url = data["source_url"]
-            date_iso = data["date"]
-
-            if not claim:
-                print("    [SKIP] No claim (H1) found.")
-                continue
-
+    crawler = Crawler()
+
+    def commit():
+        # Pages and article URLs are checkpointed, and their validators cached,
+        # once their points are flushed to Qdrant
+        pages, urls = checkpoint.commit()
+        crawler.save_cache([BASE_ARCHIVE.format(p) for p in pages] + urls)
+
+    def discard():
+        # A failed flush: nothing done since the last commit is known to be stored
+        pages, urls = checkpoint.discard()
+        crawler.discard_cache([BASE_ARCHIVE.format(p) for p in pages] + urls)
+
+    writer = ClaimWriter(on_flush=commit, on_error=discard)
+
+    page = state.next_page(SOURCE, start_page) if resume else start_page
+    if page != start_page:
+        print(f"[RESUME] Continuing from archive page {page}.")
+
+    async with crawler:
+        if resume:
+            retry = [url for url, _, _ in state.failures(SOURCE, max_attempts=MAX_ARTICLE_ATTEMPTS)]
+            if retry:
+                print(f"\n=== Retrying {len(retry)} previously failed articles")
+                rows, finished = await _scrape_articles(crawler, retry, state)
+                try:
+                    total_inserted += await asyncio.to_thread(store_claims, rows, writer)
+                    checkpoint.done(urls=finished)
+                except Exception as e:
+                    print(f"    [ERR] Embedding/insert failed for retried articles: {e}")
+
+        while True:
+            if max_pages is not None and page >= start_page + max_pages:
+                print(f"[DONE] Reached max_pages at page {page}.")
+                break
+
+            archive_url = BASE_ARCHIVE.format(page)
+            print(f"\n=== Scraping Snopes archive page {page}: {archive_url}")
+            soup = await _soup(crawler, archive_url, skip_unchanged=not refetch_existing)
+            if soup is NOT_MODIFIED:
+                if state.page_done(SOURCE, page):
+                    print("[CACHE] Archive page unchanged since last crawl, skipping.")
+                    page += 1
+                    continue
+                # Cached but never stored (e.g. an earlier run failed): parse it again
+                soup = await _soup(crawler, archive_url, revalidate=False)
+            if not soup:
+                print("[STOP] Could not load archive page.")
+                break
+
+            links = _extract_archive_links(soup)
+            if not links:
+                print("[STOP] No article links found on this page. Assuming end of archive.")
+                break
+
+            print(f"Found {len(links)} article links.")
+
+            # Articles already in Qdrant or finished in an earlier run are not fetched again
+            known = set() if refetch_existing else await asyncio.to_thread(stored_urls, links)
+            known |= state.visited(SOURCE, links)
+            if known:
+                print(f"Skipping {len(known)} already stored articles.")
+
+            todo = [u for u in links if u not in seen_urls and u not in known]
+            seen_urls.update(todo)
+
+            rows, finished = await _scrape_articles(crawler, todo, state)
+
+            # Embed and upsert the whole page in one go
             try:
-                emb = get_embedding(claim)
+                total_inserted += await asyncio.to_thread(store_claims, rows, writer)
+                checkpoint.done(page, urls=finished)
             except Exception as e:
-                print(f"    [ERR] Embedding failed: {e}")
-                continue
+                print(f"    [ERR] Embedding/insert failed for page {page}: {e}")
 
-            try:
-                insert_claim(claim, verdict, source_url, date_iso, emb)
-                total_inserted += 1
-                print(f"    [OK] Inserted → verdict='{verdict}' date='{date_iso}'")
-            except Exception as e:
-                print(f"    [ERR] Qdrant insert failed: {e}")
-
-        # small pause between archive pages
-        time.sleep(SLEEP_BETWEEN_REQUESTS)
-        page += 1
+            page += 1
 
+    try:
+        writer.close()
+    except Exception as e:
+        print(f"[ERR] Qdrant insert failed: {e}")
+    state.close()
     print(f"\n[SUMMARY] Inserted {total_inserted} articles total.")
 
+def scrape_snopes(
+    start_page: int = 1,
+    max_pages: int | None = None,
+    refetch_existing: bool = False,
+    resume: bool = False,
+):
+    asyncio.run(crawl_snopes(start_page, max_pages, refetch_existing, resume))
+
 if __name__ == "__main__":
-    # Set max_pages=None to run until the archive ends.
-    scrape_snopes(start_page=68, max_pages=200)
+    parser = argparse.ArgumentParser(description="Backfill the Snopes fact-check archive into Qdrant.")
+    parser.add_argument("--start-page", type=int, default=1)
+    # Leave --max-pages unset to run until the archive ends.
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--refetch-existing", action="store_true", help="re-fetch articles already in Qdrant")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="continue after the last finished archive page and retry failed articles"
+    )
+    args = parser.parse_args()
+    scrape_snopes(args.start_page, args.max_pages, args.refetch_existing, args.resume)
@@ -1,53 +1,184 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from app.services.embedding_service import get_embedding
-from app.services.db_service import search_claim
-from app.services.huggingface_service import query_llm
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import date
+from typing import List, Optional
 
-app = FastAPI()
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from pydantic import BaseModel, Field
+from app.config import BATCH_MAX_CLAIMS, BATCH_LLM_CONCURRENCY, EMBED_WARMUP, LLM_PARSE_RETRIES
+from app.services import embedding_service, db_service
+from app.services.embedding_service import (
+    get_embedding_async, get_embeddings_async, get_stats as get_embedding_stats,
+)
+from app.services.db_service import search_claim_async, search_claims_batch_async, build_filter
+from app.services.huggingface_service import query_llm, stream_llm, LLM_ERROR_RESPONSE, get_stats as get_llm_stats
+from app.services.factcheck_cache import factcheck_cache
+from app.services import rerank_service, verdict_parser, prompt_builder, metrics
+from app.services.verdict_parser import parse_verdict, IncrementalVerdictParser
+from app.services.prompt_builder import build_evidence
 
-class SearchRequest(BaseModel):
+# Startup progress, reported by /ready
+startup = {"qdrant": False, "error": None}
+
+async def _warm_up():
+    try:
+        await asyncio.to_thread(db_service.get_client)
+        startup["qdrant"] = True
+        if EMBED_WARMUP:
+            await asyncio.to_thread(embedding_service.warm_up)
+            await asyncio.to_thread(prompt_builder.get_tokenizer)
+    except Exception as e:
+        startup["error"] = str(e)
+        print(f"[ERR] Startup failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app):
+    # Warm up in the background: the server accepts connections right away
+    # and /ready turns 200 once the model and Qdrant are usable
+    task = asyncio.create_task(_warm_up())
+    yield
+    task.cancel()
+    # embedding_service.executor is module-level and outlives the app (tests and
+    # benchmarks run several lifespans in one process), so it is not shut down here
+    await db_service.close_clients()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    """Latency and status per endpoint. Streaming endpoints are timed until their first byte."""
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception:
+        metrics.ERRORS.labels(stage="http").inc()
+        raise
+    route = request.scope.get("route")
+    endpoint = route.path if route is not None else "unmatched"
+    metrics.REQUEST_SECONDS.labels(endpoint=endpoint).observe(time.perf_counter() - started)
+    metrics.REQUESTS.labels(endpoint=endpoint, status=str(response.status_code)).inc()
+    if response.status_code >= 500:
+        metrics.ERRORS.labels(stage="http").inc()
+    return response
+
+class SearchFilters(BaseModel):
+    """Optional restrictions on the evidence: publishers (e.g. "snopes.com"), exact verdicts, date range."""
+    sources: Optional[List[str]] = None
+    verdicts: Optional[List[str]] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+    def query_filter(self):
+        # date_to is inclusive of the whole day
+        date_to = f"{self.date_to.isoformat()}T23:59:59Z" if self.date_to else None
+        try:
+            return build_filter(self.sources, self.verdicts, self.date_from, date_to)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+class SearchRequest(SearchFilters):
     text: str
-class FactCheckRequest(BaseModel):
+class FactCheckRequest(SearchFilters):
     claim: str
+class BatchSearchRequest(SearchFilters):
+    texts: List[str] = Field(min_length=1, max_length=BATCH_MAX_CLAIMS)
+class BatchFactCheckRequest(SearchFilters):
+    claims: List[str] = Field(min_length=1, max_length=BATCH_MAX_CLAIMS)
 
 @app.get("/")
 def root():
     return {"message": "Welcome to the Fact-Check API. Use /search to find claims."}
 
+@app.get("/ready")
+def ready():
+    status = {
+        "model_loaded": embedding_service.model_loaded(),
+        "qdrant": startup["qdrant"],
+        "error": startup["error"],
+    }
+    # Without warm-up the model loads on the first request, so it is not required here
+    is_ready = status["qdrant"] and (status["model_loaded"] or not EMBED_WARMUP)
+    return JSONResponse(status, status_code=200 if is_ready else 503)
+
+@app.get("/stats")
+def stats():
+    return {
+        "embedding": get_embedding_stats(),
+        "factcheck_cache": factcheck_cache.stats(),
+        "rerank": rerank_service.stats.snapshot(),
+        "llm": get_llm_stats(),
+        "verdict_parser": verdict_parser.stats.snapshot(),
+    }
+
+metrics.register_stats(stats)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/search")
-def search_claims(request: SearchRequest):
-    embedding = get_embedding(request.text)
-    results = search_claim(embedding, top_k=5)
-    return [
-        {
-            "id": r.id,
-            "score": r.score,
-            "text": r.payload["text"],
-            "verdict": r.payload["verdict"],
-            "source_url": r.payload["source_url"],
-            "date": r.payload["date"]
-        }
-        for r in results
-    ]
+async def search_claims(request: SearchRequest):
+    embedding = await get_embedding_async(request.text)
+    results = await search_claim_async(
+        embedding, top_k=5, query_filter=request.query_filter(), query_text=request.text
+    )
+    return [_search_hit(r) for r in results]
 
-@app.post("/factcheck")
-async def factcheck_claim(request: FactCheckRequest):
-    # Get embedding
-    embedding = get_embedding(request.claim)
+def _search_hit(r):
+    return {
+        "id": r.id,
+        "score": r.score,
+        "text": r.payload["text"],
+        "verdict": r.payload["verdict"],
+        "source_url": r.payload["source_url"],
+        "date": r.payload["date"]
+    }
+
+@contextmanager
+def _timed(timings, key):
+    """Time a stage into `timings[key]` (ms) and the stage latency histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.STAGE_SECONDS.labels(stage=key.removesuffix("_ms")).observe(seconds)
+        if timings is not None:
+            timings[key] = round(seconds * 1000, 2)
 
-    # Retrieve top-K evidence
-    results = search_claim(embedding, top_k=1)
+async def _retrieve(claim: str, query_filter=None, timings=None):
+    """
+    Embed the claim, fetch candidate evidence and rerank it (when enabled).
+    Returns (embedding, results, evidence text) with the evidence deduplicated
+    and fitted to the prompt budget; stage latencies go into `timings`.
+    """
+    timings = {} if timings is None else timings
+    with _timed(timings, "embed_ms"):
+        embedding = await get_embedding_async(claim)
+    with _timed(timings, "search_ms"):
+        results = await search_claim_async(
+            embedding, top_k=rerank_service.candidate_count(), query_filter=query_filter, query_text=claim,
+            with_vectors=True
+        )
+    with _timed(timings, "rerank_ms"):
+        results = await rerank_service.rerank_async(claim, results, embedding)
+    with _timed(timings, "prompt_ms"):
+        results, evidence_text = await _build_evidence(results)
+    return embedding, results, evidence_text
 
-    evidence_text = "\n\n".join([
-    f"- {r.payload['text']} "
-    f"(Source: {r.payload['source_url']}, Date: {r.payload['date']}, "
-    f"verdict: {r.payload['verdict'].replace('About this rating', '').strip()})"
-    for r in results
-])
+async def _build_evidence(results):
+    # The first call may load or download the tokenizer; keep that off the event loop
+    if prompt_builder.tokenizer_loaded():
+        return build_evidence(results)
+    return await asyncio.to_thread(build_evidence, results)
 
-    prompt = f"""
-    Claim: {request.claim}
+def build_prompt(claim: str, evidence_text: str):
+    return f"""
+    Claim: {claim}
 
     Evidence:
     {evidence_text}
@@ -61,11 +192,176 @@ async def factcheck_claim(request: FactCheckRequest):
     }}
     """
 
+STRICT_SUFFIX = "\n    Respond with only the JSON object, no other text."
+
+async def _query_verdict(prompt: str):
+    """
+    LLM answer plus its parsed Verdict. A malformed answer is repaired first;
+    only if that fails is the LLM asked again (up to LLM_PARSE_RETRIES times).
+    """
     llm_response = await query_llm(prompt)
+    verdict, outcome = parse_verdict(llm_response)
+    retries = LLM_PARSE_RETRIES
+    while verdict is None and retries > 0 and llm_response != LLM_ERROR_RESPONSE:
+        retries -= 1
+        verdict_parser.stats.record("requeried")
+        llm_response = await query_llm(prompt + STRICT_SUFFIX)
+        verdict, outcome = parse_verdict(llm_response)
+    return llm_response, verdict
 
-    return {
+def _verdict_dict(verdict):
+    return verdict.model_dump() if verdict is not None else None
+
+async def _check(claim, embedding, results, evidence_text, timings=None):
+    """LLM verdict for a claim and its retrieved evidence, served from the cache when possible."""
+    # Same claim against the same evidence: reuse the earlier verdict
+    evidence_ids = [r.id for r in results]
+    cached = factcheck_cache.get(claim, evidence_ids, embedding)
+    if cached is not None:
+        return {**cached, "claim": claim, "cached": True}
+
+    with _timed(timings, "llm_ms"):
+        llm_response, verdict = await _query_verdict(build_prompt(claim, evidence_text))
+
+    response = {
         # TODO: Send title of the top matched article 
-        "claim": request.claim,
+        "claim": claim,
         "evidence": evidence_text,
-        "llm_response": llm_response
-    }
\ No newline at end of file
+        "llm_response": llm_response,
+        "verdict": _verdict_dict(verdict),
+    }
+    # Only a parsed verdict is worth reusing; errors and unparseable answers get retried next time
+    if verdict is not None:
+        factcheck_cache.put(claim, evidence_ids, embedding, response)
+    return {**response, "cached": False}
+
+@app.post("/factcheck")
+async def factcheck_claim(request: FactCheckRequest):
+    # Get embedding and retrieve top-K evidence
+    timings = {}
+    with _timed(timings, "total_ms"):
+        embedding, results, evidence_text = await _retrieve(request.claim, request.query_filter(), timings)
+        with _timed(timings, "verdict_ms"):
+            response = await _check(request.claim, embedding, results, evidence_text, timings)
+    return {**response, "timings": timings}
+
+def _sse(event: str, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/factcheck/stream")
+async def factcheck_claim_stream(request: FactCheckRequest):
+    """
+    Server-sent events version of /factcheck: an `evidence` event as soon as
+    retrieval is done, `token` events while the LLM writes, a `field` event as
+    each top-level field of the JSON answer completes (so the verdict shows up
+    before the explanation has finished), then a `verdict` event with the
+    validated answer.
+    """
+    embedding, results, evidence_text = await _retrieve(request.claim, request.query_filter())
+    evidence_ids = [r.id for r in results]
+
+    async def events():
+        yield _sse("evidence", {
+            "claim": request.claim,
+            "evidence": evidence_text,
+            "sources": [r.payload["source_url"] for r in results],
+        })
+
+        cached = factcheck_cache.get(request.claim, evidence_ids, embedding)
+        if cached is not None:
+            llm_response = cached["llm_response"]
+            parsed = cached.get("verdict")
+            yield _sse("token", {"text": llm_response})
+        else:
+            tokens = []
+            parser = IncrementalVerdictParser()
+            with _timed(None, "llm_stream_ms"):
+                async for token in stream_llm(build_prompt(request.claim, evidence_text)):
+                    tokens.append(token)
+                    yield _sse("token", {"text": token})
+                    for name, value in parser.feed(token).items():
+                        yield _sse("field", {"name": name, "value": value})
+            llm_response = "".join(tokens)
+            parsed = _verdict_dict(parser.result()[0])
+            if parsed is not None:
+                factcheck_cache.put(request.claim, evidence_ids, embedding, {
+                    "claim": request.claim,
+                    "evidence": evidence_text,
+                    "llm_response": llm_response,
+                    "verdict": parsed,
+                })
+
+        yield _sse("verdict", {
+            "llm_response": llm_response,
+            "parsed": parsed,
+            "cached": cached is not None,
+        })
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def _require_text(texts):
+    blank = [i for i, text in enumerate(texts) if not text or not text.strip()]
+    if blank:
+        raise HTTPException(status_code=422, detail=f"Empty text at index {blank}")
+
+def _ndjson(rows):
+    return StreamingResponse(
+        (json.dumps(row) + "\n" async for row in rows),
+        media_type="application/x-ndjson",
+    )
+
+@app.post("/search/batch")
+async def search_claims_batch(request: BatchSearchRequest):
+    """
+    /search for many texts: one batched encode and one Qdrant search_batch call.
+    Streams one NDJSON line per text, {"index", "text", "results"}, in input order.
+    """
+    _require_text(request.texts)
+    embeddings = await get_embeddings_async(request.texts)
+    batches = await search_claims_batch_async(
+        embeddings, top_k=5, query_filter=request.query_filter(), query_texts=request.texts
+    )
+
+    async def rows():
+        for i, (text, results) in enumerate(zip(request.texts, batches)):
+            yield {"index": i, "text": text, "results": [_search_hit(r) for r in results]}
+
+    return _ndjson(rows())
+
+@app.post("/factcheck/batch")
+async def factcheck_claims_batch(request: BatchFactCheckRequest):
+    """
+    /factcheck for many claims. Retrieval is batched like /search/batch; LLM
+    calls run concurrently, at most BATCH_LLM_CONCURRENCY at a time. Each
+    verdict is streamed as an NDJSON line as soon as it is ready, so lines
+    arrive out of order and carry the claim's `index`.
+    """
+    _require_text(request.claims)
+    embeddings = await get_embeddings_async(request.claims)
+    batches = await search_claims_batch_async(
+        embeddings, top_k=rerank_service.candidate_count(),
+        query_filter=request.query_filter(), query_texts=request.claims, with_vectors=True
+    )
+    semaphore = asyncio.Semaphore(BATCH_LLM_CONCURRENCY)
+
+    async def check(i):
+        async with semaphore:
+            results = await rerank_service.rerank_async(request.claims[i], batches[i], embeddings[i])
+            with _timed(None, "prompt_ms"):
+                results, evidence_text = await _build_evidence(results)
+            return {"index": i, **await _check(request.claims[i], embeddings[i], results, evidence_text)}
+
+    async def rows():
+        tasks = [asyncio.create_task(check(i)) for i in range(len(request.claims))]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return _ndjson(rows())
@@ -0,0 +1,129 @@
+# server/app/migrate_collection.py
+"""
+Rebuild the claims collection with the current QDRANT_* tuning and switch
+COLLECTION_NAME over to it without downtime.
+
+    QDRANT_QUANTIZATION=int8 QDRANT_ON_DISK_VECTORS=true python -m app.migrate_collection
+
+Points are copied into a new versioned collection: vectors and payload, with
+missing `source` fields filled in, dates normalized, verdict boilerplate
+stripped, `content_hash` backfilled and, with HYBRID_SEARCH, BM25 sparse
+vectors computed. Points are re-keyed to the deterministic point_id() of their
+source URL (or text), so points written with random IDs by older ingestion
+runs line up with what ingestion writes now, and duplicates of one article
+collapse into a single point. The COLLECTION_NAME alias is then moved to the
+new collection in one atomic alias update. Claims written to the old collection
+while the copy runs are not carried over; re-run ingestion afterwards
+(unchanged claims are skipped by the content-hash dedup).
+
+If COLLECTION_NAME is still a plain collection rather than an alias, it has
+to be deleted before the alias can take its name, so pass --drop-old and
+expect a moment without a collection.
+"""
+
+import argparse
+import time
+
+from qdrant_client import models
+from app.config import COLLECTION_NAME
+from app.services.db_service import (
+    connect, create_collection, versioned_name, source_name, normalize_date, clean_verdict, point_vectors,
+    point_id, content_hash,
+)
+
+
+def alias_target(qdrant, alias):
+    for a in qdrant.get_aliases().aliases:
+        if a.alias_name == alias:
+            return a.collection_name
+    return None
+
+def migrate_payload(payload):
+    """Payload fields added since the point was written."""
+    payload = dict(payload or {})
+    if not payload.get("source"):
+        payload["source"] = source_name(payload.get("source_url"))
+    payload["date"] = normalize_date(payload.get("date"))
+    payload["verdict"] = clean_verdict(payload.get("verdict"))
+    payload["content_hash"] = content_hash(payload.get("text"), payload["verdict"], payload["date"])
+    return payload
+
+def migrate_id(point_id_, payload):
+    """Deterministic ID for the point, as make_point() assigns it; unchanged if there is nothing to derive it from."""
+    payload = payload or {}
+    if not payload.get("source_url") and not payload.get("text"):
+        return point_id_
+    return point_id(payload.get("source_url"), payload.get("text"))
+
+def migrate_vectors(vector, payload):
+    """Dense vector as stored, plus a freshly computed sparse vector when HYBRID_SEARCH is on."""
+    dense = vector.get("", vector) if isinstance(vector, dict) else vector
+    return point_vectors((payload or {}).get("text", ""), dense)
+
+def copy_points(qdrant, source, target, batch_size=256):
+    """Returns (points read, distinct point IDs written)."""
+    copied = 0
+    ids = set()
+    offset = None
+    while True:
+        records, offset = qdrant.scroll(
+            collection_name=source, limit=batch_size, offset=offset,
+            with_payload=True, with_vectors=True
+        )
+        if records:
+            points = []
+            for r in records:
+                payload = migrate_payload(r.payload)
+                points.append(models.PointStruct(
+                    id=migrate_id(r.id, payload), vector=migrate_vectors(r.vector, payload), payload=payload
+                ))
+            qdrant.upsert(collection_name=target, points=points, wait=True)
+            ids.update(str(p.id) for p in points)
+            copied += len(records)
+            print(f"[INFO] Copied {copied} points")
+        if offset is None:
+            return copied, len(ids)
+
+def migrate(alias=COLLECTION_NAME, drop_old=False, qdrant=None, batch_size=256):
+    """Returns the name of the new collection now behind `alias`."""
+    # Not get_client(): that would create an empty collection behind `alias`
+    qdrant = qdrant or connect()
+    old = alias_target(qdrant, alias)
+    is_alias = old is not None
+    if not is_alias:
+        if not qdrant.collection_exists(alias):
+            raise SystemExit(f"No collection or alias named {alias!r}")
+        if not drop_old:
+            raise SystemExit(f"{alias!r} is a collection, not an alias; re-run with --drop-old to replace it")
+        old = alias
+
+    new = versioned_name(alias)
+    started = time.monotonic()
+    create_collection(qdrant, new)
+    copied, expected = copy_points(qdrant, old, new, batch_size)
+    if qdrant.count(new, exact=True).count < expected:
+        raise SystemExit(f"Copy incomplete ({copied}/{expected}); {alias!r} still points at {old!r}")
+    if copied > expected:
+        print(f"[INFO] Merged {copied - expected} duplicate points")
+
+    operations = [models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=new, alias_name=alias))]
+    if is_alias:
+        operations.insert(0, models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    else:
+        qdrant.delete_collection(old)
+    qdrant.update_collection_aliases(change_aliases_operations=operations)
+    print(f"[INFO] {alias!r} -> {new!r} ({expected} points in {time.monotonic() - started:.1f}s)")
+
+    if is_alias and drop_old:
+        qdrant.delete_collection(old)
+        print(f"[INFO] Deleted {old!r}")
+    return new
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the claims collection with the current tuning.")
+    parser.add_argument("--alias", default=COLLECTION_NAME)
+    parser.add_argument("--drop-old", action="store_true", help="delete the previous collection afterwards")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+    migrate(args.alias, drop_old=args.drop_old, batch_size=args.batch_size)
@@ -1,51 +1,486 @@
 # server/app/services/db_service.py
 
-from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, VectorParams, Distance
+import atexit
+import hashlib
+from datetime import datetime, date as date_type, timezone
+from email.utils import parsedate_to_datetime
+import re
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client import models
+from qdrant_client.models import PointStruct, VectorParams, Distance, SearchRequest
 import uuid
-from app.config import QDRANT_URL, QDRANT_API_KEY, COLLECTION_NAME
+from app.config import (
+    QDRANT_URL, QDRANT_API_KEY, COLLECTION_NAME,
+    UPSERT_BATCH_SIZE, UPSERT_WAIT, UPSERT_PARALLEL,
+    QDRANT_HNSW_M, QDRANT_HNSW_EF_CONSTRUCT, QDRANT_ON_DISK_VECTORS, QDRANT_ON_DISK_PAYLOAD,
+    QDRANT_QUANTIZATION, QDRANT_QUANTILE, QDRANT_SEARCH_EF, QDRANT_RESCORE, QDRANT_OVERSAMPLING,
+    HYBRID_SEARCH, HYBRID_PREFETCH_FACTOR,
+    VECTOR_STORE, LOCAL_STORE_PATH, LOCAL_STORE_ANN_LISTS, LOCAL_STORE_ANN_PROBE,
+)
+from app.services import sparse_service, metrics
 
-client = QdrantClient(QDRANT_URL, api_key=QDRANT_API_KEY)
+# Created on first use, so importing this module never touches the network
+client = None
+# Used by the API so searches do not block the event loop
+async_client = None
+_client_lock = threading.Lock()
+
+# Payload fields filtered on at query time
+PAYLOAD_INDEXES = {
+    "verdict": models.PayloadSchemaType.KEYWORD,
+    "source": models.PayloadSchemaType.KEYWORD,
+    "date": models.PayloadSchemaType.DATETIME,
+}
+
+def collection_config():
+    """create_collection() keyword arguments from the QDRANT_* tuning settings."""
+    config = {
+        "vectors_config": VectorParams(size=384, distance=Distance.COSINE, on_disk=QDRANT_ON_DISK_VECTORS),
+        "hnsw_config": models.HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT),
+        "on_disk_payload": QDRANT_ON_DISK_PAYLOAD,
+    }
+    if QDRANT_QUANTIZATION == "int8":
+        # Quantized vectors stay in RAM even when the originals are on disk
+        config["quantization_config"] = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8, quantile=QDRANT_QUANTILE, always_ram=True
+            )
+        )
+    elif QDRANT_QUANTIZATION != "none":
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION {QDRANT_QUANTIZATION!r}, expected 'none' or 'int8'")
+    if HYBRID_SEARCH:
+        config["sparse_vectors_config"] = {
+            sparse_service.SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)
+        }
+    return config
+
+def search_params():
+    """Search-time parameters matching the collection tuning, or None for Qdrant defaults."""
+    quantization = None
+    if QDRANT_QUANTIZATION != "none":
+        quantization = models.QuantizationSearchParams(rescore=QDRANT_RESCORE, oversampling=QDRANT_OVERSAMPLING)
+    if quantization is None and not QDRANT_SEARCH_EF:
+        return None
+    return models.SearchParams(hnsw_ef=QDRANT_SEARCH_EF or None, quantization=quantization)
+
+def versioned_name(name=COLLECTION_NAME):
+    return f"{name}-{time.strftime('%Y%m%d%H%M%S')}"
+
+def create_collection(qdrant, name):
+    qdrant.create_collection(collection_name=name, **collection_config())
+    for field, schema in PAYLOAD_INDEXES.items():
+        qdrant.create_payload_index(collection_name=name, field_name=field, field_schema=schema)
 
 # Create collection if not exists
-def init_collection():
-    collections = [c.name for c in client.get_collections().collections]
-    if COLLECTION_NAME not in collections:
-        client.create_collection(
+def init_collection(qdrant=None):
+    """
+    COLLECTION_NAME may be a collection or an alias. A fresh install gets a
+    versioned collection behind a COLLECTION_NAME alias, so later re-tuning
+    can swap the alias without downtime.
+    """
+    qdrant = qdrant or get_client()
+    if qdrant.collection_exists(COLLECTION_NAME):
+        return
+    name = versioned_name()
+    create_collection(qdrant, name)
+    qdrant.update_collection_aliases(change_aliases_operations=[
+        models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=name, alias_name=COLLECTION_NAME))
+    ])
+
+def connect():
+    """A new QdrantClient (or LocalStore with VECTOR_STORE=local) that leaves the collections alone."""
+    if VECTOR_STORE == "local":
+        from app.services.local_store import LocalStore
+        return LocalStore(LOCAL_STORE_PATH, ann_lists=LOCAL_STORE_ANN_LISTS, ann_probe=LOCAL_STORE_ANN_PROBE)
+    return QdrantClient(QDRANT_URL, api_key=QDRANT_API_KEY)
+
+def get_client():
+    """
+    Shared QdrantClient (or LocalStore with VECTOR_STORE=local); connects and
+    makes sure the collection exists on first call.
+    """
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                qdrant = connect()
+                init_collection(qdrant)
+                client = qdrant
+    return client
+
+def get_async_client():
+    global async_client
+    if async_client is None:
+        if VECTOR_STORE == "local":
+            from app.services.local_store import AsyncLocalStore
+            async_client = AsyncLocalStore(get_client())
+        else:
+            async_client = AsyncQdrantClient(QDRANT_URL, api_key=QDRANT_API_KEY)
+    return async_client
+
+async def close_clients():
+    global client, async_client
+    if async_client is not None:
+        await async_client.close()
+        async_client = None
+    if client is not None:
+        client.close()
+        client = None
+
+# Query parameters that never change the article a URL points to
+TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref")
+
+def normalize_url(url):
+    """Canonical form of an article URL: lowercase host, no fragment, no tracking params, no trailing slash."""
+    parts = urlsplit(url.strip())
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PARAMS)
+    ]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((
+        parts.scheme.lower() or "https",
+        parts.netloc.lower(),
+        path,
+        urlencode(sorted(query)),
+        ""
+    ))
+
+def _normalize_text(text):
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+def point_id(source_url, text):
+    """
+    Deterministic point ID so re-ingesting an article overwrites it instead of
+    adding a copy. Derived from the normalized URL, or the claim text if there is none.
+    """
+    if source_url:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, normalize_url(source_url)))
+    digest = hashlib.sha256(_normalize_text(text).encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(uuid.NAMESPACE_OID, digest))
+
+# Human-readable formats seen on listing pages, tried after ISO 8601 and RFC 822
+DATE_FORMATS = ("%B %d, %Y", "%b %d, %Y", "%d %B %Y", "%d %b %Y", "%Y/%m/%d", "%d/%m/%Y")
+
+def normalize_date(value):
+    """
+    RFC 3339 UTC timestamp ("2025-08-13T00:00:00Z") for the date strings the
+    scrapers and feeds produce, so Qdrant's datetime index can range-filter
+    them. Naive values are taken as UTC; unparseable values become None.
+    """
+    if not value:
+        return None
+    if isinstance(value, date_type) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if not isinstance(value, datetime):
+        text = str(value).strip()
+        parsed = None
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            pass
+        if parsed is None:
+            try:
+                parsed = parsedate_to_datetime(text)
+            except (TypeError, ValueError, IndexError):
+                pass
+        for fmt in DATE_FORMATS:
+            if parsed is not None:
+                break
+            try:
+                parsed = datetime.strptime(text, fmt)
+            except ValueError:
+                pass
+        if parsed is None:
+            return None
+        value = parsed
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+# Boilerplate scraped along with some verdicts (Snopes' rating widget)
+VERDICT_NOISE = re.compile(r"about this rating", re.IGNORECASE)
+
+def clean_verdict(verdict):
+    """Verdict as shown by the publisher, without scraped boilerplate."""
+    if verdict is None:
+        return None
+    return " ".join(VERDICT_NOISE.sub(" ", verdict).split())
+
+def content_hash(text, verdict, date):
+    """Hash of the stored fields; a changed hash means the article needs re-embedding."""
+    raw = "\x1f".join([_normalize_text(text), clean_verdict(verdict) or "", normalize_date(date) or ""])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def source_name(url):
+    """Publisher of a claim, e.g. "snopes.com", for filtering by source. Accepts a URL or a bare host."""
+    url = (url or "").strip()
+    if url and "://" not in url:
+        url = "//" + url
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+def point_vectors(text, embedding):
+    """Vector(s) for a point: the dense embedding, plus the BM25 sparse vector in hybrid mode."""
+    if hasattr(embedding, "tolist"):
+        embedding = embedding.tolist()
+    if not HYBRID_SEARCH:
+        return embedding
+    return {"": embedding, sparse_service.SPARSE_VECTOR_NAME: sparse_service.document_vector(text)}
+
+def make_point(text, verdict, source_url, date, embedding):
+    """Build a PointStruct for a claim. Accepts a list or NumPy vector."""
+    return PointStruct(
+        id=point_id(source_url, text),
+        vector=point_vectors(text, embedding),
+        payload={
+            "text": text,
+            "verdict": clean_verdict(verdict),
+            "source_url": source_url,
+            "source": source_name(source_url),
+            "date": normalize_date(date),
+            "content_hash": content_hash(text, verdict, date)
+        }
+    )
+
+def stored_hashes(point_ids, chunk_size=256):
+    """Map of point ID -> content_hash for the IDs that already exist in the collection."""
+    point_ids = list(dict.fromkeys(point_ids))
+    hashes = {}
+    for start in range(0, len(point_ids), chunk_size):
+        records = get_client().retrieve(
             collection_name=COLLECTION_NAME,
-            vectors_config=VectorParams(size=384, distance=Distance.COSINE)
+            ids=point_ids[start:start + chunk_size],
+            with_payload=["content_hash"],
+            with_vectors=False
         )
+        for record in records:
+            hashes[str(record.id)] = (record.payload or {}).get("content_hash")
+    return hashes
+
+def filter_new_claims(rows):
+    """
+    Drop rows that are already stored with the same content hash.
+    Rows are dicts with "claim", "verdict", "source_url" and "date".
+    """
+    ids = [point_id(r["source_url"], r["claim"]) for r in rows]
+    stored = stored_hashes(ids)
+    return [
+        row for row, pid in zip(rows, ids)
+        if stored.get(pid) != content_hash(row["claim"], row["verdict"], row["date"])
+    ]
+
+def stored_urls(urls):
+    """Subset of `urls` that already have a point, used to skip fetching known articles."""
+    urls = list(urls)
+    ids = [point_id(u, None) for u in urls]
+    stored = stored_hashes(ids)
+    return {u for u, pid in zip(urls, ids) if pid in stored}
+
+def insert_claims_bulk(points, batch_size=UPSERT_BATCH_SIZE, wait=UPSERT_WAIT, parallel=UPSERT_PARALLEL):
+    """
+    Upsert many points in batches of `batch_size`.
+    With parallel > 1 the batches are uploaded concurrently by qdrant-client.
+    Returns the number of points sent.
+    """
+    points = list(points)
+    if not points:
+        return 0
+
+    if parallel > 1:
+        with metrics.INGEST_UPSERT_SECONDS.time():
+            get_client().upload_points(
+                collection_name=COLLECTION_NAME,
+                points=points,
+                batch_size=batch_size,
+                parallel=parallel,
+                wait=wait
+            )
+    else:
+        for start in range(0, len(points), batch_size):
+            with metrics.INGEST_UPSERT_SECONDS.time():
+                get_client().upsert(
+                    collection_name=COLLECTION_NAME,
+                    points=points[start:start + batch_size],
+                    wait=wait
+                )
+    metrics.INGEST_UPSERTED.inc(len(points))
+    return len(points)
 
 def insert_claim(text, verdict, source_url, date, embedding):
     """
     Insert a claim into Qdrant with its embedding.
     Embedding must be provided by the caller.
     """
-    point_id = str(uuid.uuid4())
-    client.upsert(
+    insert_claims_bulk([make_point(text, verdict, source_url, date, embedding)], wait=True, parallel=1)
+
+
+class ClaimWriter:
+    """
+    Buffered writer for ingestion. Points are collected with add() and
+    upserted in batches; the buffer is flushed on close(), when leaving a
+    `with` block, and at interpreter exit. `on_flush` is called after every
+    successful flush, e.g. to checkpoint crawl progress. A failed upsert
+    calls `on_error` (e.g. to drop that pending progress), then re-raises and
+    keeps the points buffered for the next flush.
+    """
+
+    def __init__(
+        self, batch_size=UPSERT_BATCH_SIZE, wait=UPSERT_WAIT, parallel=UPSERT_PARALLEL, on_flush=None, on_error=None
+    ):
+        self.batch_size = batch_size
+        self.wait = wait
+        self.parallel = parallel
+        # With parallel upload, hand several batches to qdrant-client at once
+        self.flush_size = batch_size * max(1, parallel)
+        self.on_flush = on_flush
+        self.on_error = on_error
+        self.buffer = []
+        self.written = 0
+        atexit.register(self.close)
+
+    def add(self, text, verdict, source_url, date, embedding):
+        self.buffer.append(make_point(text, verdict, source_url, date, embedding))
+        if len(self.buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            # Point IDs are deterministic, so retrying a partly written buffer is safe
+            try:
+                self.written += insert_claims_bulk(
+                    self.buffer, batch_size=self.batch_size, wait=self.wait, parallel=self.parallel
+                )
+            except Exception:
+                if self.on_error:
+                    self.on_error()
+                raise
+            self.buffer = []
+        if self.on_flush:
+            self.on_flush()
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def build_filter(sources=None, verdicts=None, date_from=None, date_to=None):
+    """
+    Qdrant filter on the indexed payload fields, or None when nothing is set.
+    Qdrant applies it during the HNSW search, so no over-fetching is needed.
+    Raises ValueError for a date bound normalize_date() cannot parse.
+    """
+    conditions = []
+    if sources:
+        conditions.append(models.FieldCondition(
+            key="source", match=models.MatchAny(any=[source_name(s) for s in sources])
+        ))
+    if verdicts:
+        conditions.append(models.FieldCondition(key="verdict", match=models.MatchAny(any=list(verdicts))))
+    if date_from or date_to:
+        bounds = {}
+        for name, value in (("date_from", date_from), ("date_to", date_to)):
+            bounds[name] = normalize_date(value)
+            # Dropping the bound would silently widen the search
+            if value and bounds[name] is None:
+                raise ValueError(f"Unrecognized {name}: {value!r}")
+        conditions.append(models.FieldCondition(
+            key="date", range=models.DatetimeRange(gte=bounds["date_from"], lte=bounds["date_to"])
+        ))
+    return models.Filter(must=conditions) if conditions else None
+
+def hybrid_prefetch(query_embedding, query_text, top_k, query_filter=None):
+    """Dense and BM25 candidate lists for Qdrant to fuse with reciprocal-rank fusion."""
+    limit = top_k * HYBRID_PREFETCH_FACTOR
+    return [
+        models.Prefetch(query=query_embedding, filter=query_filter, limit=limit, params=search_params()),
+        models.Prefetch(
+            query=sparse_service.query_vector(query_text), using=sparse_service.SPARSE_VECTOR_NAME,
+            filter=query_filter, limit=limit
+        ),
+    ]
+
+RRF = models.FusionQuery(fusion=models.Fusion.RRF)
+
+def search_claim(query_embedding, top_k=1, query_filter=None, query_text=None, with_vectors=False):
+    """
+    Nearest claims to the embedding. With HYBRID_SEARCH and the query text,
+    dense and BM25 results are fetched and fused in one query_points call.
+    `with_vectors` returns the stored vectors too (for evidence dedup).
+    """
+    if HYBRID_SEARCH and query_text:
+        return get_client().query_points(
+            collection_name=COLLECTION_NAME,
+            prefetch=hybrid_prefetch(query_embedding, query_text, top_k, query_filter),
+            query=RRF,
+            limit=top_k,
+            with_vectors=with_vectors
+        ).points
+
+    # query_embedding is already a list of floats
+    results = get_client().search(
         collection_name=COLLECTION_NAME,
-        points=[
-            PointStruct(
-                id=point_id,
-                vector=embedding,
-                payload={
-                    "text": text,
-                    "verdict": verdict,
-                    "source_url": source_url,
-                    "date": date
-                }
-            )
-        ]
+        query_vector=query_embedding,
+        query_filter=query_filter,
+        limit=top_k,
+        search_params=search_params(),
+        with_vectors=with_vectors
     )
+    return results
 
-def search_claim(query_embedding, top_k=1):
-    # query_embedding is already a list of floats
-    results = client.search(
+async def search_claim_async(query_embedding, top_k=1, query_filter=None, query_text=None, with_vectors=False):
+    if HYBRID_SEARCH and query_text:
+        response = await get_async_client().query_points(
+            collection_name=COLLECTION_NAME,
+            prefetch=hybrid_prefetch(query_embedding, query_text, top_k, query_filter),
+            query=RRF,
+            limit=top_k,
+            with_vectors=with_vectors
+        )
+        return response.points
+
+    results = await get_async_client().search(
         collection_name=COLLECTION_NAME,
         query_vector=query_embedding,
-        limit=top_k
+        query_filter=query_filter,
+        limit=top_k,
+        search_params=search_params(),
+        with_vectors=with_vectors
     )
     return results
 
-# Initialize collection on import
-init_collection()
+async def search_claims_batch_async(query_embeddings, top_k=1, query_filter=None, query_texts=None, with_vectors=False):
+    """One round trip for many queries; returns one result list per embedding, in order."""
+    if not query_embeddings:
+        return []
+    if HYBRID_SEARCH and query_texts:
+        responses = await get_async_client().query_batch_points(
+            collection_name=COLLECTION_NAME,
+            requests=[
+                models.QueryRequest(
+                    prefetch=hybrid_prefetch(embedding, text, top_k, query_filter),
+                    query=RRF, limit=top_k, with_payload=True, with_vector=with_vectors
+                )
+                for embedding, text in zip(query_embeddings, query_texts)
+            ]
+        )
+        return [r.points for r in responses]
+    return await get_async_client().search_batch(
+        collection_name=COLLECTION_NAME,
+        requests=[
+            SearchRequest(
+                vector=embedding, filter=query_filter, limit=top_k, with_payload=True,
+                with_vector=with_vectors, params=search_params()
+            )
+            for embedding in query_embeddings
+        ]
+    )
@@ -0,0 +1,145 @@
+# server/app/services/embedding_server.py
+"""
+One process that owns the embedding model, shared by every API worker.
+
+    TORCH_NUM_THREADS=8 python -m app.services.embedding_server
+    EMBED_SERVER_SOCKET=/tmp/embeddings.sock uvicorn app.main:app --workers 4
+
+Workers send texts over a Unix socket, already micro-batched by their own
+EmbeddingCoalescer; the server encodes each request as one batch, one request
+at a time, and answers with raw float32 rows, which the client wraps with
+np.frombuffer instead of decoding.
+
+Wire format (big-endian):
+    request:  uint32 length, JSON list of texts
+    response: uint8 status (0 ok, 1 error), uint32 length, float32 rows or error text
+"""
+
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from app.config import EMBED_SERVER_SOCKET
+from app.services.embedding_service import EMBEDDING_DIM, encode_local
+
+REQUEST_HEADER = struct.Struct(">I")
+RESPONSE_HEADER = struct.Struct(">BI")
+OK, ERROR = 0, 1
+
+
+class EmbeddingServer:
+    def __init__(self, path=EMBED_SERVER_SOCKET, encode_fn=encode_local):
+        self.path = path
+        self.encode_fn = encode_fn
+        # Requests arrive already batched by the clients' coalescers, so they are not
+        # held for another window; one model thread encodes them in arrival order
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-server")
+
+    async def _handle(self, reader, writer):
+        # A connection carries any number of requests, one at a time
+        try:
+            while True:
+                try:
+                    (length,) = REQUEST_HEADER.unpack(await reader.readexactly(REQUEST_HEADER.size))
+                    texts = json.loads(await reader.readexactly(length))
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    loop = asyncio.get_running_loop()
+                    vectors = await loop.run_in_executor(self.executor, self.encode_fn, texts)
+                    payload = np.asarray(vectors, dtype=np.float32).tobytes()
+                    writer.write(RESPONSE_HEADER.pack(OK, len(payload)) + payload)
+                except Exception as e:
+                    message = str(e).encode("utf-8")
+                    writer.write(RESPONSE_HEADER.pack(ERROR, len(message)) + message)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, ready=None):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        print(f"[INFO] Embedding server listening on {self.path}")
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+
+def _recv_exactly(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    while view:
+        n = sock.recv_into(view)
+        if n == 0:
+            raise ConnectionError("Embedding server closed the connection")
+        view = view[n:]
+    return buf
+
+
+class EmbeddingClient:
+    """Blocking client with one persistent connection per thread."""
+
+    def __init__(self, path=EMBED_SERVER_SOCKET):
+        self.path = path
+        self._local = threading.local()
+
+    def _socket(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, texts):
+        body = json.dumps(texts).encode("utf-8")
+        sock = self._socket()
+        sock.sendall(REQUEST_HEADER.pack(len(body)) + body)
+        status, length = RESPONSE_HEADER.unpack(_recv_exactly(sock, RESPONSE_HEADER.size))
+        payload = _recv_exactly(sock, length)
+        if status != OK:
+            raise RuntimeError(f"Embedding server error: {payload.decode('utf-8')}")
+        return np.frombuffer(payload, dtype=np.float32).reshape(len(texts), EMBEDDING_DIM)
+
+    def embed(self, texts) -> np.ndarray:
+        texts = list(texts)
+        try:
+            return self._request(texts)
+        except (ConnectionError, OSError):
+            # Server restarted since this thread connected: reconnect once
+            self._close()
+            return self._request(texts)
+
+
+_client = None
+
+def remote_embeddings(texts) -> np.ndarray:
+    global _client
+    if _client is None:
+        _client = EmbeddingClient()
+    return _client.embed(texts)
+
+
+def main():
+    if not EMBED_SERVER_SOCKET:
+        raise SystemExit("Set EMBED_SERVER_SOCKET to the Unix socket path to serve on.")
+    # Load the model before accepting connections (warm_up() would call the socket itself)
+    encode_local(["warm-up"])
+    asyncio.run(EmbeddingServer().serve())
+
+
+if __name__ == "__main__":
+    main()
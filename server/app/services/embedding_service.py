@@ -1,19 +1,396 @@
 # server/app/services/embedding_service.py
 
-from sentence_transformers import SentenceTransformer
+import asyncio
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+from app.config import (
+    EMBED_BATCH_WINDOW_MS, EMBED_MAX_BATCH_SIZE,
+    EMBED_CACHE_SIZE, EMBED_CACHE_PATH, EMBED_CACHE_DISK_SIZE, EMBED_EXECUTOR_WORKERS,
+    EMBEDDING_BACKEND, EMBEDDING_MODEL_FILE, EMBED_SERVER_SOCKET, TORCH_NUM_THREADS,
+)
 
-# Load model once at startup
 # 'all-MiniLM-L6-v2' → dimension = 384
-model = SentenceTransformer('all-MiniLM-L6-v2')
+MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBEDDING_DIM = 384
+BACKENDS = ("torch", "onnx", "openvino", "int8")
+
+def load_model(backend: str = EMBEDDING_BACKEND, file_name: str = EMBEDDING_MODEL_FILE):
+    """
+    Load the sentence-transformers model on the given CPU backend.
+    onnx/openvino need `optimum[onnxruntime]` / `optimum[openvino]`; int8
+    applies torch dynamic quantization to the Linear layers of the torch model.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND {backend!r}, expected one of {BACKENDS}")
+    # Imported here so modules that never embed (scrapers, parsers) do not pull in torch
+    from sentence_transformers import SentenceTransformer
+
+    if backend in ("onnx", "openvino"):
+        model_kwargs = {"file_name": file_name} if file_name else None
+        return SentenceTransformer(MODEL_NAME, backend=backend, model_kwargs=model_kwargs)
+
+    import torch
+    if TORCH_NUM_THREADS > 0:
+        # One model per host: give it the cores instead of oversubscribing them
+        torch.set_num_threads(TORCH_NUM_THREADS)
+    model = SentenceTransformer(MODEL_NAME)
+    if backend == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+# Loaded on first use (or by warm_up() at API startup)
+model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                started = time.monotonic()
+                model = load_model()
+                print(f"[INFO] Loaded {MODEL_NAME} ({EMBEDDING_BACKEND}) in {time.monotonic() - started:.1f}s")
+    return model
+
+# Set once the embedding server has answered, when EMBED_SERVER_SOCKET is used
+_remote_ready = False
+
+def _mark_remote_ready():
+    global _remote_ready
+    _remote_ready = True
+
+def model_loaded():
+    return model is not None or _remote_ready
+
+def warm_up():
+    """Load the model and run one encode so the first real request does not pay for it."""
+    get_embeddings(["warm-up"])
+
+def _validate(text: str):
+    if not text or not text.strip():
+        raise ValueError("Input text for embedding cannot be empty.")
+
+def get_embeddings(texts) -> np.ndarray:
+    """
+    Encode a list of texts in one batched forward pass.
+    Returns a float32 NumPy matrix of shape (len(texts), 384).
+    With EMBED_SERVER_SOCKET set, the pass runs in the embedding server.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+    for text in texts:
+        _validate(text)
+
+    if EMBED_SERVER_SOCKET:
+        from app.services.embedding_server import remote_embeddings
+        embeddings = remote_embeddings(texts)
+        _mark_remote_ready()
+        return embeddings
+    return encode_local(texts)
+
+def encode_local(texts) -> np.ndarray:
+    """Forward pass on this process's own model."""
+    embeddings = get_model().encode(texts, batch_size=len(texts), convert_to_numpy=True)
+    return embeddings.astype(np.float32, copy=False)
+
+
+class EmbeddingCoalescer:
+    """
+    Collects concurrent single-text requests and encodes them together.
+
+    The first queued text opens a window of `window_ms`; everything that
+    arrives before it closes (up to `max_batch_size` texts) shares one call
+    to `encode_fn`. Callers block on a Future for their own row.
+    """
+
+    def __init__(self, encode_fn, window_ms: float, max_batch_size: int):
+        self.encode_fn = encode_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+        # Batch-size histogram: upper bound -> number of batches
+        self._bounds = [1]
+        while self._bounds[-1] < self.max_batch_size:
+            self._bounds.append(min(self._bounds[-1] * 2, self.max_batch_size))
+        self._histogram = {bound: 0 for bound in self._bounds}
+        self._batches = 0
+        self._items = 0
+
+    def submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.submit(text).result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch_size": round(self._items / self._batches, 2) if self._batches else 0.0,
+                "window_ms": self.window * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "batch_size_histogram": {f"<={b}": n for b, n in self._histogram.items()},
+            }
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-coalescer", daemon=True
+                )
+                self._worker.start()
+
+    def _record(self, size: int):
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            for bound in self._bounds:
+                if size <= bound:
+                    self._histogram[bound] += 1
+                    break
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                vectors = self.encode_fn([text for text, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self._record(len(batch))
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+
+def normalize_text(text: str):
+    """Cache key for a query. The model is uncased, so case and spacing do not change the vector."""
+    return re.sub(r"\s+", " ", text.strip()).lower()
+
+
+# Vectors from different backends/quantizations differ slightly, so they never share cache keys
+CACHE_NAMESPACE = f"{MODEL_NAME}:{EMBEDDING_BACKEND}:{EMBEDDING_MODEL_FILE}"
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU of normalized text -> float32 vector, optionally backed by a
+    SQLite file so hot queries survive restarts. Memory misses fall through
+    to disk, and disk hits are promoted back into memory. The file keeps the
+    `max_disk_entries` most recently written vectors.
+    """
+
+    def __init__(
+        self, max_entries: int, path: str = "", namespace: str = CACHE_NAMESPACE,
+        max_disk_entries: int = EMBED_CACHE_DISK_SIZE,
+    ):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.namespace = namespace
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Separate lock so memory hits never wait on a disk write
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        self._disk_rows = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _key(self, text):
+        return f"{self.namespace}:{normalize_text(text)}"
+
+    def get(self, text):
+        key = self._key(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        if self._db is not None:
+            with self._db_lock:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                vector = np.frombuffer(row[0], dtype=np.float32)
+                with self._lock:
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                return vector
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text, vector, persist=True):
+        """
+        Cache a vector. With `persist` False only the memory tier is updated and
+        the caller writes the disk tier with persist() off the event loop.
+        """
+        key = self._key(text)
+        # Own a compact copy rather than a view into a whole batch matrix
+        vector = np.array(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, vector)
+        if persist:
+            self.persist([(text, vector)])
+
+    def persist(self, items):
+        """Write (text, vector) pairs to the SQLite tier. Blocking."""
+        if self._db is None:
+            return
+        rows = [(self._key(text), np.asarray(vector, dtype=np.float32).tobytes()) for text, vector in items]
+        with self._db_lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+            self._disk_rows += len(rows)
+            if self._disk_rows > self.max_disk_entries:
+                # Replaced keys get a new rowid, so the lowest rowids are the oldest writes.
+                # Prune to 90% of the limit so this does not run on every write.
+                self._db.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                    (int(self.max_disk_entries * 0.9),)
+                )
+                self._disk_rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _remember(self, key, vector):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "persistent": self._db is not None,
+            }
+
+
+coalescer = EmbeddingCoalescer(get_embeddings, EMBED_BATCH_WINDOW_MS, EMBED_MAX_BATCH_SIZE)
+cache = EmbeddingCache(EMBED_CACHE_SIZE, EMBED_CACHE_PATH) if EMBED_CACHE_SIZE > 0 else None
+# Bounded pool for async callers when coalescing is off; keeps the model off the default executor
+executor = ThreadPoolExecutor(max_workers=EMBED_EXECUTOR_WORKERS, thread_name_prefix="embedding")
+
+def _cache_async(items):
+    """Cache (text, vector) pairs from an async handler; the SQLite write goes to the embedding executor."""
+    for text, vector in items:
+        cache.put(text, vector, persist=False)
+    if cache._db is not None:
+        executor.submit(cache.persist, items)
 
 def get_embedding(text: str):
     """
     Generate a vector embedding for the given text using Sentence Transformers.
     Returns a Python list of floats (ready for Qdrant).
+    Repeated queries are served from the embedding cache; concurrent misses
+    are micro-batched unless EMBED_BATCH_WINDOW_MS is 0.
     """
-    if not text or not text.strip():
-        raise ValueError("Input text for embedding cannot be empty.")
-    
-    # Encode text to a numpy array, then convert to list for Qdrant
-    embedding = model.encode(text, convert_to_numpy=True).tolist()
-    return embedding
+    _validate(text)
+
+    embedding = cache.get(text) if cache else None
+    if embedding is None:
+        if EMBED_BATCH_WINDOW_MS > 0:
+            embedding = coalescer.embed(text)
+        else:
+            embedding = get_embeddings([text])[0]
+        if cache:
+            cache.put(text, embedding)
+
+    # Convert to list for Qdrant
+    return embedding.tolist()
+
+async def get_embedding_async(text: str):
+    """
+    get_embedding for async handlers. The forward pass runs on the coalescer
+    thread (or the embedding executor), so the event loop keeps serving
+    other requests meanwhile.
+    """
+    _validate(text)
+
+    embedding = cache.get(text) if cache else None
+    if embedding is None:
+        if EMBED_BATCH_WINDOW_MS > 0:
+            embedding = await asyncio.wrap_future(coalescer.submit(text))
+        else:
+            loop = asyncio.get_running_loop()
+            embedding = (await loop.run_in_executor(executor, get_embeddings, [text]))[0]
+        if cache:
+            _cache_async([(text, embedding)])
+
+    return embedding.tolist()
+
+async def get_embeddings_async(texts):
+    """
+    Embed many texts for an async handler: cached vectors are reused and all
+    misses share a single batched forward pass on the embedding executor.
+    Returns a list of float lists in input order.
+    """
+    texts = list(texts)
+    for text in texts:
+        _validate(text)
+
+    embeddings = [cache.get(text) if cache else None for text in texts]
+    missing = [i for i, e in enumerate(embeddings) if e is None]
+    if missing:
+        loop = asyncio.get_running_loop()
+        encoded = await loop.run_in_executor(executor, get_embeddings, [texts[i] for i in missing])
+        for i, vector in zip(missing, encoded):
+            embeddings[i] = vector
+        if cache:
+            _cache_async([(texts[i], embeddings[i]) for i in missing])
+
+    return [e.tolist() for e in embeddings]
+
+def get_stats():
+    return {
+        "coalescer": coalescer.stats(),
+        "cache": cache.stats() if cache else None,
+        "backend": EMBEDDING_BACKEND,
+    }
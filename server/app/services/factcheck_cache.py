@@ -0,0 +1,103 @@
+# server/app/services/factcheck_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from app.config import FACTCHECK_CACHE_SIZE, FACTCHECK_CACHE_TTL, FACTCHECK_CACHE_SIMILARITY
+from app.services.embedding_service import normalize_text
+
+
+class FactCheckCache:
+    """
+    LRU + TTL cache of /factcheck responses.
+
+    The key is the normalized claim plus the IDs of the evidence points it was
+    checked against, so newly ingested evidence changes the key and bypasses
+    stale verdicts. With a `similarity_threshold`, a claim whose embedding is
+    at least that cosine-similar to a cached claim with the same evidence is
+    served the cached response as well.
+    """
+
+    def __init__(self, max_entries, ttl_seconds, similarity_threshold=0.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        # (claim, evidence ids) -> (expires_at, unit query vector, response)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _evidence_key(evidence_ids):
+        return tuple(sorted(str(i) for i in evidence_ids))
+
+    def get(self, claim, evidence_ids, embedding=None):
+        evidence = self._evidence_key(evidence_ids)
+        key = (normalize_text(claim), evidence)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+
+            if self.similarity_threshold > 0 and embedding is not None:
+                match = self._nearest(evidence, embedding, now)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self.semantic_hits += 1
+                    return self._entries[match][2]
+
+            self.misses += 1
+            return None
+
+    def put(self, claim, evidence_ids, embedding, response):
+        key = (normalize_text(claim), self._evidence_key(evidence_ids))
+        vector = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, vector, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _nearest(self, evidence, embedding, now):
+        keys = [
+            k for k, (expires_at, v, _) in self._entries.items()
+            if k[1] == evidence and v is not None and expires_at > now
+        ]
+        if not keys:
+            return None
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = np.stack([self._entries[k][1] for k in keys]) @ query
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.similarity_threshold else None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "similarity_threshold": self.similarity_threshold,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+factcheck_cache = FactCheckCache(FACTCHECK_CACHE_SIZE, FACTCHECK_CACHE_TTL, FACTCHECK_CACHE_SIMILARITY)
@@ -1,29 +1,59 @@
 # huggingface_service.py
-import asyncio
-import json
-from huggingface_hub import InferenceClient
-from app.config import HF_API_KEY
+from app.config import (
+    HF_API_KEY, LLM_BACKEND, LLM_MOCK_LATENCY, LLM_MAX_CONCURRENCY, LLM_QUEUE_TIMEOUT,
+    LLM_TIMEOUT, LLM_HEDGE_AFTER, LLM_MAX_ATTEMPTS, LLM_BREAKER_FAILURES, LLM_BREAKER_RESET,
+    LLM_JSON_MODE,
+)
+from app.services.llm_backends import HuggingFaceBackend, MockBackend, ResilientBackend, CircuitBreaker
+from app.services.verdict_parser import VERDICT_SCHEMA
+from app.services import metrics
 
 HF_MODEL = "mistralai/Mixtral-8x7B-Instruct-v0.1"
+LLM_ERROR_RESPONSE = "Unable to process request at this time"
 
-client = InferenceClient(
-    token=HF_API_KEY
-)
+def make_backend(name=LLM_BACKEND):
+    if name == "huggingface":
+        inner = HuggingFaceBackend(HF_MODEL, HF_API_KEY, json_schema=VERDICT_SCHEMA if LLM_JSON_MODE else None)
+    elif name == "mock":
+        inner = MockBackend(LLM_MOCK_LATENCY)
+    else:
+        raise ValueError(f"Unknown LLM_BACKEND {name!r}, expected 'huggingface' or 'mock'")
+    return ResilientBackend(
+        inner,
+        max_concurrency=LLM_MAX_CONCURRENCY,
+        queue_timeout=LLM_QUEUE_TIMEOUT,
+        timeout=LLM_TIMEOUT,
+        hedge_after=LLM_HEDGE_AFTER,
+        max_attempts=LLM_MAX_ATTEMPTS,
+        breaker=CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET),
+    )
+
+# Created on first use
+backend = None
+
+def get_backend():
+    global backend
+    if backend is None:
+        backend = make_backend()
+    return backend
 
 async def query_llm(prompt: str) -> str:
     try:
-        loop = asyncio.get_running_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: client.chat_completion(
-                messages=[{"role": "user", "content": prompt}],
-                model=HF_MODEL,
-                max_tokens=400,
-                temperature=0.2
-            )
-        )
-        # Extract the response content
-        return response.choices[0].message.content
+        return await get_backend().complete(prompt)
     except Exception as e:
-        print(f"LLM Query Error: {str(e)}")
-        return "Unable to process request at this time"
\ No newline at end of file
+        print(f"LLM Query Error: {type(e).__name__}: {str(e)}")
+        metrics.ERRORS.labels(stage="llm").inc()
+        return LLM_ERROR_RESPONSE
+
+async def stream_llm(prompt: str):
+    """Yield the completion as text deltas as they arrive from the model."""
+    try:
+        async for token in get_backend().stream(prompt):
+            yield token
+    except Exception as e:
+        print(f"LLM Stream Error: {type(e).__name__}: {str(e)}")
+        metrics.ERRORS.labels(stage="llm").inc()
+        yield LLM_ERROR_RESPONSE
+
+def get_stats():
+    return backend.stats() if backend else None
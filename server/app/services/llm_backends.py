@@ -0,0 +1,331 @@
+# server/app/services/llm_backends.py
+"""
+Generation backends. Each one has `async complete(prompt) -> str` and
+`stream(prompt)`, an async generator of text deltas.
+
+HuggingFaceBackend calls the remote Inference API, MockBackend answers
+locally and deterministically, and ResilientBackend wraps either with a
+concurrency cap, deadlines, hedged retries and a circuit breaker.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+
+from huggingface_hub import AsyncInferenceClient
+
+
+class LLMError(Exception):
+    pass
+
+class LLMTimeout(LLMError):
+    pass
+
+class LLMOverloaded(LLMError):
+    """No concurrency slot freed up within the queue timeout."""
+
+class CircuitOpenError(LLMError):
+    pass
+
+
+class HuggingFaceBackend:
+    """
+    Remote chat completion. With a `json_schema`, decoding is constrained to it
+    via `response_format`; if the provider rejects that (HTTP 400/422), the
+    backend drops it and carries on with plain decoding.
+    """
+
+    def __init__(self, model, token, max_tokens=400, temperature=0.2, json_schema=None):
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.response_format = None
+        if json_schema is not None:
+            self.response_format = {
+                "type": "json_schema",
+                "json_schema": {"name": "verdict", "schema": json_schema, "strict": True},
+            }
+        # Async HTTP client, so waiting on the LLM does not tie up a worker thread
+        self.client = AsyncInferenceClient(token=token)
+
+    async def _request(self, prompt, stream=False):
+        kwargs = {"response_format": self.response_format} if self.response_format else {}
+        try:
+            return await self.client.chat_completion(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.model,
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                stream=stream,
+                **kwargs
+            )
+        except Exception as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            if not kwargs or status not in (400, 422):
+                raise
+            print(f"[WARN] {self.model} rejected response_format ({status}), using plain decoding")
+            self.response_format = None
+            return await self._request(prompt, stream)
+
+    async def complete(self, prompt):
+        response = await self._request(prompt)
+        return response.choices[0].message.content
+
+    async def stream(self, prompt):
+        async for chunk in await self._request(prompt, stream=True):
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+
+
+class MockBackend:
+    """
+    Offline stand-in that answers in the /factcheck JSON format after `latency`
+    seconds. The verdict follows the evidence verdicts in the prompt, so the
+    same prompt always gets the same answer.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    @staticmethod
+    def answer(prompt):
+        verdicts = " ".join(re.findall(r"verdict: ([^)]*)\)", prompt)).lower()
+        if any(word in verdicts for word in ("false", "fake", "pants on fire", "incorrect")):
+            verdict = "False"
+        elif any(word in verdicts for word in ("true", "correct", "accurate")):
+            verdict = "True"
+        else:
+            verdict = "Misleading"
+        return json.dumps({
+            "verdict": verdict,
+            "explanation": f"Mock answer based on {len(re.findall(r'verdict: ', prompt))} evidence item(s).",
+            "sources": re.findall(r"\(Source: ([^,]+),", prompt),
+        })
+
+    async def complete(self, prompt):
+        await asyncio.sleep(self.latency)
+        return self.answer(prompt)
+
+    async def stream(self, prompt):
+        tokens = re.findall(r"\S+\s*", self.answer(prompt))
+        for token in tokens:
+            await asyncio.sleep(self.latency / max(len(tokens), 1))
+            yield token
+
+
+class CircuitBreaker:
+    """
+    Closed until `failure_threshold` consecutive failures, then open (calls are
+    refused) for `reset_timeout` seconds, then half-open: one trial call decides
+    whether it closes again or reopens.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.opened = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self):
+        """
+        (allowed, trial): whether a call may go ahead, and whether it is the
+        half-open trial call, which then owns the trial until it records an
+        outcome or calls release_trial().
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True, False
+            if state == "open" or self._trial:
+                return False, False
+            self._trial = True
+            return True, True
+
+    def release_trial(self):
+        """The half-open trial call ended without an outcome; let another caller try. Only the owner may call this."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    self.opened += 1
+                self.opened_at = self.clock()
+
+
+class ResilientBackend:
+    """
+    Guards a backend so a slow or failing LLM fails fast under load:
+    at most `max_concurrency` calls in flight (others wait up to `queue_timeout`),
+    a `timeout` deadline per call, a hedged second attempt after `hedge_after`
+    seconds (or a retry after an error) up to `max_attempts`, and a circuit breaker.
+    """
+
+    def __init__(self, backend, max_concurrency, queue_timeout, timeout, hedge_after, max_attempts, breaker):
+        self.backend = backend
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.max_attempts = max(1, max_attempts)
+        self.breaker = breaker
+        self.max_concurrency = max_concurrency
+        self._semaphores = {}
+        self.in_flight = 0
+        self.counts = {"calls": 0, "hedges": 0, "retries": 0, "timeouts": 0, "rejected": 0, "failures": 0}
+
+    def _semaphore(self):
+        # asyncio primitives belong to one event loop; keep one per loop
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores = {loop: asyncio.Semaphore(self.max_concurrency)}
+        return self._semaphores[loop]
+
+    async def _enter(self):
+        """Admits a call; returns True if it is the breaker's half-open trial."""
+        allowed, trial = self.breaker.allow()
+        if not allowed:
+            self.counts["rejected"] += 1
+            raise CircuitOpenError("LLM circuit breaker is open")
+        try:
+            await asyncio.wait_for(self._semaphore().acquire(), self.queue_timeout)
+        except BaseException as e:
+            # Timed out or cancelled while queued
+            if trial:
+                self.breaker.release_trial()
+            if isinstance(e, asyncio.TimeoutError):
+                self.counts["rejected"] += 1
+                raise LLMOverloaded(f"No LLM slot free within {self.queue_timeout}s")
+            raise
+        self.counts["calls"] += 1
+        self.in_flight += 1
+        return trial
+
+    def _exit(self):
+        self.in_flight -= 1
+        self._semaphore().release()
+
+    def _failed(self, error):
+        if isinstance(error, LLMTimeout):
+            self.counts["timeouts"] += 1
+        self.counts["failures"] += 1
+        self.breaker.record_failure()
+
+    async def _attempts(self, prompt):
+        tasks, errors = set(), []
+
+        def launch():
+            tasks.add(asyncio.create_task(self.backend.complete(prompt)))
+
+        launch()
+        attempts = 1
+        try:
+            while tasks:
+                can_hedge = self.hedge_after > 0 and attempts < self.max_attempts
+                done, _ = await asyncio.wait(
+                    tasks, timeout=self.hedge_after if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # First attempt is slow: race a second one against it
+                    self.counts["hedges"] += 1
+                    launch()
+                    attempts += 1
+                    continue
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())
+                if not tasks and attempts < self.max_attempts:
+                    self.counts["retries"] += 1
+                    launch()
+                    attempts += 1
+            raise errors[-1]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _release(self, trial, recorded):
+        self._exit()
+        if trial and not recorded:
+            # Cancelled (CancelledError/GeneratorExit are BaseExceptions) before an
+            # outcome was recorded: free the half-open trial for the next caller
+            self.breaker.release_trial()
+
+    async def complete(self, prompt):
+        trial = await self._enter()
+        recorded = False
+        try:
+            try:
+                result = await asyncio.wait_for(self._attempts(prompt), self.timeout)
+            except asyncio.TimeoutError:
+                raise LLMTimeout(f"No LLM answer within {self.timeout}s")
+            recorded = True
+            self.breaker.record_success()
+            return result
+        except Exception as e:
+            recorded = True
+            self._failed(e)
+            raise
+        finally:
+            self._release(trial, recorded)
+
+    async def stream(self, prompt):
+        """Streams are not hedged; the deadline covers the whole stream."""
+        trial = await self._enter()
+        tokens = self.backend.stream(prompt).__aiter__()
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        recorded = False
+        try:
+            while True:
+                remaining = deadline - asyncio.get_running_loop().time()
+                try:
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    token = await asyncio.wait_for(tokens.__anext__(), remaining)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    raise LLMTimeout(f"LLM stream not finished within {self.timeout}s")
+                yield token
+            recorded = True
+            self.breaker.record_success()
+        except Exception as e:
+            recorded = True
+            self._failed(e)
+            raise
+        finally:
+            self._release(trial, recorded)
+            await tokens.aclose()
+
+    def stats(self):
+        return {
+            **self.counts,
+            "in_flight": self.in_flight,
+            "breaker": self.breaker.state,
+            "breaker_opened": self.breaker.opened,
+        }
@@ -0,0 +1,384 @@
+# server/app/services/local_store.py
+"""
+Qdrant-free vector store for offline development, tests, benchmarks and
+read-only search replicas.
+
+LocalStore implements the subset of the QdrantClient API that db_service
+uses (upsert, retrieve, search, query_points, ...), so `VECTOR_STORE=local`
+swaps it in behind get_client() without touching the callers.
+
+Layout under `path`:
+    vectors.f32       unit-normalized float32 rows, memory-mapped
+    payloads.sqlite3  point id -> row number and JSON payload
+    ivf.npz           optional IVF (ANN) index: centroids and row assignments
+
+Search is an exact cosine top-k over the memmap (one matrix-vector product),
+or, with `ann_lists`, over the rows of the `ann_probe` closest clusters.
+Only the dense vector is used; hybrid queries fall back to their dense part.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+from qdrant_client import models
+
+# Payload fields that can be filtered on, kept in memory as columns
+FILTER_FIELDS = ("verdict", "source", "date")
+
+
+def _rfc3339(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _dense(vector):
+    return vector.get("", None) if isinstance(vector, dict) else vector
+
+def _select(payload, with_payload):
+    if not with_payload:
+        return None
+    if with_payload is True:
+        return payload
+    return {k: payload[k] for k in with_payload if k in payload}
+
+
+class LocalStore:
+    def __init__(self, path, dim=384, ann_lists=0, ann_probe=8, read_only=False):
+        self.path = path
+        self.dim = dim
+        self.ann_lists = ann_lists
+        self.ann_probe = ann_probe
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._ivf_path = os.path.join(path, "ivf.npz")
+        self._db = sqlite3.connect(os.path.join(path, "payloads.sqlite3"), check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS points (row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, payload TEXT)"
+            )
+
+        self._ids = []
+        self._rows = {}
+        # Filter columns as lists ("" when missing), turned into arrays on the first filtered search
+        self._columns = {field: [] for field in FILTER_FIELDS}
+        self._arrays = {}
+        for row, point_id, payload in self._db.execute("SELECT row, id, payload FROM points ORDER BY row"):
+            payload = json.loads(payload or "{}")
+            self._ids.append(point_id)
+            self._rows[point_id] = row
+            for field in FILTER_FIELDS:
+                self._columns[field].append(str(payload.get(field) or ""))
+        self._map()
+
+        self._centroids = None
+        self._assign = None
+        if ann_lists and os.path.exists(self._ivf_path):
+            ivf = np.load(self._ivf_path)
+            self._centroids, self._assign = ivf["centroids"], ivf["assign"]
+            if len(self._assign) < len(self._ids):
+                self._assign_new(len(self._assign))
+
+    def _map(self):
+        if not os.path.exists(self._vectors_path) or os.path.getsize(self._vectors_path) == 0:
+            self._matrix = np.empty((0, self.dim), dtype=np.float32)
+            return
+        rows = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        self._matrix = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r" if self.read_only else "r+", shape=(rows, self.dim)
+        )
+
+    # -- collection management: the store is a single collection --
+
+    def collection_exists(self, collection_name):
+        return True
+
+    def count(self, collection_name=None, exact=True, **kwargs):
+        return models.CountResult(count=len(self._ids))
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self._matrix = None
+
+    # -- writes --
+
+    def upsert(self, collection_name, points, wait=True, **kwargs):
+        if self.read_only:
+            raise PermissionError("LocalStore was opened read-only")
+        points = list(points)
+        if not points:
+            return
+        vectors = np.asarray([_dense(p.vector) for p in points], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+        with self._lock:
+            start = len(self._ids)
+            appended, records = [], []
+            for point, vector in zip(points, vectors):
+                point_id = str(point.id)
+                payload = point.payload or {}
+                row = self._rows.get(point_id)
+                if row is None:
+                    row = start + len(appended)
+                    appended.append(vector)
+                    self._rows[point_id] = row
+                    self._ids.append(point_id)
+                    for field in FILTER_FIELDS:
+                        self._columns[field].append("")
+                elif row >= start:
+                    # Same id twice in one batch
+                    appended[row - start] = vector
+                else:
+                    self._matrix[row] = vector
+                for field in FILTER_FIELDS:
+                    self._columns[field][row] = str(payload.get(field) or "")
+                records.append((row, point_id, json.dumps(payload)))
+            self._arrays = {}
+
+            if appended:
+                with open(self._vectors_path, "ab") as f:
+                    f.write(np.asarray(appended, dtype=np.float32).tobytes())
+            elif isinstance(self._matrix, np.memmap):
+                self._matrix.flush()
+            self._map()
+            with self._db:
+                self._db.executemany("INSERT OR REPLACE INTO points (row, id, payload) VALUES (?, ?, ?)", records)
+            if self._assign is not None:
+                self._assign_new(start, [r for r, _, _ in records if r < start])
+
+    def upload_points(self, collection_name, points, batch_size=64, **kwargs):
+        points = list(points)
+        for i in range(0, len(points), batch_size):
+            self.upsert(collection_name, points[i:i + batch_size])
+
+    # -- reads --
+
+    def _payloads(self, rows):
+        rows = [int(r) for r in rows]
+        if not rows:
+            return {}
+        found = {}
+        for start in range(0, len(rows), 500):
+            chunk = rows[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            for row, payload in self._db.execute(
+                f"SELECT row, payload FROM points WHERE row IN ({placeholders})", chunk
+            ):
+                found[row] = json.loads(payload or "{}")
+        return found
+
+    def retrieve(self, collection_name, ids, with_payload=True, with_vectors=False, **kwargs):
+        with self._lock:
+            rows = [self._rows[str(i)] for i in ids if str(i) in self._rows]
+            payloads = self._payloads(rows)
+            return [
+                models.Record(
+                    id=self._ids[row],
+                    payload=_select(payloads.get(row, {}), with_payload),
+                    vector=self._matrix[row].tolist() if with_vectors else None,
+                )
+                for row in rows
+            ]
+
+    def scroll(self, collection_name, limit=10, offset=None, with_payload=True, with_vectors=False, **kwargs):
+        with self._lock:
+            start = int(offset or 0)
+            rows = list(range(start, min(start + limit, len(self._ids))))
+            payloads = self._payloads(rows)
+            records = [
+                models.Record(
+                    id=self._ids[row],
+                    payload=_select(payloads.get(row, {}), with_payload),
+                    vector=self._matrix[row].tolist() if with_vectors else None,
+                )
+                for row in rows
+            ]
+            next_offset = start + limit if start + limit < len(self._ids) else None
+            return records, next_offset
+
+    def _mask(self, query_filter):
+        """Boolean row mask for a Filter of `must` conditions on FILTER_FIELDS, or None."""
+        if query_filter is None or not query_filter.must:
+            return None
+        mask = np.ones(len(self._ids), dtype=bool)
+        for condition in query_filter.must:
+            if condition.key not in FILTER_FIELDS:
+                raise NotImplementedError(f"LocalStore cannot filter on {condition.key!r}")
+            if condition.key not in self._arrays:
+                self._arrays[condition.key] = np.array(self._columns[condition.key], dtype=str)
+            column = self._arrays[condition.key]
+            if isinstance(condition.match, models.MatchAny):
+                mask &= np.isin(column, [str(v) for v in condition.match.any])
+            elif isinstance(condition.match, models.MatchValue):
+                mask &= column == str(condition.match.value)
+            elif condition.range is not None:
+                # RFC 3339 UTC strings order the same way as the instants they name
+                mask &= column != ""
+                gte, lte = _rfc3339(condition.range.gte), _rfc3339(condition.range.lte)
+                if gte:
+                    mask &= column >= gte
+                if lte:
+                    mask &= column <= lte
+            else:
+                raise NotImplementedError(f"Unsupported condition on {condition.key!r}")
+        return mask
+
+    def _candidates(self, query):
+        """Rows to score: every row, or those in the nearest IVF clusters."""
+        if not self.ann_lists or len(self._ids) < self.ann_lists * 39:
+            return None
+        if self._centroids is None:
+            self.build_index()
+        nearest = np.argsort(-(self._centroids @ query))[:self.ann_probe]
+        return np.flatnonzero(np.isin(self._assign, nearest))
+
+    def _search(self, vector, limit, query_filter=None, with_payload=True, with_vectors=False):
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        with self._lock:
+            if not self._ids:
+                return []
+            rows = self._candidates(query)
+            mask = self._mask(query_filter)
+            if rows is None:
+                rows = np.flatnonzero(mask) if mask is not None else np.arange(len(self._ids))
+            elif mask is not None:
+                rows = rows[mask[rows]]
+            if len(rows) == 0:
+                return []
+
+            scores = self._matrix[rows] @ query if len(rows) < len(self._ids) else self._matrix @ query
+            k = min(limit, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            payloads = self._payloads(rows[top]) if with_payload else {}
+            return [
+                models.ScoredPoint(
+                    id=self._ids[rows[i]], version=0, score=float(scores[i]),
+                    payload=_select(payloads.get(int(rows[i]), {}), with_payload),
+                    vector=self._matrix[rows[i]].tolist() if with_vectors else None,
+                )
+                for i in top
+            ]
+
+    def search(self, collection_name, query_vector, query_filter=None, limit=10, with_payload=True,
+               with_vectors=False, **kwargs):
+        return self._search(query_vector, limit, query_filter, with_payload, with_vectors)
+
+    def search_batch(self, collection_name, requests, **kwargs):
+        return [
+            self._search(
+                r.vector, r.limit, r.filter, True if r.with_payload is None else r.with_payload, bool(r.with_vector)
+            )
+            for r in requests
+        ]
+
+    def _query(self, prefetch, query, limit, query_filter, with_vectors=False):
+        if not isinstance(query, list):
+            # Fusion over prefetches: answer with the dense prefetch
+            dense = next(p for p in (prefetch or []) if p.using is None and isinstance(p.query, list))
+            query, query_filter = dense.query, query_filter or dense.filter
+        return self._search(query, limit, query_filter, with_vectors=with_vectors)
+
+    def query_points(self, collection_name, query=None, prefetch=None, query_filter=None, limit=10,
+                     with_vectors=False, **kwargs):
+        return models.QueryResponse(points=self._query(prefetch, query, limit, query_filter, bool(with_vectors)))
+
+    def query_batch_points(self, collection_name, requests, **kwargs):
+        return [
+            models.QueryResponse(points=self._query(r.prefetch, r.query, r.limit, r.filter, bool(r.with_vector)))
+            for r in requests
+        ]
+
+    # -- IVF index --
+
+    def build_index(self, n_lists=None, iterations=10, sample=50_000, seed=0):
+        """k-means over (a sample of) the vectors, then assign every row to its nearest centroid."""
+        n_lists = n_lists or self.ann_lists
+        with self._lock:
+            rng = np.random.default_rng(seed)
+            data = np.asarray(self._matrix)
+            train = data[rng.choice(len(data), min(sample, len(data)), replace=False)]
+            centroids = train[rng.choice(len(train), n_lists, replace=False)].copy()
+            for _ in range(iterations):
+                assign = np.argmax(train @ centroids.T, axis=1)
+                for c in range(n_lists):
+                    members = train[assign == c]
+                    if len(members):
+                        centroid = members.mean(axis=0)
+                        centroids[c] = centroid / max(float(np.linalg.norm(centroid)), 1e-12)
+            self._centroids = centroids
+            self._assign = np.empty(0, dtype=np.int32)
+            self._assign_new(0)
+
+    def _assign_new(self, start, changed=()):
+        rows = np.concatenate([np.arange(start, len(self._ids)), np.asarray(changed, dtype=np.int64)]).astype(np.int64)
+        assign = np.resize(self._assign, len(self._ids)).astype(np.int32)
+        for i in range(0, len(rows), 8192):
+            chunk = rows[i:i + 8192]
+            assign[chunk] = np.argmax(self._matrix[chunk] @ self._centroids.T, axis=1)
+        self._assign = assign
+        if not self.read_only:
+            np.savez(self._ivf_path, centroids=self._centroids, assign=self._assign)
+
+
+class AsyncLocalStore:
+    """AsyncQdrantClient stand-in: runs each LocalStore call in a worker thread."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getattr__(self, name):
+        method = getattr(self.store, name)
+
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(method, *args, **kwargs)
+        return call
+
+
+def export_from_qdrant(qdrant, collection_name, path, batch_size=512, **store_kwargs):
+    """Copy a Qdrant collection into a LocalStore at `path`, e.g. for an edge replica."""
+    store = LocalStore(path, **store_kwargs)
+    offset = None
+    while True:
+        records, offset = qdrant.scroll(
+            collection_name=collection_name, limit=batch_size, offset=offset,
+            with_payload=True, with_vectors=True
+        )
+        store.upsert(collection_name, [
+            models.PointStruct(id=r.id, vector=_dense(r.vector), payload=r.payload) for r in records
+        ])
+        if offset is None:
+            break
+    if store.ann_lists:
+        store.build_index()
+    return store
+
+
+if __name__ == "__main__":
+    import argparse
+    from qdrant_client import QdrantClient
+    from app.config import QDRANT_URL, QDRANT_API_KEY, COLLECTION_NAME, LOCAL_STORE_PATH, LOCAL_STORE_ANN_LISTS
+
+    parser = argparse.ArgumentParser(description="Export the Qdrant collection to a local store.")
+    parser.add_argument("--path", default=LOCAL_STORE_PATH)
+    parser.add_argument("--ann-lists", type=int, default=LOCAL_STORE_ANN_LISTS)
+    args = parser.parse_args()
+    store = export_from_qdrant(
+        QdrantClient(QDRANT_URL, api_key=QDRANT_API_KEY), COLLECTION_NAME, args.path, ann_lists=args.ann_lists
+    )
+    print(f"[INFO] Exported {store.count().count} points to {args.path}")
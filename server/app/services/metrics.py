@@ -0,0 +1,103 @@
+# server/app/services/metrics.py
+"""
+Prometheus metrics for the API and the ingestion pipeline.
+
+Latencies are observed where the work happens. Counters the services
+already keep (embedding and fact-check caches, rerank, LLM calls, verdict
+parsing) are exported from the /stats snapshot at scrape time by
+StatsCollector instead of being counted twice.
+"""
+
+from prometheus_client import Counter, Histogram, REGISTRY, start_http_server
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# 5 ms (cached embedding) up to a minute (slow LLM answer)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# API
+REQUEST_SECONDS = Histogram(
+    "veritium_request_seconds", "Request latency until the response starts, by endpoint",
+    ["endpoint"], buckets=LATENCY_BUCKETS
+)
+REQUESTS = Counter("veritium_requests", "Requests by endpoint and status code", ["endpoint", "status"])
+STAGE_SECONDS = Histogram(
+    "veritium_stage_seconds", "Latency of one pipeline stage (embed, search, rerank, prompt, llm, ...)",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+ERRORS = Counter("veritium_errors", "Errors by stage", ["stage"])
+
+# Ingestion
+INGEST_PAGES = Counter("veritium_ingest_pages", "Listing pages fetched, by source and result", ["source", "result"])
+INGEST_EMBEDDED = Counter("veritium_ingest_articles_embedded", "Articles embedded for upsert")
+INGEST_EMBED_SECONDS = Histogram(
+    "veritium_ingest_embed_batch_seconds", "Latency of one ingestion embedding batch", buckets=LATENCY_BUCKETS
+)
+INGEST_UPSERTED = Counter("veritium_ingest_points_upserted", "Points sent to the vector store")
+INGEST_UPSERT_SECONDS = Histogram(
+    "veritium_ingest_upsert_batch_seconds", "Latency of one bulk upsert call", buckets=LATENCY_BUCKETS
+)
+
+
+def _family(kind, name, documentation, label, values):
+    family = kind(name, documentation, labels=[label])
+    for key, value in values.items():
+        if value is not None:
+            family.add_metric([key], value)
+    return family
+
+class StatsCollector:
+    """Exports the counters in a /stats snapshot, taken by `snapshot()` on every scrape."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def describe(self):
+        # Nothing to check for name clashes up front; avoids taking a snapshot at registration
+        return []
+
+    def collect(self):
+        stats = self.snapshot()
+
+        cache = (stats.get("embedding") or {}).get("cache")
+        if cache:
+            yield _family(
+                CounterMetricFamily, "veritium_embedding_cache_lookups", "Embedding cache lookups", "result",
+                {k: cache[k] for k in ("hits", "disk_hits", "misses")}
+            )
+        factcheck = stats.get("factcheck_cache")
+        if factcheck:
+            yield _family(
+                CounterMetricFamily, "veritium_factcheck_cache_lookups", "Fact-check cache lookups", "result",
+                {k: factcheck[k] for k in ("hits", "semantic_hits", "misses")}
+            )
+        rerank = stats.get("rerank")
+        if rerank:
+            yield _family(
+                CounterMetricFamily, "veritium_rerank", "Rerank decisions", "result",
+                {k: rerank[k] for k in ("reranked", "skipped")}
+            )
+        llm = stats.get("llm")
+        if llm:
+            yield _family(
+                CounterMetricFamily, "veritium_llm_events", "LLM calls, hedges, retries and failures", "event",
+                {k: llm[k] for k in ("calls", "hedges", "retries", "timeouts", "rejected", "failures")}
+            )
+            yield GaugeMetricFamily("veritium_llm_in_flight", "LLM calls in flight", value=llm["in_flight"])
+            yield GaugeMetricFamily(
+                "veritium_llm_breaker_open", "1 while the LLM circuit breaker is open",
+                value=1 if llm["breaker"] == "open" else 0
+            )
+        parser = stats.get("verdict_parser")
+        if parser:
+            yield _family(
+                CounterMetricFamily, "veritium_verdict_parses", "LLM answers by parse outcome", "outcome",
+                {k: parser[k] for k in ("ok", "repaired", "failed", "requeried")}
+            )
+
+def register_stats(snapshot):
+    REGISTRY.register(StatsCollector(snapshot))
+
+def start_metrics_server(port):
+    """Serve /metrics on `port` from a background thread (for batch jobs such as ingestion)."""
+    start_http_server(port)
+    print(f"[INFO] Prometheus metrics on :{port}/metrics")
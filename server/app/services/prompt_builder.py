@@ -0,0 +1,125 @@
+# server/app/services/prompt_builder.py
+"""
+Assembles the /factcheck prompt from retrieved evidence: near-duplicates are
+dropped using the stored vectors, the rest is ordered by maximal marginal
+relevance and fitted into a token budget counted with the LLM's tokenizer.
+"""
+
+import threading
+
+import numpy as np
+from app.config import (
+    PROMPT_DEDUP_SIMILARITY, PROMPT_MMR_LAMBDA, PROMPT_EVIDENCE_TOKENS, PROMPT_ITEM_TOKENS,
+    PROMPT_TOKENIZER, HF_API_KEY,
+)
+
+# Rough rate used when the tokenizer cannot be loaded (e.g. offline)
+CHARS_PER_TOKEN = 4
+
+# Loaded on first use; False once loading has failed
+tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+def tokenizer_loaded():
+    """True once get_tokenizer() no longer needs to load (or download) anything."""
+    return tokenizer is not None
+
+def get_tokenizer():
+    global tokenizer
+    if tokenizer is None:
+        with _tokenizer_lock:
+            if tokenizer is None:
+                try:
+                    from transformers import AutoTokenizer
+                    tokenizer = AutoTokenizer.from_pretrained(PROMPT_TOKENIZER, token=HF_API_KEY)
+                except Exception as e:
+                    print(f"[WARN] Tokenizer {PROMPT_TOKENIZER} unavailable ({e}), estimating tokens from length")
+                    tokenizer = False
+    return tokenizer or None
+
+def count_tokens(text):
+    tok = get_tokenizer()
+    if tok is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(tok.encode(text, add_special_tokens=False))
+
+def truncate(text, max_tokens):
+    """`text` cut to at most `max_tokens` tokens, on a token boundary, with "..." when cut."""
+    if max_tokens <= 0:
+        return ""
+    tok = get_tokenizer()
+    if tok is None:
+        limit = max_tokens * CHARS_PER_TOKEN
+        return text if len(text) <= limit else text[:limit].rstrip() + "..."
+    ids = tok.encode(text, add_special_tokens=False)
+    if len(ids) <= max_tokens:
+        return text
+    return tok.decode(ids[:max_tokens]).rstrip() + "..."
+
+def dense_vector(result):
+    """Unit-length dense vector returned with a search result, or None."""
+    vector = getattr(result, "vector", None)
+    if isinstance(vector, dict):
+        vector = vector.get("")
+    if vector is None:
+        return None
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+def select_evidence(results, similarity=PROMPT_DEDUP_SIMILARITY, mmr_lambda=PROMPT_MMR_LAMBDA):
+    """
+    Results reordered by MMR, without near-duplicates. Relevance is the rank
+    given by retrieval/rerank; redundancy is the cosine similarity of the
+    stored vectors. Results without a vector are never treated as duplicates.
+    """
+    results = list(results)
+    if len(results) < 2:
+        return results
+    vectors = [dense_vector(r) for r in results]
+    # Rank-based relevance: retrieval, RRF and cross-encoder scores are on different scales
+    relevance = [1.0 - i / len(results) for i in range(len(results))]
+
+    chosen = []
+    remaining = list(range(len(results)))
+    while remaining:
+        best, best_score = None, None
+        for i in list(remaining):
+            redundancy = max(
+                (float(vectors[i] @ vectors[j]) for j in chosen
+                 if vectors[i] is not None and vectors[j] is not None),
+                default=0.0,
+            )
+            if similarity > 0 and redundancy >= similarity:
+                remaining.remove(i)
+                continue
+            score = mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy
+            if best_score is None or score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        chosen.append(best)
+        remaining.remove(best)
+    return [results[i] for i in chosen]
+
+def evidence_line(result, max_tokens=PROMPT_ITEM_TOKENS):
+    payload = result.payload
+    return (
+        f"- {truncate(payload['text'], max_tokens)} "
+        f"(Source: {payload['source_url']}, Date: {payload['date']}, verdict: {payload['verdict']})"
+    )
+
+def build_evidence(results, budget=PROMPT_EVIDENCE_TOKENS, item_tokens=PROMPT_ITEM_TOKENS):
+    """
+    (results used, evidence text) for the prompt. Items are added in MMR order
+    until the next one would exceed `budget` tokens; the first is always kept.
+    """
+    used, lines, total = [], [], 0
+    for result in select_evidence(results):
+        line = evidence_line(result, item_tokens)
+        tokens = count_tokens(line)
+        if lines and total + tokens > budget:
+            break
+        used.append(result)
+        lines.append(line)
+        total += tokens
+    return used, "\n\n".join(lines)
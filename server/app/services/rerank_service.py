@@ -0,0 +1,105 @@
+# server/app/services/rerank_service.py
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+from app.config import (
+    RERANK_ENABLED, RERANK_MODEL, RERANK_CANDIDATES, RERANK_TOP_N, RERANK_SKIP_MARGIN, FACTCHECK_TOP_K,
+    HYBRID_SEARCH,
+)
+from app.services.prompt_builder import dense_vector
+
+# Loaded on first rerank
+model = None
+_model_lock = threading.Lock()
+
+def get_model():
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                from sentence_transformers import CrossEncoder
+                model = CrossEncoder(RERANK_MODEL)
+    return model
+
+
+class RerankStats:
+    """How often reranking ran or was skipped, and how long the cross-encoder took."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reranked = 0
+        self.skipped = 0
+        self.candidates = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, reranked, candidates=0, ms=0.0):
+        with self._lock:
+            if not reranked:
+                self.skipped += 1
+                return
+            self.reranked += 1
+            self.candidates += candidates
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled": RERANK_ENABLED,
+                "reranked": self.reranked,
+                "skipped": self.skipped,
+                "mean_candidates": round(self.candidates / self.reranked, 2) if self.reranked else 0.0,
+                "mean_ms": round(self.total_ms / self.reranked, 2) if self.reranked else 0.0,
+                "max_ms": round(self.max_ms, 2),
+            }
+
+
+stats = RerankStats()
+
+def candidate_count():
+    """How many results to retrieve for a claim: a wider set when reranking is on."""
+    return max(RERANK_CANDIDATES, RERANK_TOP_N) if RERANK_ENABLED else FACTCHECK_TOP_K
+
+def clear_leader(results, margin=RERANK_SKIP_MARGIN, query_embedding=None):
+    """
+    True when the top result's cosine similarity leads every other result by `margin`.
+    With HYBRID_SEARCH the scores are RRF values (around 0.03), so the lead is
+    measured on the returned dense vectors, and never assumed without them.
+    """
+    if len(results) < 2:
+        return True
+    if not HYBRID_SEARCH:
+        return results[0].score - results[1].score >= margin
+    vectors = [dense_vector(r) for r in results]
+    if query_embedding is None or any(v is None for v in vectors):
+        return False
+    query = np.asarray(query_embedding, dtype=np.float32)
+    similarities = np.stack(vectors) @ (query / (np.linalg.norm(query) or 1.0))
+    return similarities[0] - similarities[1:].max() >= margin
+
+def rerank(query, results, top_n=RERANK_TOP_N, margin=RERANK_SKIP_MARGIN, query_embedding=None):
+    """
+    Best `top_n` results for the query. All candidates are scored by the
+    cross-encoder in one batched call, unless the top result is already
+    ahead by `margin` (see clear_leader), in which case retrieval order is kept.
+    """
+    if not RERANK_ENABLED:
+        return results
+    if clear_leader(results, margin, query_embedding):
+        stats.record(False)
+        return results[:top_n]
+
+    started = time.perf_counter()
+    scores = get_model().predict([(query, r.payload["text"]) for r in results])
+    ranked = [r for _, r in sorted(zip(scores, results), key=lambda pair: -pair[0])]
+    stats.record(True, len(results), (time.perf_counter() - started) * 1000)
+    return ranked[:top_n]
+
+async def rerank_async(query, results, query_embedding=None):
+    if not RERANK_ENABLED or clear_leader(results, query_embedding=query_embedding):
+        return rerank(query, results, query_embedding=query_embedding)
+    return await asyncio.to_thread(rerank, query, results, query_embedding=query_embedding)
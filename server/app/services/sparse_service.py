@@ -0,0 +1,53 @@
+# server/app/services/sparse_service.py
+"""
+Lexical channel for hybrid search: claims become sparse BM25 term vectors
+over hashed tokens. Qdrant applies the IDF part at query time (the "bm25"
+sparse vector is created with Modifier.IDF), so documents only carry the
+saturated term frequency and queries carry a 1.0 per term.
+"""
+
+import re
+import zlib
+from collections import Counter
+
+from qdrant_client import models
+
+SPARSE_VECTOR_NAME = "bm25"
+
+# BM25 parameters; claims are short, so the average length is a fixed estimate
+K1 = 1.2
+B = 0.75
+AVG_DOC_LEN = 20
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+# Words, plus numbers with their separators ("3.5", "1,000", "2020") as single tokens
+TOKEN_RE = re.compile(r"\d+(?:[.,]\d+)*|\w+")
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+def _index(token):
+    return zlib.crc32(token.encode("utf-8"))
+
+def _vector(weights):
+    # Hash collisions merge terms; keep indices unique as Qdrant requires
+    merged = Counter()
+    for token, weight in weights.items():
+        merged[_index(token)] += weight
+    indices = sorted(merged)
+    return models.SparseVector(indices=indices, values=[float(merged[i]) for i in indices])
+
+def document_vector(text):
+    tokens = tokenize(text)
+    norm = K1 * (1 - B + B * len(tokens) / AVG_DOC_LEN)
+    return _vector({
+        token: tf * (K1 + 1) / (tf + norm)
+        for token, tf in Counter(tokens).items()
+    })
+
+def query_vector(text):
+    return _vector({token: 1.0 for token in set(tokenize(text))})
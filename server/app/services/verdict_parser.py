@@ -0,0 +1,215 @@
+# server/app/services/verdict_parser.py
+"""
+Turns LLM answers into a typed Verdict.
+
+parse_verdict() tries strict JSON first, then a cheap repair pass (code
+fences, smart or single quotes, trailing commas, truncated output) before
+the caller considers re-querying. IncrementalVerdictParser does the same on
+a stream, reporting each top-level field as soon as it is complete.
+"""
+
+import json
+import re
+import threading
+from typing import List, Literal
+
+from pydantic import BaseModel, ValidationError, field_validator
+
+VERDICTS = ("True", "False", "Misleading")
+
+
+class Verdict(BaseModel):
+    verdict: Literal["True", "False", "Misleading"]
+    explanation: str = ""
+    sources: List[str] = []
+
+    @field_validator("verdict", mode="before")
+    @classmethod
+    def _canonical_verdict(cls, value):
+        text = str(value).strip().strip(".").lower()
+        for verdict in VERDICTS:
+            if text == verdict.lower():
+                return verdict
+        # "Mostly false", "Partly true", "Half true", ... are neither outright
+        if any(word in text for word in ("mostly", "partly", "half", "mixed", "misleading")):
+            return "Misleading"
+        return value
+
+    @field_validator("sources", mode="before")
+    @classmethod
+    def _sources_list(cls, value):
+        if value is None:
+            return []
+        return [value] if isinstance(value, str) else value
+
+
+# JSON schema for backends that support constrained decoding
+VERDICT_SCHEMA = Verdict.model_json_schema()
+
+
+class ParseStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"ok": 0, "repaired": 0, "failed": 0, "requeried": 0}
+
+    def record(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def snapshot(self):
+        with self._lock:
+            total = self.counts["ok"] + self.counts["repaired"] + self.counts["failed"]
+            return {
+                **self.counts,
+                "failure_rate": round(self.counts["failed"] / total, 4) if total else 0.0,
+            }
+
+
+stats = ParseStats()
+
+
+def _json_object(text):
+    """The first {...} in the text (balanced, ignoring braces in strings), or everything from the first "{"."""
+    start = text.find("{")
+    if start < 0:
+        return None
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return text[start:]
+
+def _close(text):
+    """Close an unterminated string and any open arrays/objects, e.g. for a truncated answer."""
+    stack, in_string, escaped = [], False, False
+    for c in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+        elif c in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = re.sub(r",\s*$", "", text.rstrip())
+    return text + "".join(reversed(stack))
+
+def repair(text):
+    """Cheap fixes for the ways LLMs usually break JSON. Returns a candidate string (may still be invalid)."""
+    text = re.sub(r"```(?:json)?", "", text or "")
+    text = text.replace("“", '"').replace("”", '"').replace("‘", "'").replace("’", "'")
+    candidate = _json_object(text)
+    if candidate is None:
+        return None
+    if '"' not in candidate:
+        candidate = candidate.replace("'", '"')
+    candidate = _close(candidate)
+    # Trailing commas before a closing bracket
+    return re.sub(r",\s*([}\]])", r"\1", candidate)
+
+def _validate(data):
+    try:
+        return Verdict.model_validate(data)
+    except ValidationError:
+        return None
+
+def parse_verdict(text, record=True):
+    """
+    (Verdict or None, outcome) for an LLM answer; outcome is "ok", "repaired" or "failed".
+    """
+    verdict, outcome = None, "failed"
+    try:
+        verdict = _validate(json.loads(text))
+        outcome = "ok" if verdict else "failed"
+    except (TypeError, ValueError):
+        pass
+
+    if verdict is None:
+        candidate = repair(text)
+        if candidate is not None:
+            try:
+                verdict = _validate(json.loads(candidate))
+            except ValueError:
+                verdict = None
+            if verdict is not None:
+                outcome = "repaired"
+
+    if record:
+        stats.record(outcome)
+    return verdict, outcome
+
+
+class IncrementalVerdictParser:
+    """
+    Feed streamed text deltas; each feed() returns the top-level fields that
+    became complete with that delta, e.g. {"verdict": "False"} long before
+    the explanation has finished streaming.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields = {}
+
+    def feed(self, delta):
+        self.buffer += delta
+        text = re.sub(r"```(?:json)?", "", self.buffer)
+        start = text.find("{")
+        if start < 0:
+            return {}
+
+        # Cut after the last top-level comma or the closing brace: everything before is complete
+        depth, in_string, escaped, cut = 0, False, False, None
+        for i in range(start, len(text)):
+            c = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif c == "\\":
+                    escaped = True
+                elif c == '"':
+                    in_string = False
+            elif c == '"':
+                in_string = True
+            elif c in "{[":
+                depth += 1
+            elif c in "}]":
+                depth -= 1
+                if depth == 0:
+                    cut = i
+                    break
+            elif c == "," and depth == 1:
+                cut = i
+        if cut is None:
+            return {}
+        try:
+            complete = json.loads(text[start:cut] + "}")
+        except ValueError:
+            return {}
+
+        new = {k: v for k, v in complete.items() if k not in self.fields}
+        self.fields.update(new)
+        return new
+
+    def result(self):
+        return parse_verdict(self.buffer)
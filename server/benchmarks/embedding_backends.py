@@ -0,0 +1,63 @@
+# server/benchmarks/embedding_backends.py
+"""
+CPU latency/throughput of the embedding backends.
+
+    python -m benchmarks.embedding_backends --backends torch onnx int8 --batch-size 32
+
+Reports single-query p50/p95 latency and batched throughput for each backend.
+"""
+
+import argparse
+import statistics
+import time
+
+from app.services.embedding_service import load_model, BACKENDS
+
+SAMPLE = (
+    "Viral post claims the government will ban cash withdrawals above 10,000 rupees from next month."
+)
+
+
+def bench(model, batch_size, repeats):
+    model.encode([SAMPLE] * batch_size)  # warm-up
+
+    single = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        model.encode([SAMPLE])
+        single.append(time.perf_counter() - started)
+
+    batch = [f"{SAMPLE} #{i}" for i in range(batch_size)]
+    started = time.perf_counter()
+    for _ in range(max(1, repeats // 10)):
+        model.encode(batch, batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+
+    single.sort()
+    return {
+        "single_p50_ms": statistics.median(single) * 1000,
+        "single_p95_ms": single[int(0.95 * (len(single) - 1))] * 1000,
+        "batch_texts_per_s": batch_size * max(1, repeats // 10) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "int8"], choices=BACKENDS)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'backend':<10}{'p50 ms':>10}{'p95 ms':>10}{'batch texts/s':>16}")
+    for backend in args.backends:
+        try:
+            model = load_model(backend)
+        except Exception as e:
+            print(f"{backend:<10} unavailable: {e}")
+            continue
+        r = bench(model, args.batch_size, args.repeats)
+        print(f"{backend:<10}{r['single_p50_ms']:>10.2f}{r['single_p95_ms']:>10.2f}{r['batch_texts_per_s']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
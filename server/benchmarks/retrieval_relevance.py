@@ -0,0 +1,94 @@
+# server/benchmarks/retrieval_relevance.py
+"""
+Offline recall/latency comparison of dense-only and hybrid (dense + BM25, RRF) retrieval.
+
+    HYBRID_SEARCH=true python -m benchmarks.retrieval_relevance --samples 200 --k 5
+
+Without --queries this is a known-item test over the live collection: each
+sampled claim is turned into a short keyword query (its names, numbers and
+a few other words, shuffled), and a hit means the original claim is in the
+top k. With --queries, a JSONL file of {"query": ..., "relevant": [source_url, ...]}
+is used instead.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from app.config import COLLECTION_NAME, HYBRID_SEARCH
+from app.services.db_service import get_client, search_claim
+from app.services.embedding_service import get_embeddings
+from app.services.sparse_service import tokenize
+
+
+def keyword_query(text, rng):
+    words = text.split()
+    keep = [w for w in words if w[:1].isupper() or any(c.isdigit() for c in w)]
+    rest = [w for w in words if w not in keep and tokenize(w)]
+    keep += rng.sample(rest, min(len(rest), 3))
+    rng.shuffle(keep)
+    return " ".join(keep) or text
+
+def sample_queries(samples, seed):
+    rng = random.Random(seed)
+    records, _ = get_client().scroll(
+        collection_name=COLLECTION_NAME, limit=samples * 5, with_payload=["text", "source_url"]
+    )
+    records = [r for r in records if r.payload.get("text")]
+    return [
+        {"query": keyword_query(r.payload["text"], rng), "relevant": [r.payload["source_url"]]}
+        for r in rng.sample(records, min(samples, len(records)))
+    ]
+
+def evaluate(queries, k, hybrid):
+    embeddings = get_embeddings([q["query"] for q in queries])
+    hits, reciprocal_ranks, latencies = 0, [], []
+    for q, embedding in zip(queries, embeddings):
+        started = time.perf_counter()
+        results = search_claim(embedding.tolist(), top_k=k, query_text=q["query"] if hybrid else None)
+        latencies.append(time.perf_counter() - started)
+
+        urls = [r.payload.get("source_url") for r in results]
+        rank = next((i + 1 for i, url in enumerate(urls) if url in q["relevant"]), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    latencies.sort()
+    return {
+        f"recall@{k}": hits / len(queries),
+        "mrr": statistics.mean(reciprocal_ranks),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", help="JSONL file of labelled queries")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+    if not HYBRID_SEARCH:
+        raise SystemExit("Set HYBRID_SEARCH=true (against a collection that has BM25 vectors).")
+
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [json.loads(line) for line in f if line.strip()]
+    else:
+        queries = sample_queries(args.samples, args.seed)
+
+    results = {mode: evaluate(queries, args.k, mode == "hybrid") for mode in ("dense", "hybrid")}
+    print(f"{len(queries)} queries")
+    print(f"{'mode':<8}{'recall@' + str(args.k):>10}{'mrr':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode, r in results.items():
+        print(f"{mode:<8}{r[f'recall@{args.k}']:>10.3f}{r['mrr']:>8.3f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"queries": len(queries), "k": args.k, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+# server/benchmarks/suite.py
+"""
+Offline benchmark suite: embedding throughput, vector search latency and API load.
+
+    python -m benchmarks.suite                          # everything, results/<commit>.json
+    python -m benchmarks.suite --only search --sizes 10000 100000
+    python -m benchmarks.suite --compare benchmarks/results/<older commit>.json
+
+Nothing touches the network. The embedding model is used if it is already in
+the Hugging Face cache, otherwise a deterministic hashing embedder stands in
+(reported under meta.embedder). Vector search runs on synthetic clustered
+vectors in the local store (exact and IVF) and qdrant-client's in-memory
+mode. The API load test drives /search and /factcheck in-process against a
+local store and the mock LLM backend.
+
+Results are written as JSON. With --compare, metrics that got worse by more
+than --tolerance are listed and the exit status is 1.
+"""
+
+import os
+
+# Never reach out for model weights or tokenizers
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from benchmarks.embedding_backends import SAMPLE, bench as bench_encode
+
+DIM = 384
+SEED = 0
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class HashEmbedder:
+    """
+    Deterministic stand-in for the sentence-transformers model: the sum of
+    fixed random vectors for the hashed tokens, normalized. Same encode()
+    signature, so it can replace embedding_service.model.
+    """
+
+    def __init__(self, dim=DIM, buckets=4096, seed=SEED):
+        self.table = np.random.default_rng(seed).standard_normal((buckets, dim)).astype(np.float32)
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, **kwargs):
+        from app.services.sparse_service import tokenize
+
+        out = np.zeros((len(texts), self.table.shape[1]), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in tokenize(text):
+                out[i] += self.table[zlib.crc32(token.encode("utf-8")) % len(self.table)]
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out
+
+
+def load_embedder(kind):
+    """(model, name): the real model for "model", the hashing embedder for "hash", "auto" tries the model first."""
+    if kind in ("auto", "model"):
+        from app.services.embedding_service import load_model, MODEL_NAME
+        try:
+            return load_model(), MODEL_NAME
+        except Exception as e:
+            if kind == "model":
+                raise
+            print(f"[WARN] Model not available offline ({type(e).__name__}), using the hashing embedder")
+    return HashEmbedder(), "hash"
+
+
+def percentiles(seconds):
+    """p50/p95/p99 in milliseconds."""
+    values = np.asarray(seconds) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)}
+
+
+# -- embedding --
+
+def bench_embedding(model, batch_size, repeats, concurrency):
+    """Single vs batched encodes, plus concurrent single requests through the coalescer."""
+    from app.services.embedding_service import EmbeddingCoalescer
+
+    result = {k: round(v, 3) for k, v in bench_encode(model, batch_size, repeats).items()}
+
+    coalescer = EmbeddingCoalescer(
+        lambda texts: model.encode(texts, batch_size=len(texts), convert_to_numpy=True), 5, batch_size
+    )
+    texts = [f"{SAMPLE} #{i}" for i in range(repeats * 4)]
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=lambda part: [coalescer.embed(t) for t in part], args=(texts[i::concurrency],))
+        for i in range(concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    result["coalesced_texts_per_s"] = round(len(texts) / elapsed, 1)
+    result["coalesced_mean_batch"] = coalescer.stats()["mean_batch_size"]
+    return result
+
+
+# -- vector search --
+
+def synthetic_vectors(n, dim=DIM, clusters=256, seed=SEED, chunk=100_000):
+    """Yields unit vectors in chunks: gaussian blobs around `clusters` centers, like topical claims."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    for start in range(0, n, chunk):
+        size = min(chunk, n - start)
+        block = centers[rng.integers(0, clusters, size)] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        yield start, block
+
+def _points(start, block, as_list=False):
+    # model_construct skips validation: building 1M validated points would dominate the run.
+    # The local store takes NumPy rows as they are; Qdrant wants lists.
+    return [
+        models.PointStruct.model_construct(
+            id=start + i, vector=vector.tolist() if as_list else vector,
+            payload={"text": f"Synthetic claim {start + i}", "verdict": "False", "source": "example.com"}
+        )
+        for i, vector in enumerate(block)
+    ]
+
+def _queries(n_queries, seed=SEED + 1):
+    _, block = next(synthetic_vectors(n_queries, seed=seed))
+    return block
+
+def _time_queries(search, queries, k):
+    latencies, hits = [], []
+    for query in queries:
+        started = time.perf_counter()
+        results = search(query, k)
+        latencies.append(time.perf_counter() - started)
+        hits.append([int(r.id) for r in results])
+    return latencies, hits
+
+def _recall(hits, exact):
+    return round(statistics.mean(len(set(h) & set(e)) / len(e) for h, e in zip(hits, exact)), 4)
+
+def bench_search(size, n_queries, k, ann_probe, qdrant_max, workdir):
+    """Exact and IVF local-store search (and in-memory Qdrant up to `qdrant_max` points) over `size` vectors."""
+    from app.services.local_store import LocalStore
+
+    queries = _queries(n_queries)
+    ann_lists = max(16, int(np.sqrt(size)))
+    store = LocalStore(os.path.join(workdir, f"store-{size}"), dim=DIM, ann_lists=0)
+    started = time.perf_counter()
+    for start, block in synthetic_vectors(size):
+        for i in range(0, len(block), 10_000):
+            store.upsert("bench", _points(start + i, block[i:i + 10_000]))
+    load_s = time.perf_counter() - started
+
+    runs = {}
+    search = lambda q, limit: store.search("bench", q, limit=limit, with_payload=False)
+    latencies, exact = _time_queries(search, queries, k)
+    runs["local_exact"] = {**percentiles(latencies), "recall_at_k": 1.0}
+
+    started = time.perf_counter()
+    store.ann_lists, store.ann_probe = ann_lists, ann_probe
+    store.build_index()
+    index_s = time.perf_counter() - started
+    latencies, hits = _time_queries(search, queries, k)
+    runs["local_ivf"] = {
+        **percentiles(latencies), "recall_at_k": _recall(hits, exact),
+        "lists": ann_lists, "probe": ann_probe, "build_s": round(index_s, 2),
+    }
+
+    started = time.perf_counter()
+    batch = store.search_batch("bench", [
+        models.SearchRequest(vector=q.tolist(), limit=k, with_payload=False) for q in queries
+    ])
+    runs["local_ivf"]["batch_queries_per_s"] = round(len(batch) / (time.perf_counter() - started), 1)
+    store.close()
+
+    if size <= qdrant_max:
+        qdrant = QdrantClient(":memory:")
+        qdrant.create_collection("bench", vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+        for start, block in synthetic_vectors(size):
+            for i in range(0, len(block), 10_000):
+                qdrant.upsert("bench", _points(start + i, block[i:i + 10_000], as_list=True), wait=True)
+        search = lambda q, limit: qdrant.query_points("bench", query=q.tolist(), limit=limit, with_payload=False).points
+        latencies, hits = _time_queries(search, queries, k)
+        runs["qdrant_memory"] = {**percentiles(latencies), "recall_at_k": _recall(hits, exact)}
+        qdrant.close()
+
+    return {"size": size, "k": k, "queries": n_queries, "load_s": round(load_s, 2), "runs": runs}
+
+
+# -- API load --
+
+CLAIM_TEMPLATES = [
+    "Viral video shows {} flooding the city centre",
+    "Government to ban {} from next month",
+    "Photo of {} at the rally is from 2019",
+    "Scientists confirm {} cures the common cold",
+]
+TOPICS = ["cash withdrawals", "garlic", "the prime minister", "solar panels", "a dam", "5G towers"]
+
+def _claim(i):
+    return f"{CLAIM_TEMPLATES[i % len(CLAIM_TEMPLATES)].format(TOPICS[i % len(TOPICS)])} #{i}"
+
+def _setup_api(embedder, store_size, llm_latency, workdir):
+    """Point the app's services at a synthetic local store, the given embedder and the mock LLM."""
+    from app.services import db_service, embedding_service, huggingface_service
+    from app.services.local_store import LocalStore, AsyncLocalStore
+
+    store = LocalStore(os.path.join(workdir, "api-store"), dim=DIM)
+    verdicts = ["False", "True", "Misleading", "Pants on Fire"]
+    for start, block in synthetic_vectors(store_size):
+        store.upsert("bench", [
+            models.PointStruct.model_construct(id=start + i, vector=vector, payload={
+                "text": _claim(start + i), "verdict": verdicts[(start + i) % len(verdicts)],
+                "source_url": f"https://example.com/fact-check/{start + i}",
+                "source": "example.com", "date": "2025-01-01T00:00:00Z",
+            })
+            for i, vector in enumerate(block)
+        ])
+    db_service.client, db_service.async_client = store, AsyncLocalStore(store)
+
+    embedding_service.model = embedder
+    embedding_service.cache = None
+    backend = huggingface_service.make_backend("mock")
+    backend.backend.latency = llm_latency
+    huggingface_service.backend = backend
+    return store
+
+async def _load(path, body, requests, concurrency):
+    import httpx
+    from app.main import app
+
+    latencies, errors, timings = [], 0, []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                resp = await client.post(path, json=body(i))
+                latencies.append(time.perf_counter() - started)
+                if resp.status_code != 200:
+                    errors += 1
+                elif path == "/factcheck":
+                    timings.append(resp.json()["timings"])
+
+        await client.post(path, json=body(-1))  # warm-up
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - started
+
+    result = {
+        "requests": requests, "concurrency": concurrency, "errors": errors,
+        "requests_per_s": round(requests / elapsed, 1), **percentiles(latencies),
+    }
+    if timings:
+        result["mean_stage_ms"] = {
+            key: round(statistics.mean(t[key] for t in timings if key in t), 3) for key in timings[0]
+        }
+    return result
+
+def bench_api(embedder, store_size, requests, concurrency, llm_latency, workdir):
+    from app.services import factcheck_cache, prompt_builder
+
+    store = _setup_api(embedder, store_size, llm_latency, workdir)
+    # Unique claims, so every request misses the fact-check cache and reaches the mock LLM
+    factcheck_cache.factcheck_cache.max_entries = 0
+    result = {
+        "store_size": store_size,
+        "llm_latency_s": llm_latency,
+        "tokenizer": "loaded" if prompt_builder.get_tokenizer() else "estimate",
+        "search": asyncio.run(_load("/search", lambda i: {"text": _claim(i)}, requests, concurrency)),
+        "factcheck": asyncio.run(_load("/factcheck", lambda i: {"claim": _claim(i)}, requests, concurrency)),
+    }
+    store.close()
+    return result
+
+
+# -- results --
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+def flatten(data, prefix=""):
+    """{"a": {"b": 1}} -> {"a.b": 1}; lists of runs are keyed by their "size"."""
+    flat = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flat.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            key = value.get("size", i) if isinstance(value, dict) else i
+            flat.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix.rstrip(".")] = data
+    return flat
+
+def _higher_is_better(key):
+    return key.endswith(("per_s", "recall_at_k", "mean_batch"))
+
+def _lower_is_better(key):
+    return not _higher_is_better(key) and key.endswith(("_ms", "_s"))
+
+def compare(current, baseline, tolerance):
+    """Metrics at least `tolerance` (relative) worse than the baseline, as (key, old, new) tuples."""
+    old, new = flatten(baseline.get("results", {})), flatten(current.get("results", {}))
+    worse = []
+    for key in sorted(old.keys() & new.keys()):
+        before, after = old[key], new[key]
+        if not before:
+            continue
+        change = (after - before) / abs(before)
+        if (_lower_is_better(key) and change > tolerance) or (_higher_is_better(key) and change < -tolerance):
+            worse.append((key, before, after))
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=["embedding", "search", "api"], default=["embedding", "search", "api"])
+    parser.add_argument("--embedder", choices=["auto", "model", "hash"], default="auto")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=100)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ann-probe", type=int, default=16)
+    parser.add_argument("--qdrant-max", type=int, default=100_000, help="largest size also run on in-memory Qdrant")
+    parser.add_argument("--store-size", type=int, default=10_000, help="claims in the API benchmark's store")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="mock LLM answer time in seconds")
+    parser.add_argument("--output", help="JSON file to write (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    embedder, embedder_name = load_embedder(args.embedder)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "embedder": embedder_name,
+            "args": vars(args),
+        },
+        "results": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="veritium-bench-") as workdir:
+        if "embedding" in args.only:
+            print("[INFO] Embedding throughput...")
+            report["results"]["embedding"] = bench_embedding(embedder, args.batch_size, args.repeats, args.concurrency)
+        if "search" in args.only:
+            report["results"]["search"] = []
+            for size in args.sizes:
+                print(f"[INFO] Search latency at {size:,} vectors...")
+                report["results"]["search"].append(
+                    bench_search(size, args.queries, args.top_k, args.ann_probe, args.qdrant_max, workdir)
+                )
+        if "api" in args.only:
+            print("[INFO] API load (/search, /factcheck)...")
+            report["results"]["api"] = bench_api(
+                embedder, args.store_size, args.requests, args.concurrency, args.llm_latency, workdir
+            )
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['meta']['commit']}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["results"], indent=2))
+    print(f"[INFO] Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        worse = compare(report, baseline, args.tolerance)
+        print(f"\nAgainst {baseline['meta']['commit']}: {len(worse)} metric(s) worse by more than {args.tolerance:.0%}")
+        for key, before, after in worse:
+            print(f"  {key}: {before} -> {after}")
+        if worse:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,40 @@
 from app.main import app  # Fixed import
 from app.services import db_service  # Only import necessary service
 from fastapi.testclient import TestClient
+from app.services.factcheck_cache import FactCheckCache
+from types import SimpleNamespace
 import pytest
 
 client = TestClient(app)  # Use the imported app
 
+@pytest.fixture
+def retrieval(monkeypatch):
+    """One canned hit for every claim, recording the filter each search got, and an empty verdict cache."""
+    fake = SimpleNamespace(filters=[], cache=FactCheckCache(max_entries=10, ttl_seconds=60))
+    fake.result = SimpleNamespace(id="p1", score=0.9, payload={
+        "text": "Test claim", "verdict": "False", "source_url": "http://example.com", "date": "2025-08-13"
+    })
+    async def fake_embedding(text):
+        return [0.1] * 384
+    async def fake_search(embedding, top_k=1, query_filter=None, query_text=None, with_vectors=False):
+        fake.filters.append(query_filter)
+        return [fake.result]
+
+    monkeypatch.setattr("app.main.get_embedding_async", fake_embedding)
+    monkeypatch.setattr("app.main.search_claim_async", fake_search)
+    monkeypatch.setattr("app.main.factcheck_cache", fake.cache)
+    return fake
+
 def test_search_endpoint(monkeypatch):
-    # Patch get_embedding where it's used in db_service
-    monkeypatch.setattr(
-        "app.services.db_service.get_embedding", 
-        lambda x: [0.1] * 384
-    )
+    # Patch the embedding and search calls where the endpoint uses them
+    async def fake_embedding(text):
+        return [0.1] * 384
 
-    # Mock search_claim
-    def fake_search_claim(query_embedding, top_k=5):
+    # Mock search_claim_async
+    async def fake_search_claim(query_embedding, top_k=5, query_filter=None, query_text=None, with_vectors=False):
         class FakeResult:
             def __init__(self):
+                self.id = "p1"
                 self.score = 0.9
                 self.payload = {
                     "text": "Test claim",
@@ -25,8 +44,9 @@ def test_search_endpoint(monkeypatch):
                 }
         return [FakeResult()]
 
+    monkeypatch.setattr("app.main.get_embedding_async", fake_embedding)
     monkeypatch.setattr(
-        "app.services.db_service.search_claim", 
+        "app.main.search_claim_async", 
         fake_search_claim
     )
 
@@ -35,4 +55,172 @@ def test_search_endpoint(monkeypatch):
     data = res.json()
     assert isinstance(data, list)
     assert len(data) > 0
-    assert data[0]["text"] == "Test claim"
\ No newline at end of file
+    assert data[0]["text"] == "Test claim"
+def test_factcheck_is_cached(monkeypatch, retrieval):
+    llm_calls = []
+    async def fake_llm(prompt):
+        llm_calls.append(prompt)
+        return '{"verdict": "False"}'
+
+    monkeypatch.setattr("app.main.query_llm", fake_llm)
+
+    first = client.post("/factcheck", json={"claim": "Test claim"}).json()
+    second = client.post("/factcheck", json={"claim": "test  claim"}).json()
+    assert len(llm_calls) == 1
+    assert first["cached"] is False and second["cached"] is True
+    assert second["llm_response"] == first["llm_response"]
+    assert set(first["timings"]) == {
+        "embed_ms", "search_ms", "rerank_ms", "prompt_ms", "llm_ms", "verdict_ms", "total_ms"
+    }
+    # Served from the cache: no LLM stage
+    assert "llm_ms" not in second["timings"]
+
+def test_factcheck_stream_events(monkeypatch, retrieval):
+    import json
+    async def fake_stream(prompt):
+        for token in ['{"verdict": ', '"False", ', '"explanation": "no"}']:
+            yield token
+
+    monkeypatch.setattr("app.main.stream_llm", fake_stream)
+
+    res = client.post("/factcheck/stream", json={"claim": "Test claim"})
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in res.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+
+    assert events[0][0] == "evidence" and events[0][1]["sources"] == ["http://example.com"]
+    # The verdict field is reported as soon as its token arrives, before the explanation
+    assert [e for e, _ in events[1:-1]] == ["token", "token", "field", "token", "field"]
+    assert events[3][1] == {"name": "verdict", "value": "False"}
+    assert events[-1][0] == "verdict"
+    assert events[-1][1]["parsed"] == {"verdict": "False", "explanation": "no", "sources": []}
+
+def test_factcheck_requeries_unparseable_answer(monkeypatch, retrieval):
+    answers = ["I think it is false.", '{"verdict": "false", "explanation": "no",}']
+    prompts = []
+    async def fake_llm(prompt):
+        prompts.append(prompt)
+        return answers[len(prompts) - 1]
+
+    monkeypatch.setattr("app.main.query_llm", fake_llm)
+
+    data = client.post("/factcheck", json={"claim": "Test claim"}).json()
+    assert len(prompts) == 2 and prompts[1].endswith("no other text.")
+    # The second answer only needed the cheap repair (trailing comma, lowercase verdict)
+    assert data["verdict"] == {"verdict": "False", "explanation": "no", "sources": []}
+
+def test_unparsed_answer_is_not_cached(monkeypatch, retrieval):
+    prompts = []
+    async def fake_llm(prompt):
+        prompts.append(prompt)
+        return "I think it is false."
+    async def fake_stream(prompt):
+        yield "No idea."
+
+    monkeypatch.setattr("app.main.query_llm", fake_llm)
+    monkeypatch.setattr("app.main.stream_llm", fake_stream)
+    monkeypatch.setattr("app.main.LLM_PARSE_RETRIES", 0)
+
+    first = client.post("/factcheck", json={"claim": "Test claim"}).json()
+    second = client.post("/factcheck", json={"claim": "Test claim"}).json()
+    assert first["verdict"] is None and second["cached"] is False
+    assert len(prompts) == 2
+
+    client.post("/factcheck/stream", json={"claim": "Test claim"})
+    assert retrieval.cache.stats()["size"] == 0
+
+def test_batch_endpoints_stream_ndjson(monkeypatch):
+    import asyncio
+    import json
+
+    def hit(text):
+        return SimpleNamespace(id=text, score=0.9, payload={
+            "text": text, "verdict": "False", "source_url": "http://example.com", "date": "2025-08-13"
+        })
+    encode_calls, search_calls = [], []
+    async def fake_embeddings(texts):
+        encode_calls.append(list(texts))
+        return [[float(i)] * 384 for i in range(len(texts))]
+    async def fake_search_batch(embeddings, top_k=1, query_filter=None, query_texts=None, with_vectors=False):
+        search_calls.append(len(embeddings))
+        return [[hit(f"evidence {int(e[0])}")] for e in embeddings]
+    running, peak = [0], [0]
+    async def fake_llm(prompt):
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.01)
+        running[0] -= 1
+        return '{"verdict": "False"}'
+
+    monkeypatch.setattr("app.main.get_embeddings_async", fake_embeddings)
+    monkeypatch.setattr("app.main.search_claims_batch_async", fake_search_batch)
+    monkeypatch.setattr("app.main.query_llm", fake_llm)
+    monkeypatch.setattr("app.main.factcheck_cache", FactCheckCache(max_entries=100, ttl_seconds=60))
+    monkeypatch.setattr("app.main.BATCH_LLM_CONCURRENCY", 3)
+
+    claims = [f"claim {i}" for i in range(10)]
+    res = client.post("/search/batch", json={"texts": claims})
+    assert res.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert [line["index"] for line in lines] == list(range(10))
+    assert lines[4]["results"][0]["text"] == "evidence 4"
+
+    res = client.post("/factcheck/batch", json={"claims": claims})
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == list(range(10))
+    assert all(line["claim"] == claims[line["index"]] for line in lines)
+    assert len(encode_calls) == 2 and search_calls == [10, 10]
+    assert 1 < peak[0] <= 3
+
+    assert client.post("/factcheck/batch", json={"claims": ["ok", " "]}).status_code == 422
+    assert client.post("/search/batch", json={"texts": []}).status_code == 422
+
+def test_ready_reports_warm_up(monkeypatch):
+    import time
+    from unittest.mock import MagicMock
+    from app.services import embedding_service
+
+    monkeypatch.setattr("app.main.startup", {"qdrant": False, "error": None})
+    monkeypatch.setattr("app.services.db_service.client", MagicMock())
+    monkeypatch.setattr(embedding_service, "model", None)
+    monkeypatch.setattr(embedding_service, "load_model", lambda: MagicMock())
+
+    assert client.get("/ready").status_code == 503
+    with TestClient(app) as started:
+        for _ in range(100):
+            res = started.get("/ready")
+            if res.status_code == 200:
+                break
+            time.sleep(0.01)
+        assert res.status_code == 200
+        assert res.json()["model_loaded"] is True
+
+def test_embedding_executor_survives_lifespan(monkeypatch):
+    import asyncio
+    from unittest.mock import MagicMock
+    import numpy as np
+    from app.services import embedding_service
+
+    monkeypatch.setattr("app.main.startup", {"qdrant": False, "error": None})
+    monkeypatch.setattr("app.main.EMBED_WARMUP", False)
+    monkeypatch.setattr("app.services.db_service.client", MagicMock())
+    with TestClient(app):
+        pass
+
+    monkeypatch.setattr(embedding_service, "EMBED_BATCH_WINDOW_MS", 0)
+    monkeypatch.setattr(embedding_service, "cache", None)
+    monkeypatch.setattr(embedding_service, "get_embeddings", lambda texts: np.zeros((len(texts), 384), dtype=np.float32))
+    assert len(asyncio.run(embedding_service.get_embeddings_async(["claim"]))[0]) == 384
+
+def test_search_passes_filters(retrieval):
+
+    res = client.post("/search", json={"text": "claim", "sources": ["https://www.snopes.com"], "date_to": "2025-01-31"})
+    assert res.status_code == 200
+    keys = {c.key: c for c in retrieval.filters[-1].must}
+    assert keys["source"].match.any == ["snopes.com"]
+    assert keys["date"].range.lte.isoformat().startswith("2025-01-31T23:59:59")
+
+    client.post("/search", json={"text": "claim"})
+    assert retrieval.filters[-1] is None
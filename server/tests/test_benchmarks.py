@@ -0,0 +1,29 @@
+# server/tests/test_benchmarks.py
+
+import numpy as np
+
+from benchmarks.suite import HashEmbedder, bench_search, compare
+
+
+def test_hash_embedder_is_deterministic():
+    a = HashEmbedder().encode(["Garlic cures the cold", "5G towers spread viruses"])
+    b = HashEmbedder().encode(["garlic cures the cold", "5G towers spread viruses"])
+    assert a.shape == (2, 384) and np.allclose(a, b)
+    assert np.allclose(np.linalg.norm(a, axis=1), 1.0)
+
+def test_search_benchmark_small(tmp_path):
+    result = bench_search(1000, n_queries=5, k=5, ann_probe=4, qdrant_max=1000, workdir=str(tmp_path))
+    runs = result["runs"]
+    assert set(runs) == {"local_exact", "local_ivf", "qdrant_memory"}
+    # In-memory Qdrant is exact too, so it must agree with the brute-force store
+    assert runs["qdrant_memory"]["recall_at_k"] == 1.0
+    assert 0.0 < runs["local_ivf"]["recall_at_k"] <= 1.0
+
+def test_compare_flags_regressions_in_the_right_direction():
+    baseline = {"results": {"api": {"search": {"p95_ms": 10.0, "requests_per_s": 100.0}}}}
+    current = {"results": {"api": {"search": {"p95_ms": 13.0, "requests_per_s": 70.0}}}}
+    assert {key for key, _, _ in compare(current, baseline, 0.2)} == {
+        "api.search.p95_ms", "api.search.requests_per_s"
+    }
+    faster = {"results": {"api": {"search": {"p95_ms": 5.0, "requests_per_s": 200.0}}}}
+    assert compare(faster, baseline, 0.2) == []
@@ -0,0 +1,39 @@
+from app.ingestion.crawl_state import CrawlState, Checkpoint
+
+def test_next_page_stops_at_first_gap(tmp_path):
+    state = CrawlState(str(tmp_path / "state.sqlite3"))
+    assert state.next_page("Snopes") == 1
+    state.mark_pages("Snopes", [1, 2, 3, 5])
+    assert state.next_page("Snopes") == 4
+    assert state.next_page("Snopes", first_page=5) == 6
+    assert state.next_page("AFP") == 1
+
+def test_state_survives_reopen(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    state = CrawlState(path)
+    state.mark_urls("Snopes", ["https://a", "https://b"])
+    state.close()
+
+    state = CrawlState(path)
+    assert state.visited("Snopes", ["https://a", "https://c"]) == {"https://a"}
+
+def test_failures_cleared_once_url_finishes(tmp_path):
+    state = CrawlState(str(tmp_path / "state.sqlite3"))
+    state.record_failure("Snopes", "https://a", "timeout")
+    state.record_failure("Snopes", "https://a", "timeout")
+    state.record_failure("Snopes", "https://b", "503")
+    assert state.failures("Snopes") == [("https://a", "timeout", 2), ("https://b", "503", 1)]
+    assert [url for url, _, _ in state.failures("Snopes", max_attempts=2)] == ["https://b"]
+
+    state.mark_urls("Snopes", ["https://a"])
+    assert [url for url, _, _ in state.failures("Snopes")] == ["https://b"]
+
+def test_checkpoint_commits_only_on_flush(tmp_path):
+    state = CrawlState(str(tmp_path / "state.sqlite3"))
+    checkpoint = Checkpoint(state, "Snopes")
+    checkpoint.done(1, urls=["https://a"])
+    assert state.next_page("Snopes") == 1
+
+    checkpoint.commit()
+    assert state.next_page("Snopes") == 2
+    assert state.visited("Snopes", ["https://a"]) == {"https://a"}
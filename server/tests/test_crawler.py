@@ -0,0 +1,92 @@
+import asyncio
+import time
+import httpx
+from app.ingestion.crawler import Crawler, TokenBucket, crawl_listing
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_fetch_retries_server_errors(monkeypatch):
+    monkeypatch.setattr("app.ingestion.crawler.asyncio.sleep", _no_sleep)
+    calls = []
+    def handler(request):
+        calls.append(request.url)
+        if len(calls) < 3:
+            return httpx.Response(503)
+        return httpx.Response(200, text="ok")
+
+    async def go():
+        async with Crawler(transport=httpx.MockTransport(handler), rate_per_host=1000, cache=False) as crawler:
+            return await crawler.fetch_text("https://example.com/a")
+
+    assert run(go()) == "ok"
+    assert len(calls) == 3
+
+def test_fetch_does_not_retry_client_errors():
+    calls = []
+    def handler(request):
+        calls.append(request.url)
+        return httpx.Response(404)
+
+    async def go():
+        async with Crawler(transport=httpx.MockTransport(handler), rate_per_host=1000, cache=False) as crawler:
+            return await crawler.fetch_text("https://example.com/missing")
+
+    assert run(go()) is None
+    assert len(calls) == 1
+
+def test_crawl_listing_stops_at_empty_page():
+    def handler(request):
+        page = int(request.url.params["page"])
+        return httpx.Response(200, text="" if page > 3 else f"row-{page}")
+
+    def parse_page(html):
+        return [html] if html else None
+
+    async def go():
+        pages = []
+        async with Crawler(transport=httpx.MockTransport(handler), rate_per_host=1000, cache=False) as crawler:
+            async for page, rows in crawl_listing(crawler, "https://example.com/?page={}", 10, parse_page):
+                pages.append((page, rows))
+        return pages
+
+    assert run(go()) == [(1, ["row-1"]), (2, ["row-2"]), (3, ["row-3"])]
+
+def test_crawl_listing_revalidates_against_crawl_state(tmp_path):
+    from app.ingestion.http_cache import HttpCache
+    def handler(request):
+        page = int(request.url.params["page"])
+        etag = f'"{page}"'
+        if request.headers.get("If-None-Match") == etag:
+            return httpx.Response(304)
+        return httpx.Response(200, text="" if page > 3 else f"row-{page}", headers={"ETag": etag})
+
+    def parse_page(html):
+        return [html] if html else None
+
+    async def go(is_done):
+        pages = []
+        async with Crawler(transport=httpx.MockTransport(handler), rate_per_host=1000, cache=cache) as crawler:
+            async for page, rows in crawl_listing(crawler, "https://example.com/?page={}", 10, parse_page, is_done=is_done):
+                pages.append((page, rows))
+        return pages
+
+    # Every page, including the empty one past the end, is cached
+    cache = HttpCache(str(tmp_path))
+    assert run(go(None)) == [(1, ["row-1"]), (2, ["row-2"]), (3, ["row-3"])]
+    # Only finished pages are skipped; page 3 is parsed again and the crawl still ends at page 4
+    assert run(go(lambda page: page < 3)) == [(1, []), (2, []), (3, ["row-3"])]
+
+def test_token_bucket_limits_rate():
+    async def go():
+        bucket = TokenBucket(rate=20, capacity=1)
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # First token is free, the next four wait ~50ms each
+    assert run(go()) >= 0.18
+
+async def _no_sleep(_):
+    return None
@@ -1,15 +1,115 @@
 from unittest.mock import patch
 from app.services.db_service import insert_claim, search_claim
 
-@patch("services.db_service.client")
+@patch("app.services.db_service.client")
 def test_insert_claim(mock_client):
-    insert_claim("Test claim", "True", "http://source", "2025-08-13")
+    insert_claim("Test claim", "True", "http://source", "2025-08-13", [0.1] * 384)
     assert mock_client.upsert.called, "DB upsert was not called"
 
-@patch("services.db_service.client")
+@patch("app.services.db_service.client")
 def test_search_claim(mock_client):
     mock_client.search.return_value = [
         {"score": 0.9, "payload": {"text": "Test", "verdict": "True", "source_url": "url", "date": "today"}}
     ]
-    results = search_claim("Test")
+    results = search_claim([0.1] * 384)
     assert results[0]["payload"]["text"] == "Test"
+
+@patch("app.services.db_service.client")
+def test_claim_writer_batches_upserts(mock_client):
+    from app.services.db_service import ClaimWriter
+    with ClaimWriter(batch_size=2, wait=False, parallel=1) as writer:
+        for i in range(5):
+            writer.add(f"Claim {i}", "False", f"http://source/{i}", "2025-08-13", [0.1] * 384)
+    # 2 full batches while adding, the remaining point on exit
+    sizes = [len(c.kwargs["points"]) for c in mock_client.upsert.call_args_list]
+    assert sizes == [2, 2, 1]
+    assert writer.written == 5
+
+@patch("app.services.db_service.client")
+def test_claim_writer_keeps_points_after_failed_upsert(mock_client):
+    import pytest
+    from app.services.db_service import ClaimWriter
+    writer = ClaimWriter(batch_size=10, wait=False, parallel=1)
+    writer.add("Claim", "False", "http://source/1", "2025-08-13", [0.1] * 384)
+    mock_client.upsert.side_effect = RuntimeError("qdrant down")
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    assert len(writer.buffer) == 1 and writer.written == 0
+
+    mock_client.upsert.side_effect = None
+    writer.close()
+    assert writer.buffer == [] and writer.written == 1
+
+def test_build_filter_rejects_unparseable_dates():
+    import pytest
+    from app.services.db_service import build_filter
+    with pytest.raises(ValueError, match="date_from"):
+        build_filter(date_from="sometime last spring")
+    assert build_filter(date_to="2025-01-31").must[0].range.lte is not None
+
+def test_point_id_is_deterministic():
+    from app.services.db_service import point_id
+    a = point_id("https://www.Snopes.com/fact-check/foo/?utm_source=x#top", "Claim")
+    b = point_id("https://www.snopes.com/fact-check/foo", "Other text")
+    assert a == b
+    assert point_id(None, "Same  claim") == point_id(None, "same claim")
+    assert point_id(None, "Same claim") != point_id(None, "Different claim")
+
+@patch("app.services.db_service.client")
+def test_filter_new_claims_skips_unchanged(mock_client):
+    from types import SimpleNamespace
+    from app.services.db_service import filter_new_claims, point_id, content_hash
+    unchanged = {"claim": "Old", "verdict": "False", "source_url": "http://a", "date": "2025-01-01"}
+    changed = {"claim": "Edited", "verdict": "True", "source_url": "http://b", "date": "2025-01-01"}
+    new = {"claim": "New", "verdict": "False", "source_url": "http://c", "date": None}
+    mock_client.retrieve.return_value = [
+        SimpleNamespace(id=point_id("http://a", None), payload={"content_hash": content_hash("Old", "False", "2025-01-01")}),
+        SimpleNamespace(id=point_id("http://b", None), payload={"content_hash": "stale"}),
+    ]
+    assert filter_new_claims([unchanged, changed, new]) == [changed, new]
+
+def test_collection_config_int8(monkeypatch):
+    from app.services import db_service
+    monkeypatch.setattr(db_service, "QDRANT_QUANTIZATION", "int8")
+    config = db_service.collection_config()
+    assert config["quantization_config"].scalar.type == "int8"
+    assert db_service.search_params().quantization.rescore is True
+
+    monkeypatch.setattr(db_service, "QDRANT_QUANTIZATION", "none")
+    assert "quantization_config" not in db_service.collection_config()
+    assert db_service.source_name("https://www.PolitiFact.com/factchecks/x/") == "politifact.com"
+
+def test_normalize_date_formats():
+    from app.services.db_service import normalize_date
+    assert normalize_date("2025-08-13") == "2025-08-13T00:00:00Z"
+    assert normalize_date("2025-08-13T10:30:00+05:30") == "2025-08-13T05:00:00Z"
+    assert normalize_date("Wed, 13 Aug 2025 10:00:00 GMT") == "2025-08-13T10:00:00Z"
+    assert normalize_date("August 13, 2025") == "2025-08-13T00:00:00Z"
+    assert normalize_date(None) is None and normalize_date("last week") is None
+
+def test_verdict_boilerplate_is_stripped_at_ingest():
+    from app.services import db_service
+    point = db_service.make_point("Claim", "False About this rating", "http://a", "2025-01-01", [0.0] * 384)
+    assert point.payload["verdict"] == "False"
+    assert point.payload["content_hash"] == db_service.content_hash("Claim", "False", "2025-01-01")
+
+def test_filtered_search_in_collection(monkeypatch):
+    from qdrant_client import QdrantClient
+    from app.services import db_service
+
+    qdrant = QdrantClient(":memory:")
+    monkeypatch.setattr(db_service, "client", qdrant)
+    db_service.init_collection(qdrant)
+    rows = [
+        ("Claim A", "False", "https://www.snopes.com/a", "2024-01-05"),
+        ("Claim B", "True", "https://www.politifact.com/b", "2025-03-01"),
+        ("Claim C", "False", "https://www.politifact.com/c", "March 10, 2025"),
+    ]
+    db_service.insert_claims_bulk([db_service.make_point(*row, [1.0] + [0.0] * 383) for row in rows])
+
+    query = [1.0] + [0.0] * 383
+    texts = lambda f: sorted(r.payload["text"] for r in db_service.search_claim(query, top_k=10, query_filter=f))
+    assert texts(db_service.build_filter(sources=["politifact.com"])) == ["Claim B", "Claim C"]
+    assert texts(db_service.build_filter(verdicts=["False"], date_from="2025-01-01")) == ["Claim C"]
+    assert texts(db_service.build_filter(date_to="2024-12-31")) == ["Claim A"]
+    assert texts(None) == ["Claim A", "Claim B", "Claim C"]
@@ -11,3 +11,128 @@ def test_empty_text():
     import pytest
     with pytest.raises(ValueError):
         get_embedding("")
+
+def test_batch_embedding_shape():
+    from app.services.embedding_service import get_embeddings
+    embs = get_embeddings(["Hello world", "Another claim", "Third"])
+    assert embs.shape == (3, 384)
+    assert embs.dtype == "float32"
+
+def test_coalescer_batches_concurrent_requests():
+    import numpy as np
+    from app.services.embedding_service import EmbeddingCoalescer
+
+    batch_sizes = []
+    def fake_encode(texts):
+        batch_sizes.append(len(texts))
+        return np.arange(len(texts), dtype=np.float32).reshape(-1, 1)
+
+    coalescer = EmbeddingCoalescer(fake_encode, window_ms=200, max_batch_size=4)
+    futures = [coalescer.submit(f"text {i}") for i in range(10)]
+    results = [f.result(timeout=5) for f in futures]
+
+    assert batch_sizes == [4, 4, 2]
+    assert [int(r[0]) for r in results] == [0, 1, 2, 3, 0, 1, 2, 3, 0, 1]
+    stats = coalescer.stats()
+    assert stats["batches"] == 3 and stats["items"] == 10
+    assert stats["batch_size_histogram"] == {"<=1": 0, "<=2": 1, "<=4": 2}
+
+def test_embedding_cache_is_lru_and_normalized():
+    import numpy as np
+    from app.services.embedding_service import EmbeddingCache
+
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("Vaccines cause autism", np.ones(384))
+    cache.put("Moon landing was faked", np.zeros(384))
+    assert cache.get("  vaccines   CAUSE autism ") is not None
+    cache.put("Earth is flat", np.zeros(384))  # evicts the moon landing entry
+
+    assert cache.get("Moon landing was faked") is None
+    assert cache.get("Earth is flat").dtype == np.float32
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 1, 2)
+
+def test_embedding_cache_disk_tier(tmp_path):
+    import numpy as np
+    from app.services.embedding_service import EmbeddingCache
+
+    path = str(tmp_path / "embeddings.sqlite3")
+    EmbeddingCache(max_entries=10, path=path).put("Earth is flat", np.full(384, 0.5))
+
+    restarted = EmbeddingCache(max_entries=10, path=path)
+    vector = restarted.get("earth is flat")
+    assert vector is not None and np.allclose(vector, 0.5)
+    assert restarted.stats()["disk_hits"] == 1
+
+def test_embedding_cache_disk_tier_is_bounded(tmp_path):
+    import numpy as np
+    from app.services.embedding_service import EmbeddingCache
+
+    cache = EmbeddingCache(max_entries=100, path=str(tmp_path / "embeddings.sqlite3"), max_disk_entries=10)
+    for i in range(25):
+        cache.put(f"claim {i}", np.full(384, i))
+    rows = cache._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    assert rows <= 10
+    restarted = EmbeddingCache(max_entries=10, path=str(tmp_path / "embeddings.sqlite3"), max_disk_entries=10)
+    # The oldest writes are pruned first
+    assert restarted.get("claim 0") is None
+    assert restarted.get("claim 24") is not None
+
+def test_async_cache_writes_disk_off_the_loop(monkeypatch, tmp_path):
+    import asyncio
+    import threading
+    import numpy as np
+    from app.services import embedding_service
+
+    cache = embedding_service.EmbeddingCache(max_entries=10, path=str(tmp_path / "embeddings.sqlite3"))
+    threads = []
+    original = cache.persist
+    def recording(items):
+        threads.append(threading.current_thread())
+        original(items)
+    monkeypatch.setattr(cache, "persist", recording)
+    monkeypatch.setattr(embedding_service, "cache", cache)
+    monkeypatch.setattr(embedding_service, "EMBED_BATCH_WINDOW_MS", 0)
+    monkeypatch.setattr(embedding_service, "get_embeddings", lambda texts: np.zeros((len(texts), 384), dtype=np.float32))
+
+    asyncio.run(embedding_service.get_embeddings_async(["a", "b"]))
+    embedding_service.executor.submit(lambda: None).result()
+    assert threads and threads[0] is not threading.main_thread()
+    assert cache._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 2
+
+def test_embedding_cache_separates_backends(tmp_path):
+    import numpy as np
+    from app.services.embedding_service import EmbeddingCache, CACHE_NAMESPACE
+
+    path = str(tmp_path / "embeddings.sqlite3")
+    EmbeddingCache(max_entries=10, path=path).put("Earth is flat", np.full(384, 0.5))
+    # An int8 ONNX model must not be served vectors cached by the torch backend
+    onnx = EmbeddingCache(max_entries=10, path=path, namespace="all-MiniLM-L6-v2:onnx:model_qint8_avx512.onnx")
+    assert CACHE_NAMESPACE != onnx.namespace
+    assert onnx.get("Earth is flat") is None
+
+def test_get_embedding_uses_cache(monkeypatch):
+    from app.services import embedding_service
+
+    calls = []
+    original = embedding_service.get_embeddings
+    def counting(texts):
+        calls.append(list(texts))
+        return original(texts)
+    monkeypatch.setattr(embedding_service, "EMBED_BATCH_WINDOW_MS", 0)
+    monkeypatch.setattr(embedding_service, "get_embeddings", counting)
+    monkeypatch.setattr(embedding_service, "cache", embedding_service.EmbeddingCache(max_entries=10))
+
+    first = embedding_service.get_embedding("Is the Earth flat?")
+    second = embedding_service.get_embedding("is the earth  flat?")
+    assert first == second
+    assert len(calls) == 1
+
+def test_import_does_not_load_torch():
+    import subprocess
+    import sys
+    code = (
+        "import sys; import app.services.embedding_service, app.services.db_service, app.ingestion.ingest_all; "
+        "assert 'torch' not in sys.modules and 'sentence_transformers' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
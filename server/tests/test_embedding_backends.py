@@ -0,0 +1,52 @@
+# server/tests/test_embedding_backends.py
+
+import numpy as np
+import pytest
+
+from app.services.embedding_service import load_model
+
+# Needs the real model weights; skipped when the backend's runtime is not installed
+SENTENCES = [
+    "The COVID-19 vaccine contains a microchip.",
+    "NASA confirmed the Earth will go dark for six days in November.",
+    "A photo shows a shark swimming on a flooded highway after the hurricane.",
+    "Drinking hot water every 15 minutes prevents infection.",
+    "The prime minister announced free electricity for all households.",
+]
+MIN_COSINE = {"onnx": 0.99, "openvino": 0.99, "int8": 0.95}
+
+
+def _cosine(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+@pytest.fixture(scope="module")
+def reference():
+    pytest.importorskip("torch")
+    try:
+        model = load_model("torch")
+    except OSError as e:
+        pytest.skip(f"model weights unavailable: {e}")
+    return model.encode(SENTENCES, convert_to_numpy=True)
+
+
+@pytest.mark.parametrize("backend, requires", [
+    ("onnx", "onnxruntime"),
+    ("openvino", "openvino"),
+    ("int8", "torch"),
+])
+def test_backend_matches_torch(reference, backend, requires):
+    pytest.importorskip(requires)
+    if backend != "int8":
+        pytest.importorskip("optimum")
+
+    embeddings = load_model(backend).encode(SENTENCES, convert_to_numpy=True)
+    assert embeddings.shape == reference.shape
+    assert _cosine(embeddings, reference).min() >= MIN_COSINE[backend]
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        load_model("tpu")
@@ -0,0 +1,53 @@
+# server/tests/test_embedding_server.py
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app.services.embedding_server import EmbeddingServer, EmbeddingClient
+
+
+@pytest.fixture
+def server(tmp_path):
+    batch_sizes = []
+    def fake_encode(texts):
+        batch_sizes.append(len(texts))
+        if "boom" in texts:
+            raise RuntimeError("model failed")
+        return np.stack([np.full(384, len(t), dtype=np.float32) for t in texts])
+
+    path = str(tmp_path / "embed.sock")
+    ready = threading.Event()
+    srv = EmbeddingServer(path, encode_fn=fake_encode)
+    threading.Thread(target=lambda: asyncio.run(srv.serve(ready)), daemon=True).start()
+    assert ready.wait(5)
+    return path, batch_sizes
+
+
+def test_round_trip(server):
+    path, _ = server
+    vectors = EmbeddingClient(path).embed(["a", "abc"])
+    assert vectors.shape == (2, 384) and vectors.dtype == np.float32
+    assert vectors[0, 0] == 1 and vectors[1, 0] == 3
+
+
+def test_each_request_is_encoded_as_one_batch(server):
+    path, batch_sizes = server
+    clients = [EmbeddingClient(path) for _ in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda c: c.embed(["x" * 5, "y"]), clients))
+    assert all(r[0, 0] == 5 and r[1, 0] == 1 for r in results)
+    # Clients coalesce before sending, so the server does not re-batch across requests
+    assert batch_sizes == [2] * 8
+
+
+def test_server_errors_are_raised(server):
+    path, _ = server
+    client = EmbeddingClient(path)
+    with pytest.raises(RuntimeError, match="model failed"):
+        client.embed(["boom"])
+    # The connection is still usable afterwards
+    assert client.embed(["ok"]).shape == (1, 384)
@@ -0,0 +1,49 @@
+import numpy as np
+from app.services.factcheck_cache import FactCheckCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_exact_hit_requires_same_evidence():
+    cache = FactCheckCache(max_entries=10, ttl_seconds=60)
+    cache.put("The Earth is flat", ["b", "a"], None, {"llm_response": "False"})
+
+    assert cache.get("the earth  is FLAT", ["a", "b"]) == {"llm_response": "False"}
+    # New evidence means a new key
+    assert cache.get("The Earth is flat", ["a", "c"]) is None
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = FactCheckCache(max_entries=10, ttl_seconds=60, clock=clock)
+    cache.put("claim", ["a"], None, {"llm_response": "True"})
+    clock.now = 59
+    assert cache.get("claim", ["a"]) is not None
+    clock.now = 61
+    assert cache.get("claim", ["a"]) is None
+    assert cache.stats()["size"] == 0
+
+def test_lru_eviction():
+    cache = FactCheckCache(max_entries=2, ttl_seconds=60)
+    cache.put("one", ["a"], None, 1)
+    cache.put("two", ["a"], None, 2)
+    cache.get("one", ["a"])
+    cache.put("three", ["a"], None, 3)
+    assert cache.get("two", ["a"]) is None
+    assert cache.get("one", ["a"]) == 1
+
+def test_semantic_hit_above_threshold():
+    cache = FactCheckCache(max_entries=10, ttl_seconds=60, similarity_threshold=0.95)
+    base = np.ones(384, dtype=np.float32)
+    cache.put("5G towers spread covid", ["a"], base, {"llm_response": "False"})
+
+    near = base + np.random.default_rng(0).normal(0, 0.05, 384)
+    far = np.random.default_rng(1).normal(0, 1, 384)
+    assert cache.get("Do 5G towers spread covid?", ["a"], near) == {"llm_response": "False"}
+    assert cache.get("Do 5G towers spread covid?", ["b"], near) is None
+    assert cache.get("Something else entirely", ["a"], far) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["semantic_hits"], stats["misses"]) == (0, 1, 2)
@@ -0,0 +1,69 @@
+import asyncio
+import httpx
+from app.ingestion.http_cache import HttpCache
+from app.ingestion.crawler import Crawler, NOT_MODIFIED
+
+def test_store_and_lookup(tmp_path):
+    cache = HttpCache(str(tmp_path), max_bytes=10_000)
+    cache.store("https://example.com/a", b"<html>a</html>", etag='"v1"', last_modified=None)
+    assert cache.lookup("https://example.com/a")["etag"] == '"v1"'
+    assert cache.body("https://example.com/a") == b"<html>a</html>"
+    assert cache.conditional_headers("https://example.com/a") == {"If-None-Match": '"v1"'}
+    # Nothing to revalidate without validators
+    cache.store("https://example.com/b", b"b")
+    assert cache.lookup("https://example.com/b") is None
+
+def test_eviction_drops_oldest(tmp_path):
+    import os
+    cache = HttpCache(str(tmp_path), max_bytes=2_500)
+    for i in range(3):
+        url = f"https://example.com/{i}"
+        cache.store(url, b"x" * 1000, etag=f'"{i}"')
+        for path in cache._paths(url):
+            os.utime(path, (1_000_000 + i, 1_000_000 + i))
+    cache.evict()
+    assert cache.lookup("https://example.com/0") is None
+    assert cache.lookup("https://example.com/2") is not None
+
+def test_overwrite_keeps_size_accurate(tmp_path):
+    import os
+    cache = HttpCache(str(tmp_path), max_bytes=10_000)
+    for i in range(5):
+        cache.store("https://example.com/a", b"x" * 1000, etag=f'"{i}"')
+    assert cache._size == sum(os.path.getsize(path) for path in cache._paths("https://example.com/a"))
+
+def test_crawler_revalidates_with_etag(tmp_path):
+    seen = []
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text="<html>page</html>", headers={"ETag": '"v1"'})
+
+    async def go():
+        cache = HttpCache(str(tmp_path))
+        async with Crawler(transport=httpx.MockTransport(handler), rate_per_host=1000, cache=cache) as crawler:
+            first = await crawler.fetch_text("https://example.com/list")
+            second = await crawler.fetch_text("https://example.com/list")
+            third = await crawler.fetch_text("https://example.com/list", skip_unchanged=False)
+        return first, second, third
+
+    first, second, third = asyncio.run(go())
+    assert first == "<html>page</html>"
+    assert second is NOT_MODIFIED
+    assert third == "<html>page</html>"
+    assert seen == [None, '"v1"', '"v1"']
+
+def test_unsaved_fetches_are_cached_on_save(tmp_path):
+    def handler(request):
+        return httpx.Response(200, text="<html>page</html>", headers={"ETag": '"v1"'})
+
+    async def go():
+        async with Crawler(transport=httpx.MockTransport(handler), rate_per_host=1000, cache=cache) as crawler:
+            await crawler.fetch_text("https://example.com/list", save=False)
+            assert cache.lookup("https://example.com/list") is None
+            crawler.save_cache(["https://example.com/list"])
+
+    cache = HttpCache(str(tmp_path))
+    asyncio.run(go())
+    assert cache.lookup("https://example.com/list")["etag"] == '"v1"'
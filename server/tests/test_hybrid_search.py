@@ -0,0 +1,39 @@
+# server/tests/test_hybrid_search.py
+
+from qdrant_client import QdrantClient
+
+from app.services import db_service, sparse_service
+
+
+def test_tokens_keep_numbers_and_names():
+    assert sparse_service.tokenize("Biden signed the $1,200 check in 2021") == ["biden", "signed", "1,200", "check", "2021"]
+    vector = sparse_service.document_vector("vaccine vaccine microchip")
+    assert len(vector.indices) == 2 and len(set(vector.indices)) == 2
+    # Repeated terms saturate rather than grow linearly
+    weights = dict(zip(vector.indices, vector.values))
+    assert weights[sparse_service._index("vaccine")] < 2 * weights[sparse_service._index("microchip")]
+
+
+def test_hybrid_finds_exact_entity(monkeypatch):
+    monkeypatch.setattr(db_service, "HYBRID_SEARCH", True)
+    qdrant = QdrantClient(":memory:")
+    monkeypatch.setattr(db_service, "client", qdrant)
+    db_service.init_collection(qdrant)
+
+    # Dense vectors point away from the query; only the lexical channel can find "Zelensky"
+    rows = [
+        ("Photo shows a protest in Paris", [1.0, 0.0]),
+        ("Video shows a parade in Rome", [0.9, 0.1]),
+        ("Zelensky bought a yacht for 75 million", [0.0, 1.0]),
+    ]
+    points = [
+        db_service.make_point(text, "False", f"https://example.com/{i}", "2025-01-01", vector + [0.0] * 382)
+        for i, (text, vector) in enumerate(rows)
+    ]
+    db_service.insert_claims_bulk(points)
+
+    query = [1.0, 0.0] + [0.0] * 382
+    dense = db_service.search_claim(query, top_k=2)
+    hybrid = db_service.search_claim(query, top_k=2, query_text="Did Zelensky buy a yacht?")
+    assert "Zelensky" not in " ".join(r.payload["text"] for r in dense)
+    assert "Zelensky" in " ".join(r.payload["text"] for r in hybrid)
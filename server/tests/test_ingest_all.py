@@ -0,0 +1,242 @@
+import asyncio
+import httpx
+import numpy as np
+from app.ingestion import common, ingest_all, scrape_snope, scrape_afp
+from app.ingestion.crawler import Crawler
+from app.ingestion.crawl_state import CrawlState
+
+SNOPES_PAGE = "".join(
+    f'<article class="media-wrapper"><h2 class="title"><a href="https://snopes.test/{{page}}/{i}">Snopes claim {{page}}-{i}</a></h2></article>'
+    for i in range(3)
+)
+AFP_PAGE = '<div class="teaser__body"><h3 class="teaser__title"><a href="/{page}">AFP claim {page}</a></h3></div>'
+
+requested = []
+
+def handler(request):
+    requested.append(str(request.url))
+    host = request.url.host
+    page = int(request.url.params.get("page") or request.url.path.strip("/").split("/")[-1])
+    # Listing pages never change, so a cached page always revalidates
+    etag = f'"{host}-{page}"'
+    if request.headers.get("If-None-Match") == etag:
+        return httpx.Response(304)
+    if host == "snopes.test":
+        text = SNOPES_PAGE.format(page=page) if page <= 2 else "<html></html>"
+    else:
+        text = AFP_PAGE.format(page=page) if page <= 4 else "<html></html>"
+    return httpx.Response(200, text=text, headers={"ETag": etag})
+
+class FakeWriter:
+    def __init__(self):
+        self.rows = []
+        self.closed = False
+    def add(self, text, verdict, source_url, date, embedding):
+        self.rows.append(source_url)
+    def flush(self):
+        pass
+    def close(self):
+        self.closed = True
+
+class FlushingWriter(FakeWriter):
+    """Calls on_flush like ClaimWriter does once the buffer is written."""
+    def __init__(self, on_flush=None):
+        super().__init__()
+        self.on_flush = on_flush
+    def flush(self):
+        if self.on_flush:
+            self.on_flush()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        self.flush()
+        self.close()
+
+SOURCES = [
+    ("Snopes", "https://snopes.test/page/{}/", scrape_snope.parse_page),
+    ("AFP", "https://afp.test/facts?page={}", scrape_afp.parse_page),
+]
+
+def _patch_pipeline(monkeypatch, tmp_path, writer, cache=False):
+    monkeypatch.setattr(ingest_all, "Crawler", lambda: Crawler(transport=httpx.MockTransport(handler), rate_per_host=1000, cache=cache))
+    monkeypatch.setattr(ingest_all, "ClaimWriter", lambda: writer)
+    monkeypatch.setattr(ingest_all, "CrawlState", lambda: CrawlState(str(tmp_path / "state.sqlite3")))
+    monkeypatch.setattr(ingest_all, "embed_claims", lambda rows: (rows, np.zeros((len(rows), 384), dtype=np.float32)))
+
+def test_pipeline_runs_all_sources(monkeypatch, tmp_path):
+    writer = FakeWriter()
+    _patch_pipeline(monkeypatch, tmp_path, writer)
+    summary = asyncio.run(ingest_all.run_pipeline(max_pages=10, sources=SOURCES, parse_workers=1))
+
+    assert len(writer.rows) == 2 * 3 + 4
+    assert writer.closed
+    assert summary["stages"]["embed"]["items"] == 10
+    assert summary["stages"]["upsert"]["items"] == 10
+    assert set(summary["queues"]) == {"html", "rows", "write"}
+
+def test_pipeline_resume_skips_finished_pages(monkeypatch, tmp_path):
+    _patch_pipeline(monkeypatch, tmp_path, FakeWriter())
+    asyncio.run(ingest_all.run_pipeline(max_pages=10, sources=SOURCES, parse_workers=1))
+
+    state = CrawlState(str(tmp_path / "state.sqlite3"))
+    assert state.next_page("Snopes") == 3
+    assert state.next_page("AFP") == 5
+
+    requested.clear()
+    writer = FakeWriter()
+    _patch_pipeline(monkeypatch, tmp_path, writer)
+    asyncio.run(ingest_all.run_pipeline(max_pages=10, sources=SOURCES, parse_workers=1, resume=True))
+    assert writer.rows == []
+    assert "https://snopes.test/page/1/" not in requested
+    assert "https://afp.test/facts?page=1" not in requested
+
+def test_pipeline_resume_with_http_cache(monkeypatch, tmp_path):
+    import os
+    from app.ingestion.http_cache import HttpCache
+    cache = HttpCache(str(tmp_path / "cache"))
+    _patch_pipeline(monkeypatch, tmp_path, FakeWriter(), cache=cache)
+    asyncio.run(ingest_all.run_pipeline(max_pages=10, sources=SOURCES, parse_workers=1))
+
+    # Finished pages come back 304 and are skipped
+    writer = FakeWriter()
+    _patch_pipeline(monkeypatch, tmp_path, writer, cache=cache)
+    asyncio.run(ingest_all.run_pipeline(max_pages=10, sources=SOURCES, parse_workers=1))
+    assert writer.rows == []
+
+    # Without the crawl state a 304 proves nothing, so the pages are ingested again
+    os.remove(tmp_path / "state.sqlite3")
+    writer = FakeWriter()
+    _patch_pipeline(monkeypatch, tmp_path, writer, cache=cache)
+    asyncio.run(ingest_all.run_pipeline(max_pages=10, sources=SOURCES, parse_workers=1, resume=True))
+    assert len(writer.rows) == 2 * 3 + 4
+    state = CrawlState(str(tmp_path / "state.sqlite3"))
+    assert state.next_page("Snopes") == 3
+    assert state.next_page("AFP") == 5
+
+def _patch_crawl(monkeypatch, tmp_path, writers, cache=False):
+    monkeypatch.setattr(common, "Crawler", lambda: Crawler(transport=httpx.MockTransport(handler), rate_per_host=1000, cache=cache))
+    def make_writer(on_flush=None, on_error=None):
+        writers.append(FlushingWriter(on_flush))
+        return writers[-1]
+    monkeypatch.setattr(common, "ClaimWriter", make_writer)
+    monkeypatch.setattr(common, "CrawlState", lambda: CrawlState(str(tmp_path / "state.sqlite3")))
+    monkeypatch.setattr(common, "embed_claims", lambda rows: (rows, np.zeros((len(rows), 384), dtype=np.float32)))
+
+def test_crawl_source_checkpoints_and_resumes(monkeypatch, tmp_path):
+    writers = []
+    _patch_crawl(monkeypatch, tmp_path, writers)
+    asyncio.run(scrape_afp.crawl_afp(max_pages=10))
+    assert len(writers[0].rows) == 4
+    assert CrawlState(str(tmp_path / "state.sqlite3")).next_page(scrape_afp.SOURCE) == 5
+
+    requested.clear()
+    asyncio.run(scrape_afp.crawl_afp(max_pages=10, resume=True))
+    assert writers[1].rows == []
+    assert requested[0] == scrape_afp.BASE_URL.format(5)
+    assert scrape_afp.BASE_URL.format(4) not in requested
+
+def test_embed_stage_skips_pages_with_failed_batches(monkeypatch):
+    calls = []
+    def flaky_embed(rows):
+        calls.append(rows)
+        if len(calls) == 1:
+            raise RuntimeError("encoder down")
+        return rows, np.zeros((len(rows), 384), dtype=np.float32)
+    monkeypatch.setattr(ingest_all, "embed_claims", flaky_embed)
+    monkeypatch.setattr(ingest_all, "INGEST_EMBED_BATCH", 2)
+
+    async def run():
+        row_queue, write_queue = asyncio.Queue(), asyncio.Queue()
+        for item in (("S", 1, ["a", "b", "c"]), ("S", 2, ["d"]), ingest_all.DONE):
+            row_queue.put_nowait(item)
+        await ingest_all._embed_stage(row_queue, write_queue, ingest_all.StageStats("embed"))
+        items = []
+        while (item := write_queue.get_nowait()) is not ingest_all.DONE:
+            items.append(item)
+        return items
+
+    items = asyncio.run(run())
+    # Page 1 lost rows a and b, so only page 2 may be checkpointed
+    assert [row for rows, _, _, _ in items for row in rows] == ["c", "d"]
+    assert [key for _, _, _, completed in items for key in completed] == [("S", 2)]
+
+def test_write_stage_skips_pages_with_failed_writes(tmp_path):
+    from types import SimpleNamespace
+
+    class FailingOnceWriter(FakeWriter):
+        def __init__(self):
+            super().__init__()
+            self.flushes = 0
+        def flush(self):
+            self.flushes += 1
+            if self.flushes == 1:
+                raise RuntimeError("qdrant down")
+
+    state = CrawlState(str(tmp_path / "state.sqlite3"))
+    crawler = SimpleNamespace(save_cache=list)
+    emb = np.zeros((1, 384), dtype=np.float32)
+    def row(name):
+        return [{"claim": name, "verdict": "False", "source_url": f"http://s/{name}", "date": None}]
+    items = [
+        (row("a"), emb, {("S", 1)}, []),
+        (row("b"), emb, {("S", 1), ("S", 2)}, [("S", 2)]),  # this flush fails
+        (row("c"), emb, {("S", 1)}, [("S", 1)]),
+        (row("d"), emb, {("S", 3)}, [("S", 3)]),
+    ]
+
+    async def run():
+        write_queue = asyncio.Queue()
+        for item in items + [ingest_all.DONE]:
+            write_queue.put_nowait(item)
+        await ingest_all._write_stage(
+            write_queue, FailingOnceWriter(), state, ingest_all.StageStats("upsert"), crawler, {"S": "http://s/{}"}
+        )
+    asyncio.run(run())
+
+    # Page 1 lost row a in the failed flush, even though its last row was written later
+    assert not state.page_done("S", 1)
+    assert not state.page_done("S", 2)
+    assert state.page_done("S", 3)
+
+def test_crawl_source_refetches_pages_after_failed_store(monkeypatch, tmp_path):
+    import pytest
+    from app.ingestion.http_cache import HttpCache
+    writers = []
+    _patch_crawl(monkeypatch, tmp_path, writers, cache=HttpCache(str(tmp_path / "cache")))
+    def broken_embed(rows):
+        raise RuntimeError("encoder down")
+    monkeypatch.setattr(common, "embed_claims", broken_embed)
+    with pytest.raises(RuntimeError):
+        asyncio.run(scrape_afp.crawl_afp(max_pages=10))
+
+    # Nothing was stored, so nothing may be cached as unchanged either
+    _patch_crawl(monkeypatch, tmp_path, writers, cache=HttpCache(str(tmp_path / "cache")))
+    asyncio.run(scrape_afp.crawl_afp(max_pages=10))
+    assert len(writers[-1].rows) == 4
+
+def test_crawl_source_failed_upsert_checkpoints_nothing(monkeypatch, tmp_path):
+    import atexit
+    import pytest
+    from app.ingestion.http_cache import HttpCache
+    from app.services import db_service
+    cache = HttpCache(str(tmp_path / "cache"))
+    _patch_crawl(monkeypatch, tmp_path, [], cache=cache)
+    writers = []
+    def real_writer(**kwargs):
+        writers.append(db_service.ClaimWriter(**kwargs))
+        return writers[-1]
+    monkeypatch.setattr(common, "ClaimWriter", real_writer)
+    def broken_upsert(points, **kwargs):
+        raise RuntimeError("qdrant down")
+    monkeypatch.setattr(db_service, "insert_claims_bulk", broken_upsert)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(scrape_afp.crawl_afp(max_pages=10))
+    # close() retried the upsert on exit and failed again: the points are not stored
+    assert len(writers[0].buffer) == 4
+    atexit.unregister(writers[0].close)
+
+    state = CrawlState(str(tmp_path / "state.sqlite3"))
+    assert not state.page_done(scrape_afp.SOURCE, 1)
+    assert state.next_page(scrape_afp.SOURCE) == 1
+    assert cache.lookup(scrape_afp.BASE_URL.format(1)) is None
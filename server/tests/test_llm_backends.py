@@ -0,0 +1,173 @@
+# server/tests/test_llm_backends.py
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.services import huggingface_service
+from app.services.llm_backends import (
+    HuggingFaceBackend, MockBackend, ResilientBackend, CircuitBreaker,
+    LLMTimeout, LLMOverloaded, CircuitOpenError,
+)
+
+PROMPT = "Evidence:\n- Claim (Source: http://example.com/a, Date: 2025-08-13, verdict: Pants on Fire)"
+
+
+class ScriptedBackend:
+    """Each call takes the next (delay, result) step; an Exception result is raised."""
+
+    def __init__(self, *steps):
+        self.steps = list(steps)
+        self.calls = 0
+
+    async def complete(self, prompt):
+        delay, result = self.steps[min(self.calls, len(self.steps) - 1)]
+        self.calls += 1
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def _resilient(backend, **kwargs):
+    options = dict(max_concurrency=4, queue_timeout=1, timeout=1, hedge_after=0, max_attempts=2,
+                   breaker=CircuitBreaker(3, 30))
+    options.update(kwargs)
+    return ResilientBackend(backend, **options)
+
+
+def test_mock_backend_is_deterministic():
+    answer = json.loads(asyncio.run(MockBackend().complete(PROMPT)))
+    assert answer["verdict"] == "False" and answer["sources"] == ["http://example.com/a"]
+
+    async def collect():
+        return "".join([t async for t in MockBackend().stream(PROMPT)])
+    assert asyncio.run(collect()) == MockBackend.answer(PROMPT)
+
+
+def test_hedge_beats_slow_attempt():
+    backend = _resilient(ScriptedBackend((0.5, "slow"), (0.0, "fast")), hedge_after=0.05)
+    started = time.monotonic()
+    assert asyncio.run(backend.complete("p")) == "fast"
+    assert time.monotonic() - started < 0.3
+    assert backend.counts["hedges"] == 1
+
+
+def test_retry_after_error_and_timeout():
+    backend = _resilient(ScriptedBackend((0.0, RuntimeError("503")), (0.0, "ok")))
+    assert asyncio.run(backend.complete("p")) == "ok"
+    assert backend.counts["retries"] == 1
+
+    slow = _resilient(ScriptedBackend((5.0, "late")), timeout=0.05)
+    with pytest.raises(LLMTimeout):
+        asyncio.run(slow.complete("p"))
+    assert slow.counts["timeouts"] == 1
+
+
+def test_breaker_opens_and_recovers():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    scripted = ScriptedBackend((0.0, RuntimeError("down")))
+    backend = _resilient(scripted, max_attempts=1, breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            asyncio.run(backend.complete("p"))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(backend.complete("p"))
+    assert scripted.calls == 2 and breaker.state == "open"
+
+    now[0] = 11.0
+    scripted.steps = [(0.0, "ok")]
+    assert breaker.state == "half_open"
+    assert asyncio.run(backend.complete("p")) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_cancelled_trial_releases_breaker():
+    now = [11.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    breaker.opened_at = 0.0
+    backend = _resilient(ScriptedBackend((5.0, "late")), breaker=breaker)
+
+    async def cancel_trial():
+        task = asyncio.create_task(backend.complete("p"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(cancel_trial())
+    # The trial never finished, so the next caller gets to run one
+    assert breaker.state == "half_open"
+    assert breaker.allow() == (True, True)
+
+    async def abandon_stream():
+        stream = _resilient(MockBackend(latency=1.0), breaker=breaker).stream(PROMPT)
+        await stream.__anext__()
+        await stream.aclose()
+    breaker.release_trial()
+    asyncio.run(abandon_stream())
+    assert breaker.allow() == (True, True)
+
+
+def test_cancelled_non_trial_call_keeps_the_trial():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    backend = _resilient(ScriptedBackend((5.0, "late")), breaker=breaker)
+
+    async def run():
+        admitted_closed = asyncio.create_task(backend.complete("a"))
+        await asyncio.sleep(0.01)
+        breaker.record_failure()
+        now[0] = 11.0
+        trial = asyncio.create_task(backend.complete("b"))
+        await asyncio.sleep(0.01)
+
+        admitted_closed.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await admitted_closed
+        # The half-open trial still belongs to the second call
+        assert breaker.allow() == (False, False)
+
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+    asyncio.run(run())
+    assert breaker.allow() == (True, True)
+
+
+def test_concurrency_cap_fails_fast():
+    backend = _resilient(ScriptedBackend((0.3, "ok")), max_concurrency=1, queue_timeout=0.05)
+
+    async def both():
+        return await asyncio.gather(backend.complete("a"), backend.complete("b"), return_exceptions=True)
+    results = asyncio.run(both())
+    assert "ok" in results and any(isinstance(r, LLMOverloaded) for r in results)
+
+
+def test_query_llm_reports_errors(monkeypatch):
+    monkeypatch.setattr(huggingface_service, "backend", _resilient(ScriptedBackend((0.0, RuntimeError("x"))), max_attempts=1))
+    assert asyncio.run(huggingface_service.query_llm("p")) == huggingface_service.LLM_ERROR_RESPONSE
+
+def test_json_mode_falls_back_when_rejected():
+    from types import SimpleNamespace
+
+    calls = []
+    class Rejected(Exception):
+        response = SimpleNamespace(status_code=422)
+    async def fake_chat_completion(**kwargs):
+        calls.append("response_format" in kwargs)
+        if "response_format" in kwargs:
+            raise Rejected("response_format not supported")
+        message = SimpleNamespace(content='{"verdict": "True"}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    backend = HuggingFaceBackend("some/model", token=None, json_schema={"type": "object"})
+    backend.client = SimpleNamespace(chat_completion=fake_chat_completion)
+    assert asyncio.run(backend.complete(PROMPT)) == '{"verdict": "True"}'
+    assert asyncio.run(backend.complete(PROMPT)) == '{"verdict": "True"}'
+    # Rejected once, then plain decoding without asking again
+    assert calls == [True, False, False]
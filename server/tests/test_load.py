@@ -0,0 +1,60 @@
+# server/tests/test_load.py
+
+import asyncio
+import time
+
+import httpx
+import numpy as np
+from types import SimpleNamespace
+
+from app.main import app
+from app.services import embedding_service
+from app.services.embedding_service import EmbeddingCoalescer
+from app.services.factcheck_cache import FactCheckCache
+
+ENCODE_SECONDS = 0.05
+SEARCH_SECONDS = 0.02
+LLM_SECONDS = 0.1
+REQUESTS = 20
+
+
+def test_concurrent_factchecks_overlap(monkeypatch):
+    """Slow model, Qdrant and LLM calls must not serialize requests on the event loop."""
+    def slow_encode(texts):
+        time.sleep(ENCODE_SECONDS)
+        return np.zeros((len(texts), 384), dtype=np.float32)
+
+    result = SimpleNamespace(id="p1", score=0.9, payload={
+        "text": "Evidence", "verdict": "False", "source_url": "http://example.com", "date": "2025-08-13"
+    })
+    async def slow_search(embedding, top_k=1, query_filter=None, query_text=None, with_vectors=False):
+        await asyncio.sleep(SEARCH_SECONDS)
+        return [result]
+    async def slow_llm(prompt):
+        await asyncio.sleep(LLM_SECONDS)
+        return '{"verdict": "False"}'
+
+    monkeypatch.setattr(embedding_service, "coalescer", EmbeddingCoalescer(slow_encode, 5, 32))
+    monkeypatch.setattr(embedding_service, "cache", None)
+    monkeypatch.setattr("app.main.search_claim_async", slow_search)
+    monkeypatch.setattr("app.main.query_llm", slow_llm)
+    monkeypatch.setattr("app.main.factcheck_cache", FactCheckCache(max_entries=100, ttl_seconds=60))
+
+    async def one(client, i):
+        started = time.monotonic()
+        resp = await client.post("/factcheck", json={"claim": f"claim number {i}"})
+        assert resp.status_code == 200
+        return time.monotonic() - started
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            started = time.monotonic()
+            latencies = await asyncio.gather(*(one(client, i) for i in range(REQUESTS)))
+            return time.monotonic() - started, sorted(latencies)
+
+    total, latencies = asyncio.run(run())
+    serial = REQUESTS * (ENCODE_SECONDS + SEARCH_SECONDS + LLM_SECONDS)
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    assert total < serial / 4
+    assert p99 < serial / 4
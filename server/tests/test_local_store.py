@@ -0,0 +1,92 @@
+# server/tests/test_local_store.py
+
+import asyncio
+
+import numpy as np
+from qdrant_client import models
+
+from app.services import db_service
+from app.services.local_store import LocalStore, AsyncLocalStore
+
+
+def _points(vectors, payloads=None):
+    return [
+        models.PointStruct(id=f"p{i}", vector=v.tolist(), payload=(payloads or [{}] * len(vectors))[i])
+        for i, v in enumerate(vectors)
+    ]
+
+
+def test_exact_search_matches_numpy(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((200, 384)).astype(np.float32)
+    store = LocalStore(str(tmp_path))
+    store.upload_points("c", _points(vectors), batch_size=64)
+
+    query = rng.standard_normal(384).astype(np.float32)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ (query / np.linalg.norm(query))))[:5]
+    results = store.search("c", query.tolist(), limit=5)
+    assert [r.id for r in results] == [f"p{i}" for i in expected]
+    assert results[0].score >= results[-1].score
+
+
+def test_upsert_overwrites_and_persists(tmp_path):
+    store = LocalStore(str(tmp_path))
+    store.upsert("c", [models.PointStruct(id="a", vector=[1.0] + [0.0] * 383, payload={"text": "old"})])
+    store.upsert("c", [models.PointStruct(id="a", vector=[0.0, 1.0] + [0.0] * 382, payload={"text": "new"})])
+    store.close()
+
+    reopened = LocalStore(str(tmp_path), read_only=True)
+    assert reopened.count().count == 1
+    hit = reopened.search("c", [0.0, 1.0] + [0.0] * 382, limit=1)[0]
+    assert hit.payload == {"text": "new"} and abs(hit.score - 1.0) < 1e-5
+    assert reopened.retrieve("c", ["a", "missing"], with_payload=["text"])[0].payload == {"text": "new"}
+
+
+def test_filters(tmp_path):
+    store = LocalStore(str(tmp_path))
+    payloads = [
+        {"source": "snopes.com", "verdict": "False", "date": "2024-01-05T00:00:00Z"},
+        {"source": "politifact.com", "verdict": "True", "date": "2025-03-01T00:00:00Z"},
+        {"source": "politifact.com", "verdict": "False", "date": None},
+    ]
+    store.upsert("c", _points(np.ones((3, 384), dtype=np.float32), payloads))
+    query = [1.0] * 384
+    ids = lambda f: sorted(r.id for r in store.search("c", query, query_filter=f, limit=10))
+
+    assert ids(db_service.build_filter(sources=["politifact.com"])) == ["p1", "p2"]
+    assert ids(db_service.build_filter(verdicts=["False"], date_from="2024-01-01")) == ["p0"]
+    assert ids(db_service.build_filter(date_to="2024-12-31")) == ["p0"]
+
+
+def test_ann_recall(tmp_path):
+    rng = np.random.default_rng(1)
+    centers = rng.standard_normal((16, 384)).astype(np.float32)
+    vectors = centers[rng.integers(0, 16, 2000)] + 0.3 * rng.standard_normal((2000, 384)).astype(np.float32)
+    exact = LocalStore(str(tmp_path / "exact"))
+    ann = LocalStore(str(tmp_path / "ann"), ann_lists=16, ann_probe=3)
+    exact.upsert("c", _points(vectors))
+    ann.upsert("c", _points(vectors))
+
+    recalls = []
+    for query in vectors[:50] + 0.1 * rng.standard_normal((50, 384)).astype(np.float32):
+        truth = {r.id for r in exact.search("c", query.tolist(), limit=10)}
+        found = {r.id for r in ann.search("c", query.tolist(), limit=10)}
+        recalls.append(len(truth & found) / 10)
+    assert np.mean(recalls) > 0.9
+
+
+def test_db_service_on_local_store(tmp_path, monkeypatch):
+    store = LocalStore(str(tmp_path))
+    monkeypatch.setattr(db_service, "client", store)
+    db_service.insert_claim("Claim A", "False", "https://www.snopes.com/a", "2025-01-01", [1.0] + [0.0] * 383)
+
+    results = db_service.search_claim([1.0] + [0.0] * 383, top_k=1)
+    assert results[0].payload["text"] == "Claim A"
+
+    monkeypatch.setattr(db_service, "async_client", AsyncLocalStore(store))
+    batches = asyncio.run(db_service.search_claims_batch_async([[1.0] + [0.0] * 383], top_k=1))
+    assert batches[0][0].payload["text"] == "Claim A"
+    assert db_service.filter_new_claims([
+        {"claim": "Claim A", "verdict": "False", "source_url": "https://www.snopes.com/a", "date": "2025-01-01"}
+    ]) == []
@@ -0,0 +1,75 @@
+# server/tests/test_metrics.py
+
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.main import app
+from app.services.factcheck_cache import FactCheckCache
+
+client = TestClient(app)
+
+
+def _value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_factcheck_stages_and_counters_are_exported(monkeypatch):
+    result = SimpleNamespace(id="p1", score=0.9, payload={
+        "text": "Test claim", "verdict": "False", "source_url": "http://example.com", "date": "2025-08-13"
+    })
+    async def fake_embedding(text):
+        return [0.1] * 384
+    async def fake_search(embedding, top_k=1, query_filter=None, query_text=None, with_vectors=False):
+        return [result]
+    async def fake_llm(prompt):
+        return '{"verdict": "False"}'
+
+    monkeypatch.setattr("app.main.get_embedding_async", fake_embedding)
+    monkeypatch.setattr("app.main.search_claim_async", fake_search)
+    monkeypatch.setattr("app.main.query_llm", fake_llm)
+    monkeypatch.setattr("app.main.factcheck_cache", FactCheckCache(max_entries=10, ttl_seconds=60))
+
+    before = {
+        stage: _value("veritium_stage_seconds_count", stage=stage)
+        for stage in ("embed", "search", "prompt", "llm", "total")
+    }
+    requests_before = _value("veritium_requests_total", endpoint="/factcheck", status="200")
+    client.post("/factcheck", json={"claim": "Test claim"})
+    client.post("/factcheck", json={"claim": "Test claim"})
+
+    for stage in ("embed", "search", "prompt", "total"):
+        assert _value("veritium_stage_seconds_count", stage=stage) == before[stage] + 2
+    # Second request is a cache hit: one LLM call only
+    assert _value("veritium_stage_seconds_count", stage="llm") == before["llm"] + 1
+    assert _value("veritium_requests_total", endpoint="/factcheck", status="200") == requests_before + 2
+    assert _value("veritium_request_seconds_count", endpoint="/factcheck") >= 2
+
+    res = client.get("/metrics")
+    assert res.status_code == 200 and res.headers["content-type"].startswith("text/plain")
+    # Exported from the /stats snapshot of the (patched) fact-check cache
+    assert 'veritium_factcheck_cache_lookups_total{result="hits"} 1.0' in res.text
+    assert 'veritium_verdict_parses_total{outcome="ok"}' in res.text
+
+def test_ingestion_metrics(monkeypatch):
+    from app.ingestion import common
+    from app.services import db_service
+
+    monkeypatch.setattr(common, "filter_new_claims", lambda rows: rows)
+    monkeypatch.setattr(common, "get_embeddings", lambda texts: np.zeros((len(texts), 384), dtype=np.float32))
+    upserts = []
+    monkeypatch.setattr(db_service, "get_client", lambda: SimpleNamespace(upsert=lambda **kw: upserts.append(kw)))
+
+    embedded = _value("veritium_ingest_articles_embedded_total")
+    batches = _value("veritium_ingest_upsert_batch_seconds_count")
+    rows = [{"claim": f"Claim {i}", "verdict": "False", "source_url": f"http://a/{i}", "date": None} for i in range(5)]
+    rows, embeddings = common.embed_claims(rows + [{"claim": ""}])
+    db_service.insert_claims_bulk(
+        [db_service.make_point(r["claim"], r["verdict"], r["source_url"], r["date"], e) for r, e in zip(rows, embeddings)],
+        batch_size=2, parallel=1
+    )
+
+    assert _value("veritium_ingest_articles_embedded_total") == embedded + 5
+    assert _value("veritium_ingest_upsert_batch_seconds_count") == batches + 3
+    assert len(upserts) == 3
@@ -0,0 +1,70 @@
+# server/tests/test_migrate_collection.py
+
+import pytest
+from qdrant_client import QdrantClient, models
+
+from app import migrate_collection
+from app.migrate_collection import migrate, alias_target
+from app.services.db_service import create_collection, point_id, content_hash
+
+
+def _url(i):
+    return f"https://www.snopes.com/fact-check/x{i}"
+
+def _seed(qdrant, name, n=300):
+    create_collection(qdrant, name)
+    qdrant.upsert(name, [
+        models.PointStruct(id=i, vector=[1.0, float(i)] + [0.0] * 382,
+                           payload={"text": f"claim {i}", "source_url": _url(i)})
+        for i in range(n)
+    ])
+
+
+def test_migrate_swaps_alias():
+    qdrant = QdrantClient(":memory:")
+    _seed(qdrant, "claims-old")
+    qdrant.update_collection_aliases(change_aliases_operations=[
+        models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name="claims-old", alias_name="claims"))
+    ])
+
+    new = migrate("claims", qdrant=qdrant, batch_size=128)
+    assert alias_target(qdrant, "claims") == new
+    assert qdrant.count("claims").count == 300
+    assert qdrant.retrieve("claims", [point_id(_url(7), None)])[0].payload["source"] == "snopes.com"
+    assert qdrant.collection_exists("claims-old")
+
+
+def test_plain_collection_needs_drop_old():
+    qdrant = QdrantClient(":memory:")
+    _seed(qdrant, "claims", n=5)
+    with pytest.raises(SystemExit):
+        migrate("claims", qdrant=qdrant)
+
+    new = migrate("claims", qdrant=qdrant, drop_old=True)
+    assert alias_target(qdrant, "claims") == new
+    assert qdrant.count("claims").count == 5
+
+
+def test_migrate_rekeys_old_points():
+    import uuid
+    qdrant = QdrantClient(":memory:")
+    create_collection(qdrant, "claims")
+    # Written by an older ingestion run: random IDs, no content_hash, the same article twice
+    qdrant.upsert("claims", [
+        models.PointStruct(id=str(uuid.uuid4()), vector=[1.0] + [0.0] * 383,
+                           payload={"text": "Claim", "verdict": "False", "source_url": _url(1), "date": "2025-01-01"})
+        for _ in range(2)
+    ])
+
+    migrate("claims", qdrant=qdrant, drop_old=True)
+    records = qdrant.scroll("claims", with_payload=True)[0]
+    assert [str(r.id) for r in records] == [point_id(_url(1), "Claim")]
+    assert records[0].payload["content_hash"] == content_hash("Claim", "False", "2025-01-01")
+
+
+def test_missing_collection_is_not_created(monkeypatch):
+    qdrant = QdrantClient(":memory:")
+    monkeypatch.setattr(migrate_collection, "connect", lambda: qdrant)
+    with pytest.raises(SystemExit, match="No collection"):
+        migrate("claims")
+    assert not qdrant.collection_exists("claims")
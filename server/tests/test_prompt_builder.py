@@ -0,0 +1,100 @@
+# server/tests/test_prompt_builder.py
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import prompt_builder
+from app.services.prompt_builder import select_evidence, build_evidence, truncate
+
+
+class WordTokenizer:
+    """One token per whitespace-separated word."""
+
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+
+@pytest.fixture(autouse=True)
+def word_tokenizer(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "tokenizer", WordTokenizer())
+
+def _hit(text, vector=None, verdict="False"):
+    return SimpleNamespace(id=text, score=0.5, vector=vector, payload={
+        "text": text, "verdict": verdict, "source_url": f"http://example.com/{text[:5]}", "date": "2025-01-01"
+    })
+
+
+def test_near_duplicates_are_dropped():
+    results = [
+        _hit("Claim A", [1.0, 0.0]),
+        _hit("Claim A again", [0.99, 0.01]),
+        _hit("Claim B", [0.0, 1.0]),
+    ]
+    assert [r.id for r in select_evidence(results, similarity=0.95)] == ["Claim A", "Claim B"]
+    # Hybrid results carry a dict of named vectors
+    results[1].vector = {"": [0.99, 0.01], "bm25": None}
+    assert [r.id for r in select_evidence(results, similarity=0.95)] == ["Claim A", "Claim B"]
+
+def test_mmr_prefers_diverse_evidence():
+    results = [_hit("Claim A", [1.0, 0.0]), _hit("Claim A2", [0.8, 0.6]), _hit("Claim B", [0.0, 1.0])]
+    # Relevance only keeps retrieval order; with diversity, B moves ahead of the A paraphrase
+    assert [r.id for r in select_evidence(results, similarity=0, mmr_lambda=1.0)] == ["Claim A", "Claim A2", "Claim B"]
+    assert [r.id for r in select_evidence(results, similarity=0, mmr_lambda=0.5)] == ["Claim A", "Claim B", "Claim A2"]
+
+def test_results_without_vectors_keep_their_order():
+    results = [_hit("one"), _hit("two"), _hit("three")]
+    assert select_evidence(results) == results
+
+def test_evidence_fits_the_token_budget():
+    long_text = " ".join(["word"] * 50)
+    results = [_hit(long_text, [1.0, 0.0]), _hit("short claim", [0.0, 1.0]), _hit("another claim", [0.6, 0.8])]
+
+    used, text = build_evidence(results, budget=30, item_tokens=10)
+    # The long item is cut to 10 tokens, and only what fits in 30 tokens is kept
+    assert text.startswith("- " + " ".join(["word"] * 10) + "...")
+    assert sum(len(line.split()) for line in text.split("\n\n")) <= 30
+    assert [r.id for r in used] == [long_text, "short claim"]
+
+    # The top item is always kept, however small the budget
+    used, _ = build_evidence(results, budget=1, item_tokens=10)
+    assert len(used) == 1
+
+def test_truncate_without_tokenizer(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "tokenizer", False)
+    assert truncate("abcdefghij", 2) == "abcdefgh..."
+    assert truncate("abc", 2) == "abc"
+
+def test_tokenizer_loads_with_api_key(monkeypatch):
+    import sys
+    seen = {}
+    def from_pretrained(name, token=None):
+        seen.update(name=name, token=token)
+        return WordTokenizer()
+    monkeypatch.setitem(sys.modules, "transformers", SimpleNamespace(AutoTokenizer=SimpleNamespace(from_pretrained=from_pretrained)))
+    monkeypatch.setattr(prompt_builder, "HF_API_KEY", "hf_test")
+    monkeypatch.setattr(prompt_builder, "tokenizer", None)
+
+    assert not prompt_builder.tokenizer_loaded()
+    assert isinstance(prompt_builder.get_tokenizer(), WordTokenizer)
+    assert seen["token"] == "hf_test" and prompt_builder.tokenizer_loaded()
+
+def test_evidence_built_off_loop_until_tokenizer_loads(monkeypatch):
+    import asyncio
+    import threading
+    from app import main
+    threads = []
+    def fake_build(results):
+        threads.append(threading.current_thread())
+        return results, ""
+    monkeypatch.setattr(main, "build_evidence", fake_build)
+
+    monkeypatch.setattr(prompt_builder, "tokenizer", None)
+    asyncio.run(main._build_evidence([]))
+    monkeypatch.setattr(prompt_builder, "tokenizer", WordTokenizer())
+    asyncio.run(main._build_evidence([]))
+    assert threads[0] is not threading.main_thread()
+    assert threads[1] is threading.main_thread()
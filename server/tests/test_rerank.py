@@ -0,0 +1,68 @@
+# server/tests/test_rerank.py
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services import rerank_service
+
+
+class FakeCrossEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs):
+        self.calls.append(len(pairs))
+        # Prefer evidence that mentions the query's last word
+        return np.array([float(q.split()[-1] in text) for q, text in pairs])
+
+
+def _results(*scored):
+    return [SimpleNamespace(id=i, score=score, payload={"text": text}) for i, (text, score) in enumerate(scored)]
+
+
+def test_rerank_reorders_close_candidates(monkeypatch):
+    encoder = FakeCrossEncoder()
+    monkeypatch.setattr(rerank_service, "RERANK_ENABLED", True)
+    monkeypatch.setattr(rerank_service, "model", encoder)
+    monkeypatch.setattr(rerank_service, "stats", rerank_service.RerankStats())
+
+    results = _results(("about cats", 0.80), ("about dogs", 0.78), ("about birds", 0.75))
+    top = rerank_service.rerank("claim about dogs", results, top_n=2, margin=0.1)
+    assert [r.payload["text"] for r in top][0] == "about dogs"
+    assert len(top) == 2 and encoder.calls == [3]
+    assert rerank_service.stats.snapshot()["reranked"] == 1
+
+
+def test_rerank_skipped_when_leader_is_clear(monkeypatch):
+    encoder = FakeCrossEncoder()
+    monkeypatch.setattr(rerank_service, "RERANK_ENABLED", True)
+    monkeypatch.setattr(rerank_service, "model", encoder)
+    monkeypatch.setattr(rerank_service, "stats", rerank_service.RerankStats())
+
+    results = _results(("about cats", 0.95), ("about dogs", 0.60))
+    top = rerank_service.rerank("claim about dogs", results, top_n=1, margin=0.1)
+    assert top[0].payload["text"] == "about cats"
+    assert encoder.calls == [] and rerank_service.stats.snapshot()["skipped"] == 1
+
+
+def test_hybrid_skip_uses_dense_similarity(monkeypatch):
+    monkeypatch.setattr(rerank_service, "HYBRID_SEARCH", True)
+    query = [1.0, 0.0]
+    # RRF scores never differ by the margin; the dense similarities do
+    results = [
+        SimpleNamespace(id=0, score=0.033, vector={"": [1.0, 0.0]}, payload={"text": "a"}),
+        SimpleNamespace(id=1, score=0.032, vector={"": [0.5, 0.866]}, payload={"text": "b"}),
+    ]
+    assert rerank_service.clear_leader(results, margin=0.15, query_embedding=query)
+    results[1].vector = {"": [0.99, 0.14]}
+    assert not rerank_service.clear_leader(results, margin=0.15, query_embedding=query)
+    # Without vectors the fused scores cannot tell, so the cross-encoder runs
+    assert not rerank_service.clear_leader(results, margin=0.15)
+
+
+def test_disabled_rerank_keeps_results(monkeypatch):
+    monkeypatch.setattr(rerank_service, "RERANK_ENABLED", False)
+    results = _results(("a", 0.5), ("b", 0.4))
+    assert rerank_service.rerank("q", results) is results
+    assert rerank_service.candidate_count() == 1
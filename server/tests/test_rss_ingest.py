@@ -1,12 +1,77 @@
 from unittest.mock import patch
-from app.ingestion.rss_ingest import ingest_rss
+from app.ingestion.rss_ingest import ingest_rss, SOURCES
 
-@patch("ingestion.rss_ingest.insert_claim")
-@patch("ingestion.rss_ingest.feedparser.parse")
-def test_ingest(mock_parse, mock_insert):
+@patch("app.ingestion.rss_ingest.default_cache", return_value=None)
+@patch("app.ingestion.rss_ingest.ClaimWriter")
+@patch("app.ingestion.rss_ingest.store_claims")
+@patch("app.ingestion.rss_ingest.feedparser.parse")
+def test_ingest(mock_parse, mock_store, mock_writer, mock_cache):
     # Mock a fake RSS feed entry
     mock_parse.return_value.entries = [
         {"title":"Test Title","summary":"Test summary","link":"http://url","published":"2025-08-13"}
     ]
     ingest_rss()
-    assert mock_insert.called, "insert_claim was not called"
+    assert mock_store.called, "store_claims was not called"
+    rows = mock_store.call_args[0][0]
+    assert rows[0]["claim"] == "Test Title"
+    assert rows[0]["source_url"] == "http://url"
+
+@patch("app.ingestion.rss_ingest.ClaimWriter")
+@patch("app.ingestion.rss_ingest.store_claims")
+@patch("app.ingestion.rss_ingest.feedparser.parse")
+def test_ingest_skips_unmodified_feeds(mock_parse, mock_store, mock_writer, tmp_path):
+    from app.ingestion.http_cache import HttpCache
+    cache = HttpCache(str(tmp_path))
+    for source in SOURCES:
+        cache.store(source["url"], b"", etag='"abc"')
+    mock_parse.return_value = {"status": 304, "entries": []}
+
+    with patch("app.ingestion.rss_ingest.default_cache", return_value=cache):
+        ingest_rss()
+    assert mock_parse.call_args.kwargs["etag"] == '"abc"'
+    assert not mock_store.called
+
+@patch("app.ingestion.rss_ingest.default_cache", return_value=None)
+@patch("app.ingestion.rss_ingest.ClaimWriter")
+@patch("app.ingestion.rss_ingest.store_claims", return_value=0)
+@patch("app.ingestion.rss_ingest.feedparser.parse")
+def test_ingest_reports_stored_count(mock_parse, mock_store, mock_writer, mock_cache, capsys):
+    mock_parse.return_value.entries = [
+        {"title":"Test Title","summary":"Test summary","link":"http://url","published":"2025-08-13"}
+    ]
+    ingest_rss()
+    # The entry was already stored, so nothing is reported as inserted
+    out = capsys.readouterr().out
+    assert "Inserted" not in out
+    assert "0 new or changed of 1 entries" in out
+
+@patch("app.ingestion.rss_ingest.ClaimWriter")
+@patch("app.ingestion.rss_ingest.store_claims", side_effect=RuntimeError("qdrant down"))
+@patch("app.ingestion.rss_ingest.feedparser.parse")
+def test_failed_store_keeps_feed_uncached(mock_parse, mock_store, mock_writer, tmp_path):
+    import pytest
+    from app.ingestion.http_cache import HttpCache
+    cache = HttpCache(str(tmp_path))
+    mock_parse.return_value.entries = [
+        {"title":"Test Title","summary":"Test summary","link":"http://url","published":"2025-08-13"}
+    ]
+    mock_parse.return_value.get = {"etag": '"abc"'}.get
+
+    with patch("app.ingestion.rss_ingest.default_cache", return_value=cache), pytest.raises(RuntimeError):
+        ingest_rss()
+    # The next poll must fetch the feed again rather than get a 304
+    assert cache.lookup(SOURCES[0]["url"]) is None
+
+@patch("app.ingestion.rss_ingest.default_cache", return_value=None)
+@patch("app.ingestion.rss_ingest.ClaimWriter")
+@patch("app.ingestion.rss_ingest.store_claims", return_value=0)
+@patch("app.ingestion.rss_ingest.feedparser.parse")
+def test_undated_entries_keep_a_stable_date(mock_parse, mock_store, mock_writer, mock_cache):
+    mock_parse.return_value.entries = [
+        {"title":"Dated","summary":"","link":"http://a","updated":"2025-08-13"},
+        {"title":"Undated","summary":"","link":"http://b"},
+    ]
+    ingest_rss()
+    rows = mock_store.call_args[0][0]
+    assert rows[0]["date"] == "2025-08-13"
+    assert rows[1]["date"] is None
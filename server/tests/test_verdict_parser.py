@@ -0,0 +1,36 @@
+from app.services.verdict_parser import ParseStats, IncrementalVerdictParser, parse_verdict
+from app.services import verdict_parser
+
+
+def test_strict_json_parses():
+    verdict, outcome = parse_verdict('{"verdict": "True", "explanation": "yes", "sources": ["http://a"]}')
+    assert outcome == "ok"
+    assert verdict.verdict == "True" and verdict.sources == ["http://a"]
+
+def test_repair_pass_fixes_common_breakage():
+    fenced = '```json\n{"verdict": "Mostly false", "explanation": "partly",}\n```'
+    verdict, outcome = parse_verdict(fenced)
+    assert outcome == "repaired" and verdict.verdict == "Misleading"
+
+    verdict, outcome = parse_verdict("Answer: {'verdict': 'False', 'sources': 'http://a'}")
+    assert outcome == "repaired" and verdict.sources == ["http://a"]
+
+    # Cut off mid-explanation by max_tokens
+    verdict, outcome = parse_verdict('{"verdict": "False", "explanation": "The photo is from 20')
+    assert outcome == "repaired" and verdict.explanation == "The photo is from 20"
+
+def test_unusable_answers_fail(monkeypatch):
+    monkeypatch.setattr(verdict_parser, "stats", ParseStats())
+    assert parse_verdict("The claim is false.") == (None, "failed")
+    assert parse_verdict('{"verdict": "Unknown"}') == (None, "failed")
+    assert parse_verdict('{"verdict": "True"}')[1] == "ok"
+    snapshot = verdict_parser.stats.snapshot()
+    assert snapshot["failed"] == 2 and snapshot["failure_rate"] == round(2 / 3, 4)
+
+def test_incremental_parser_reports_fields_as_they_complete():
+    parser = IncrementalVerdictParser()
+    deltas = ['{"verdict": "Fa', 'lse", "explanation": "a, b', '", "sources": ["http://a"', ']}']
+    seen = [parser.feed(d) for d in deltas]
+    assert seen == [{}, {"verdict": "False"}, {"explanation": "a, b"}, {"sources": ["http://a"]}]
+    verdict, outcome = parser.result()
+    assert outcome == "ok" and verdict.sources == ["http://a"]